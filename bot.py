@@ -1,4 +1,9 @@
-from duel_ladder_bot.app import main
+from duel_ladder_bot import startup
+
+# --profile-startup: time every import from here on, report once polling starts
+startup.enable_from_argv()
+
+from duel_ladder_bot.app import main  # noqa: E402
 
 
 if __name__ == "__main__":
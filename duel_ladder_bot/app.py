@@ -8,12 +8,13 @@ from telegram.ext import (
     filters,
 )
 
-from .commands import post_init
+from .commands import post_init, post_shutdown
 from .config import BOT_TOKEN, log
 from .duel import on_callback
 from .handlers import admin as admin_handlers
 from .handlers import player as player_handlers
 from .solo import cmd_solo, cmd_solo_stop
+from .startup import phase
 
 
 async def _on_error(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -33,7 +34,13 @@ def build_app() -> Application:
     if not BOT_TOKEN:
         raise SystemExit("Missing BOT_TOKEN env var (put it in .env).")
 
-    app = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
+    app = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     app.add_error_handler(_on_error)
 
     # player commands
@@ -74,7 +81,8 @@ def build_app() -> Application:
 
 
 def main() -> None:
-    app = build_app()
+    with phase("build_app"):
+        app = build_app()
     log.info("Starting bot…")
     app.run_polling(allowed_updates=Update.ALL_TYPES)
 
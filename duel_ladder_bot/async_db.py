@@ -0,0 +1,158 @@
+"""
+Awaitable facade over `DB`.
+
+Every public `DB` method is available under the same name as a coroutine; the
+call is queued to a small pool of worker threads so SQLite I/O never runs on
+the event loop.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .config import log
+from .db import DB
+
+
+class AsyncDB:
+    def __init__(self, db: DB, *, workers: int = 2, max_pending: int = 256):
+        self.db = db
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+
+        self._requests: "queue.SimpleQueue[Optional[tuple]]" = queue.SimpleQueue()
+        self._threads: list[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # created lazily so it binds to the loop that actually uses it
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._pending_max = 0
+        self._backpressure_waits = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._exec_total = 0.0
+        self._exec_max = 0.0
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        target = getattr(self.db, name)
+        if not callable(target):
+            raise AttributeError(name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self.run(target, *args, **kwargs)
+
+        call.__name__ = name
+        setattr(self, name, call)  # skip __getattr__ next time
+        return call
+
+    def _ensure_started(self) -> None:
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"db-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _worker(self) -> None:
+        while True:
+            item = self._requests.get()
+            if item is None:
+                return
+            loop, fut, fn, args, kwargs, enqueued_at = item
+
+            started = time.monotonic()
+            result: Any = None
+            error: Optional[BaseException] = None
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:  # handed back to the awaiting coroutine
+                error = e
+            finished = time.monotonic()
+
+            with self._stats_lock:
+                waited = started - enqueued_at
+                took = finished - started
+                self._queue_wait_total += waited
+                self._queue_wait_max = max(self._queue_wait_max, waited)
+                self._exec_total += took
+                self._exec_max = max(self._exec_max, took)
+                if error is None:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+
+            try:
+                loop.call_soon_threadsafe(_resolve, fut, result, error)
+            except RuntimeError:
+                # loop already closed (shutdown); nobody is waiting any more
+                pass
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run `fn(*args, **kwargs)` on a DB worker thread and await its result."""
+        self._ensure_started()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        if self._slots.locked():
+            with self._stats_lock:
+                self._backpressure_waits += 1
+        await self._slots.acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            fut = loop.create_future()
+            with self._stats_lock:
+                self._submitted += 1
+                pending = self._submitted - self._completed - self._failed
+                self._pending_max = max(self._pending_max, pending)
+            self._requests.put((loop, fut, fn, args, kwargs, time.monotonic()))
+            return await fut
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            done = self._completed + self._failed
+            return {
+                "workers": self.workers,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "pending": self._submitted - done,
+                "pending_max": self._pending_max,
+                "max_pending": self.max_pending,
+                "backpressure_waits": self._backpressure_waits,
+                "queue_wait_ms_avg": round(self._queue_wait_total * 1000 / done, 3) if done else 0.0,
+                "queue_wait_ms_max": round(self._queue_wait_max * 1000, 3),
+                "exec_ms_avg": round(self._exec_total * 1000 / done, 3) if done else 0.0,
+                "exec_ms_max": round(self._exec_max * 1000, 3),
+            }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop worker threads after the queued requests have run."""
+        threads, self._threads = self._threads, []
+        for _ in threads:
+            self._requests.put(None)
+        for t in threads:
+            t.join(timeout)
+            if t.is_alive():
+                log.warning("DB worker %s did not stop within %.1fs", t.name, timeout)
+
+
+def _resolve(fut: asyncio.Future, result: Any, error: Optional[BaseException]) -> None:
+    if fut.done():
+        return
+    if error is not None:
+        fut.set_exception(error)
+    else:
+        fut.set_result(result)
@@ -1,37 +1,70 @@
 from telegram import BotCommand
-from telegram.ext import Application
+from telegram.ext import Application, ContextTypes
 
 from . import runtime
+from .config import MATCH_TICK_SECONDS, RESULT_FLUSH_SECONDS, log
+from .duel import matchmake_job
+from .startup import ready
+
+
+_COMMANDS = [
+    BotCommand("play", "🎮 Open the Mini App game"),
+    BotCommand("menu", "📌 Open menu / dashboard"),
+    BotCommand("join", "🎮 Join event + nonstop matchmaking"),
+    BotCommand("leave", "🚪 Leave queue / stop matchmaking"),
+    BotCommand("pause", "⏸ Pause nonstop matchmaking"),
+    BotCommand("resume", "▶️ Resume nonstop matchmaking"),
+    BotCommand("leaderboard", "🏆 View leaderboard"),
+    BotCommand("mystats", "📊 View my stats"),
+    BotCommand("help", "ℹ️ Help"),
+    BotCommand("solo", "🧪 Solo mode (test questions)"),
+    BotCommand("solo_stop", "🛑 Stop solo mode"),
+    BotCommand("admin_help", "🛠 (admin) Admin cheat sheet"),
+    BotCommand("tma_admin", "🛠 (admin) Get Mini App admin link"),
+    BotCommand("tma_set", "🛠 (admin) Set Mini App URL (tunnel)"),
+    BotCommand("tma_clear", "🛠 (admin) Clear Mini App URL override"),
+    BotCommand("event_start", "✅ (admin) Start event"),
+    BotCommand("event_stop", "🛑 (admin) Stop event"),
+    BotCommand("importwords", "📥 (admin) Import words"),
+    BotCommand("addword", "➕ (admin) Add a word"),
+    BotCommand("words_count", "🔢 (admin) Words in DB"),
+    BotCommand("vocab_reset", "🧨 (admin) Wipe vocab table"),
+]
 
 
 async def post_init(app: Application) -> None:
-    me = await app.bot.get_me()
-    runtime.BOT_USERNAME = me.username
-
-    await app.bot.set_my_commands(
-        [
-            BotCommand("play", "🎮 Open the Mini App game"),
-            BotCommand("menu", "📌 Open menu / dashboard"),
-            BotCommand("join", "🎮 Join event + nonstop matchmaking"),
-            BotCommand("leave", "🚪 Leave queue / stop matchmaking"),
-            BotCommand("pause", "⏸ Pause nonstop matchmaking"),
-            BotCommand("resume", "▶️ Resume nonstop matchmaking"),
-            BotCommand("leaderboard", "🏆 View leaderboard"),
-            BotCommand("mystats", "📊 View my stats"),
-            BotCommand("help", "ℹ️ Help"),
-            BotCommand("solo", "🧪 Solo mode (test questions)"),
-            BotCommand("solo_stop", "🛑 Stop solo mode"),
-            BotCommand("admin_help", "🛠 (admin) Admin cheat sheet"),
-            BotCommand("tma_admin", "🛠 (admin) Get Mini App admin link"),
-            BotCommand("tma_set", "🛠 (admin) Set Mini App URL (tunnel)"),
-            BotCommand("tma_clear", "🛠 (admin) Clear Mini App URL override"),
-            BotCommand("event_start", "✅ (admin) Start event"),
-            BotCommand("event_stop", "🛑 (admin) Stop event"),
-            BotCommand("importwords", "📥 (admin) Import words"),
-            BotCommand("addword", "➕ (admin) Add a word"),
-            BotCommand("words_count", "🔢 (admin) Words in DB"),
-            BotCommand("vocab_reset", "🧨 (admin) Wipe vocab table"),
-        ]
+    # Application.initialize() already fetched getMe; no second round trip
+    runtime.BOT_USERNAME = app.bot.username
+    runtime.questions.warm()
+    app.job_queue.run_repeating(
+        flush_results_job, interval=RESULT_FLUSH_SECONDS, first=RESULT_FLUSH_SECONDS
     )
+    app.job_queue.run_repeating(
+        matchmake_job, interval=MATCH_TICK_SECONDS, first=MATCH_TICK_SECONDS
+    )
+    # The command menu rarely changes: publish it without holding up polling.
+    app.create_task(_set_commands(app), name="set_my_commands")
+    ready("bot polling")
+
+
+async def _set_commands(app: Application) -> None:
+    try:
+        await app.bot.set_my_commands(_COMMANDS)
+    except Exception:
+        log.exception("Publishing the bot command menu failed")
+
+
+async def flush_results_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    try:
+        await runtime.adb.flush_results()
+    except Exception:
+        # deltas stay buffered and are retried on the next tick
+        log.exception("Flushing round results failed")
 
 
+async def post_shutdown(app: Application) -> None:
+    await runtime.timers.close()
+    await runtime.outbox.close()
+    runtime.adb.close()
+    runtime.db.flush_results()
+    runtime.db.close()
@@ -1,13 +1,16 @@
 import logging
 import os
 
-try:
-    from dotenv import load_dotenv
+# Serverless functions (Netlify runs them on AWS Lambda) get their env vars
+# injected and have no .env file; skipping python-dotenv saves ~20ms of cold start.
+if not os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+    try:
+        from dotenv import load_dotenv
 
-    load_dotenv()
-except Exception:
-    # Optional dependency; env vars can be provided by the environment directly.
-    pass
+        load_dotenv()
+    except Exception:
+        # Optional dependency; env vars can be provided by the environment directly.
+        pass
 
 logging.basicConfig(
     format="%(asctime)s %(levelname)s %(name)s: %(message)s", level=logging.INFO
@@ -17,9 +20,39 @@ log = logging.getLogger("duel_ladder_bot")
 BOT_TOKEN = os.environ.get("BOT_TOKEN", "").strip()
 DB_PATH = os.environ.get("DB_PATH", "duel_ladder.sqlite3").strip()
 
+# SQLite connection pool (see db.ConnectionPool)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "4"))
+DB_PRAGMAS = {
+    "journal_mode": os.environ.get("DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("DB_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.environ.get("DB_MMAP_SIZE", str(64 * 1024 * 1024))),
+    "cache_size": int(os.environ.get("DB_CACHE_SIZE", "-8000")),
+    "busy_timeout": 5000,
+}
+# Worker threads behind runtime.adb (AsyncDB)
+DB_WORKERS = int(os.environ.get("DB_WORKERS", "2"))
+# How often the in-memory vocab index checks SQLite for words added by other processes
+VOCAB_CHECK_SECONDS = float(os.environ.get("VOCAB_CHECK_SECONDS", "10"))
+
 # Telegram Mini App (TMA)
 # Example: https://your-domain.example (must be HTTPS in real Telegram clients)
 TMA_URL = os.environ.get("TMA_URL", "").strip().rstrip("/")
+# initData older than this (by its auth_date) is rejected
+TMA_AUTH_MAX_AGE_SECONDS = int(os.environ.get("TMA_AUTH_MAX_AGE_SECONDS", "86400"))
+# Validated initData strings are remembered this long (bounded LRU)
+TMA_AUTH_CACHE_SECONDS = int(os.environ.get("TMA_AUTH_CACHE_SECONDS", "300"))
+TMA_AUTH_CACHE_SIZE = int(os.environ.get("TMA_AUTH_CACHE_SIZE", "4096"))
+# Answer session tokens from /join (tma_auth.issue_session) expire after this long
+TMA_SESSION_MAX_AGE_SECONDS = int(os.environ.get("TMA_SESSION_MAX_AGE_SECONDS", "14400"))
+# Classroom rooms per TMA server process, and how long an unused room is kept
+TMA_MAX_ROOMS = int(os.environ.get("TMA_MAX_ROOMS", "200"))
+TMA_ROOM_IDLE_SECONDS = int(os.environ.get("TMA_ROOM_IDLE_SECONDS", "7200"))
+# Classroom game journal (append-only) and how often it is flushed / checkpointed to SQLite
+TMA_JOURNAL_PATH = os.environ.get("TMA_JOURNAL_PATH", DB_PATH + ".tma-journal")
+TMA_JOURNAL_FLUSH_SECONDS = float(os.environ.get("TMA_JOURNAL_FLUSH_SECONDS", "0.5"))
+TMA_CHECKPOINT_SECONDS = float(os.environ.get("TMA_CHECKPOINT_SECONDS", "30"))
+# Serverless adapter state (see tma_store.store_from_env): "memory" or "sqlite:<path>"
+TMA_STATE_STORE = os.environ.get("TMA_STATE_STORE", "sqlite:/tmp/tma-state.sqlite3").strip()
 # Used for the admin panel in the TMA (matches duel_ladder_bot/tma_server.py)
 ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "classroom2024").strip()
 
@@ -33,6 +66,8 @@ if _admin_raw:
 
 # Global (DM-first): store the event as chat_id=0
 GLOBAL_CHAT_ID = 0
+# Finished TMA classroom games are stored as events with this chat_id
+TMA_CHAT_ID = -1
 
 DEFAULT_PHASE_SECONDS = 120
 DEFAULT_ROUNDS_PER_DUEL = 6
@@ -42,8 +77,35 @@ DEFAULT_ROUND_SECONDS = 12
 REST_BETWEEN_DUELS_SECONDS = 7
 PRE_DUEL_COUNTDOWN_SECONDS = 5
 
+# Rating-aware matchmaking (see matchmaker.Matchmaker). Ratings are Elo.
+ELO_K = float(os.environ.get("ELO_K", "32"))
+MATCH_BUCKET_WIDTH = float(os.environ.get("MATCH_BUCKET_WIDTH", "50"))
+MATCH_WINDOW = float(os.environ.get("MATCH_WINDOW", "100"))
+MATCH_WINDOW_GROWTH = float(os.environ.get("MATCH_WINDOW_GROWTH", "20"))  # per second waited
+MATCH_MAX_WAIT_SECONDS = float(os.environ.get("MATCH_MAX_WAIT_SECONDS", "20"))
+MATCH_TICK_SECONDS = float(os.environ.get("MATCH_TICK_SECONDS", "1"))
+
 TASK_TYPES = ["SYNONYM", "ANTONYM", "TRANSLATE", "DEFINITION", "GAPFILL"]
 
+# Ready-built questions kept per task type (see question_pool.QuestionBank)
+QUESTION_POOL_SIZE = int(os.environ.get("QUESTION_POOL_SIZE", "8"))
+QUESTION_POOL_LOW_WATERMARK = int(os.environ.get("QUESTION_POOL_LOW_WATERMARK", "3"))
+
+# Profiles cached for display_name(); unchanged profiles are re-written at most
+# once per USER_TOUCH_SECONDS to keep users.updated_at roughly current.
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "2048"))
+USER_TOUCH_SECONDS = int(os.environ.get("USER_TOUCH_SECONDS", "300"))
+
+# How often buffered round/duel results are written to event_players
+RESULT_FLUSH_SECONDS = float(os.environ.get("RESULT_FLUSH_SECONDS", "2"))
+
+# Outgoing Telegram calls (see outbox.Outbox). Bot API limits are ~30 msg/s
+# overall and ~1 msg/s sustained per chat.
+OUTBOX_GLOBAL_RATE = float(os.environ.get("OUTBOX_GLOBAL_RATE", "25"))
+OUTBOX_CHAT_RATE = float(os.environ.get("OUTBOX_CHAT_RATE", "1"))
+OUTBOX_CHAT_BURST = float(os.environ.get("OUTBOX_CHAT_BURST", "5"))
+OUTBOX_MAX_IN_FLIGHT = int(os.environ.get("OUTBOX_MAX_IN_FLIGHT", "16"))
+
 
 def is_admin(user_id: int) -> bool:
     return user_id in ADMIN_IDS
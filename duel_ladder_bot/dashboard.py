@@ -6,14 +6,14 @@ from telegram.ext import ContextTypes
 from .config import GLOBAL_CHAT_ID
 from .helpers import current_task_type, display_name
 from .keyboards import reply_kb_main
-from .runtime import db
+from .runtime import adb, events, outbox
 from . import state
 
 
 async def send_dashboard(
     chat_id: int, user_id: int, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    ev = db.get_active_event(chat_id=GLOBAL_CHAT_ID)
+    ev = await events.active(GLOBAL_CHAT_ID)
     lines = ["<b>🎯 Duel Ladder</b>", ""]
     if not ev:
         lines += [
@@ -25,7 +25,8 @@ async def send_dashboard(
             "Then tap:",
             "• 🎮 <b>Join & Play</b>",
         ]
-        await context.bot.send_message(
+        await outbox.send_message(
+            context.bot,
             chat_id=chat_id,
             text="\n".join(lines),
             parse_mode="HTML",
@@ -37,8 +38,8 @@ async def send_dashboard(
     remaining = max(0, int(ev["ends_at"]) - int(time.time()))
     mins, secs = remaining // 60, remaining % 60
 
-    joined = db.get_player_stats(event_id=event_id, user_id=user_id) is not None
-    autoq = db.get_auto_queue(event_id=event_id, user_id=user_id) if joined else 0
+    joined = await adb.get_player_stats(event_id=event_id, user_id=user_id) is not None
+    autoq = await adb.get_auto_queue(event_id=event_id, user_id=user_id) if joined else 0
 
     status = "✅ Joined" if joined else "➕ Not joined"
     auto_mode = "🔥 Non-stop ON" if (joined and autoq == 1) else "⏸ Paused/Off"
@@ -67,7 +68,7 @@ async def send_dashboard(
         f"⏳ Event time left: <b>{mins}m {secs}s</b>",
         f"🧩 Current mode: <b>{html.escape(current_task_type())}</b>",
         "",
-        f"👤 You: <b>{html.escape(display_name(user_id))}</b>",
+        f"👤 You: <b>{html.escape(await display_name(user_id))}</b>",
         f"📍 Status: <b>{status}</b>",
         f"⚙️ Mode: <b>{auto_mode}</b>",
         f"🎛 Live: <b>{html.escape(runtime_status)}</b>",
@@ -79,7 +80,8 @@ async def send_dashboard(
         "• 📊 My stats — your numbers",
         "• 🧪 Solo test — single-player questions",
     ]
-    await context.bot.send_message(
+    await outbox.send_message(
+        context.bot,
         chat_id=chat_id,
         text="\n".join(lines),
         parse_mode="HTML",
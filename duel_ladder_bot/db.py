@@ -1,124 +1,239 @@
-import html
 import json
-import random
+import queue
 import sqlite3
+import threading
 import time
-from typing import Any, Optional
+from contextlib import contextmanager
+from typing import Any, ContextManager, Iterator, Optional
 
+from . import migrations
+from .ranking import EventBoard
+from .startup import phase
+from .vocab_index import VocabIndex
+from .write_behind import ResultBuffer
 
-class DB:
-    def __init__(self, path: str):
-        self.path = path
-        self._init_schema()
 
-    def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.path, check_same_thread=False)
+# Applied to every pooled connection when it is opened.
+DEFAULT_PRAGMAS: dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 64 * 1024 * 1024,
+    "cache_size": -8000,  # negative = KiB, so ~8 MB per connection
+    "busy_timeout": 5000,
+}
+
+# Rating of players with no `ratings` row yet.
+DEFAULT_RATING = 1000.0
+
+
+class ConnectionPool:
+    """
+    Bounded pool of long-lived SQLite connections.
+
+    Checkout is re-entrant per thread: nested `connection()` blocks on the same
+    thread reuse the connection that is already checked out.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        size: int = 4,
+        pragmas: Optional[dict[str, Any]] = None,
+        timeout: float = 10.0,
+    ):
+        self.path = path
+        # every ":memory:" connection is its own database, so share exactly one
+        self.size = 1 if path == ":memory:" else max(1, size)
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.timeout = timeout
+
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._born: dict[int, float] = {}
+
+        self._created = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.timeout)
         conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}").fetchall()
+        self._born[id(conn)] = time.monotonic()
         return conn
 
-    def _init_schema(self) -> None:
-        conn = self._connect()
-        cur = conn.cursor()
-
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS vocab (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              word TEXT NOT NULL,
-              definition TEXT DEFAULT '',
-              translation TEXT DEFAULT '',
-              synonyms_json TEXT DEFAULT '[]',
-              antonyms_json TEXT DEFAULT '[]',
-              example TEXT DEFAULT ''
-            );
-            """
-        )
-
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-              user_id INTEGER PRIMARY KEY,
-              username TEXT DEFAULT '',
-              full_name TEXT DEFAULT '',
-              last_chat_id INTEGER DEFAULT NULL,
-              updated_at INTEGER NOT NULL
-            );
-            """
-        )
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._created < self.size
+            if can_open:
+                self._created += 1
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        started = time.monotonic()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"connection pool exhausted ({self.size} in use for {self.timeout}s)"
+            ) from None
+        waited = time.monotonic() - started
+        with self._lock:
+            self._waits += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
 
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS events (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              chat_id INTEGER NOT NULL,
-              started_at INTEGER NOT NULL,
-              ends_at INTEGER NOT NULL,
-              phase_seconds INTEGER NOT NULL,
-              is_active INTEGER NOT NULL DEFAULT 1
-            );
-            """
-        )
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        held: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        conn = self._acquire()
+        with self._lock:
+            self._checkouts += 1
+        self._local.conn = conn
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._born.pop(id(conn), None)
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        ages = [now - born for born in list(self._born.values())]
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "idle": self._idle.qsize(),
+                "in_use": self._created - self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_ms_total": round(self._wait_total * 1000, 2),
+                "wait_ms_max": round(self._wait_max * 1000, 2),
+                "oldest_conn_age_s": round(max(ages), 1) if ages else 0.0,
+                "mean_conn_age_s": round(sum(ages) / len(ages), 1) if ages else 0.0,
+            }
 
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS event_players (
-              event_id INTEGER NOT NULL,
-              chat_id INTEGER NOT NULL,
-              user_id INTEGER NOT NULL,
-              joined_at INTEGER NOT NULL,
-              wins INTEGER NOT NULL DEFAULT 0,
-              losses INTEGER NOT NULL DEFAULT 0,
-              points INTEGER NOT NULL DEFAULT 0,
-              correct INTEGER NOT NULL DEFAULT 0,
-              wrong INTEGER NOT NULL DEFAULT 0,
-              PRIMARY KEY (event_id, user_id)
-            );
-            """
-        )
 
-        # Per-event preference: auto queue for nonstop mode (1=yes, 0=pause)
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS player_prefs (
-              event_id INTEGER NOT NULL,
-              user_id INTEGER NOT NULL,
-              auto_queue INTEGER NOT NULL DEFAULT 1,
-              PRIMARY KEY (event_id, user_id)
-            );
-            """
-        )
+class DB:
+    def __init__(
+        self,
+        path: str,
+        *,
+        pool_size: int = 4,
+        pragmas: Optional[dict[str, Any]] = None,
+        vocab_check_seconds: float = 10.0,
+    ):
+        self.path = path
+        self.pool = ConnectionPool(path, size=pool_size, pragmas=pragmas)
+        # built on first build_question(), then kept current by add_word/wipe_words;
+        # other processes (bot, TMA server, import CLI) write the same table, so
+        # every `vocab_check_seconds` the (COUNT, MAX(id)) signature is compared
+        # with the one the index was built from and a change triggers a reload
+        self._vocab: Optional[VocabIndex] = None
+        self._vocab_lock = threading.Lock()
+        self._vocab_sig = (0, 0)
+        self._vocab_checked = 0.0
+        self.vocab_check_seconds = vocab_check_seconds
+        # round/duel results not yet written to event_players (flush_results)
+        self.results = ResultBuffer()
+        # event_id -> live stats/ranking, loaded on first leaderboard/stats read
+        self._boards: dict[int, EventBoard] = {}
+        self._boards_lock = threading.Lock()
+        # one flush at a time; cold board loads wait for its commit (see _board)
+        self._flush_lock = threading.Lock()
+        # checked on first use, not at import: importing runtime opens no file
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _conn(self) -> ContextManager[sqlite3.Connection]:
+        if not self._schema_ready:
+            self._init_schema()
+        return self.pool.connection()
+
+    def pool_stats(self) -> dict[str, Any]:
+        return self.pool.stats()
+
+    def close(self) -> None:
+        self.pool.close()
 
-        conn.commit()
-        conn.close()
+    def _init_schema(self) -> None:
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            with phase("db schema"), self.pool.connection() as conn:
+                migrations.migrate(conn)
+            self._schema_ready = True
+
+    def check_query_plans(self) -> list[str]:
+        """Hot queries that stopped using their index (see migrations.HOT_QUERIES)."""
+        with self._conn() as conn:
+            return migrations.check_query_plans(conn)
 
     # ---- users ----
     def upsert_user(
         self, user_id: int, username: str, full_name: str, last_chat_id: int
     ) -> None:
         now = int(time.time())
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO users(user_id, username, full_name, last_chat_id, updated_at)
-            VALUES (?, ?, ?, ?, ?)
-            ON CONFLICT(user_id) DO UPDATE SET
-              username=excluded.username,
-              full_name=excluded.full_name,
-              last_chat_id=excluded.last_chat_id,
-              updated_at=excluded.updated_at
-            """,
-            (user_id, username or "", full_name or "", last_chat_id, now),
-        )
-        conn.commit()
-        conn.close()
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                INSERT INTO users(user_id, username, full_name, last_chat_id, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                  username=excluded.username,
+                  full_name=excluded.full_name,
+                  last_chat_id=excluded.last_chat_id,
+                  updated_at=excluded.updated_at
+                """,
+                (user_id, username or "", full_name or "", last_chat_id, now),
+            )
+            conn.commit()
 
     def get_user(self, user_id: int) -> Optional[sqlite3.Row]:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
-        row = cur.fetchone()
-        conn.close()
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
+            row = cur.fetchone()
         return row
 
     # ---- vocab ----
@@ -131,394 +246,446 @@ class DB:
         antonyms: list[str],
         example: str,
     ) -> int:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO vocab(word, definition, translation, synonyms_json, antonyms_json, example)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (
-                word.strip(),
-                definition.strip(),
-                translation.strip(),
-                json.dumps([s.strip() for s in synonyms if s.strip()]),
-                json.dumps([a.strip() for a in antonyms if a.strip()]),
-                example.strip(),
-            ),
-        )
-        conn.commit()
-        vid = int(cur.lastrowid)
-        conn.close()
+        synonyms = [s.strip() for s in synonyms if s.strip()]
+        antonyms = [a.strip() for a in antonyms if a.strip()]
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                INSERT INTO vocab(word, definition, translation, synonyms_json, antonyms_json, example)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    word.strip(),
+                    definition.strip(),
+                    translation.strip(),
+                    json.dumps(synonyms),
+                    json.dumps(antonyms),
+                    example.strip(),
+                ),
+            )
+            vid = int(cur.lastrowid)
+            cur.executemany(
+                "INSERT OR IGNORE INTO vocab_relation(vocab_id, kind, term) VALUES (?, ?, ?)",
+                [(vid, "synonym", s) for s in synonyms] + [(vid, "antonym", a) for a in antonyms],
+            )
+            conn.commit()
+        # only keep an already-built index current; otherwise it loads on first use
+        with self._vocab_lock:
+            if self._vocab is not None:
+                self._vocab.add(vid, word, definition, translation, synonyms, antonyms, example)
+                # our own insert must not look like a foreign change; if another
+                # process inserted too, the count still won't match and it reloads
+                count, max_id = self._vocab_sig
+                self._vocab_sig = (count + 1, max(max_id, vid))
         return vid
 
     def count_words(self) -> int:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) AS c FROM vocab")
-        c = int(cur.fetchone()["c"])
-        conn.close()
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) AS c FROM vocab")
+            c = int(cur.fetchone()["c"])
         return c
 
     def wipe_words(self) -> None:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM vocab")
-        conn.commit()
-        conn.close()
-
-    def _random_vocab_row_for_task(self, task_type: str) -> Optional[sqlite3.Row]:
-        conn = self._connect()
-        cur = conn.cursor()
-        if task_type == "SYNONYM":
-            where = "synonyms_json IS NOT NULL AND synonyms_json != '[]'"
-        elif task_type == "ANTONYM":
-            where = "antonyms_json IS NOT NULL AND antonyms_json != '[]'"
-        elif task_type == "TRANSLATE":
-            where = "translation IS NOT NULL AND TRIM(translation) != ''"
-        elif task_type == "DEFINITION":
-            where = "definition IS NOT NULL AND TRIM(definition) != ''"
-        elif task_type == "GAPFILL":
-            where = "example IS NOT NULL AND TRIM(example) != ''"
-        else:
-            where = "1=1"
-
-        cur.execute(f"SELECT * FROM vocab WHERE {where} ORDER BY RANDOM() LIMIT 1")
-        row = cur.fetchone()
-        conn.close()
-        return row
-
-    def _random_field_values(
-        self, field: str, limit: int, exclude_vocab_id: int
-    ) -> list[str]:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            f"""
-            SELECT {field} AS v
-            FROM vocab
-            WHERE id != ?
-            ORDER BY RANDOM()
-            LIMIT ?
-            """,
-            (exclude_vocab_id, limit * 6),
-        )
-        rows = cur.fetchall()
-        conn.close()
-        out: list[str] = []
-        for r in rows:
-            v = (r["v"] or "").strip()
-            if v and v not in out:
-                out.append(v)
-            if len(out) >= limit:
-                break
-        return out
-
-    def _random_words(self, limit: int, exclude_vocab_id: int) -> list[str]:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT word
-            FROM vocab
-            WHERE id != ?
-            ORDER BY RANDOM()
-            LIMIT ?
-            """,
-            (exclude_vocab_id, limit * 6),
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM vocab_relation")
+            cur.execute("DELETE FROM vocab")
+            conn.commit()
+        with self._vocab_lock:
+            self._vocab = VocabIndex()
+            self._vocab_sig = (0, 0)
+            self._vocab_checked = time.monotonic()
+
+    def _vocab_fresh(self) -> bool:
+        return (
+            self._vocab is not None
+            and time.monotonic() - self._vocab_checked < self.vocab_check_seconds
         )
-        rows = cur.fetchall()
-        conn.close()
-        out: list[str] = []
-        for r in rows:
-            w = (r["word"] or "").strip()
-            if w and w not in out:
-                out.append(w)
-            if len(out) >= limit:
-                break
-        return out
 
-    def build_question(self, task_type: str, k_options: int = 4) -> Optional[dict[str, Any]]:
-        row = self._random_vocab_row_for_task(task_type)
-        if not row:
-            return None
-
-        vocab_id = int(row["id"])
-        word = (row["word"] or "").strip()
-        definition = (row["definition"] or "").strip()
-        translation = (row["translation"] or "").strip()
-        example = (row["example"] or "").strip()
-        synonyms = json.loads(row["synonyms_json"] or "[]")
-        antonyms = json.loads(row["antonyms_json"] or "[]")
-
-        correct: Optional[str] = None
-        distractors: list[str] = []
-        prompt: str = ""
-
-        if task_type == "SYNONYM":
-            if not synonyms:
-                return None
-            correct = random.choice(synonyms).strip()
-            prompt = f"Pick a <b>synonym</b> for:\n<b>{html.escape(word)}</b>"
-            distractors = self._random_words(k_options - 1, exclude_vocab_id=vocab_id)
-
-        elif task_type == "ANTONYM":
-            if not antonyms:
-                return None
-            correct = random.choice(antonyms).strip()
-            prompt = f"Pick an <b>antonym</b> for:\n<b>{html.escape(word)}</b>"
-            distractors = self._random_words(k_options - 1, exclude_vocab_id=vocab_id)
-
-        elif task_type == "TRANSLATE":
-            if not translation:
-                return None
-            correct = translation
-            prompt = f"Pick the <b>translation</b> for:\n<b>{html.escape(word)}</b>"
-            distractors = self._random_field_values(
-                "translation", k_options - 1, exclude_vocab_id=vocab_id
-            )
+    def _vocab_index(self) -> VocabIndex:
+        idx = self._vocab
+        if idx is not None and self._vocab_fresh():
+            return idx
+        with self._vocab_lock:
+            if self._vocab_fresh():
+                return self._vocab
+            with self._conn() as conn:
+                # one read transaction: the signature matches the rows loaded with it
+                conn.execute("BEGIN")
+                try:
+                    row = conn.execute(
+                        "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM vocab"
+                    ).fetchone()
+                    sig = (int(row[0]), int(row[1]))
+                    if self._vocab is None or sig != self._vocab_sig:
+                        cur = conn.cursor()
+                        cur.execute(
+                            """
+                            SELECT id, word, definition, translation, example
+                            FROM vocab
+                            ORDER BY id
+                            """
+                        )
+                        rows = cur.fetchall()
+                        # plain tuples: several rows per word, sqlite3.Row would double the cost
+                        rel = conn.cursor()
+                        rel.row_factory = None
+                        rel.execute("SELECT vocab_id, kind, term FROM vocab_relation ORDER BY rowid")
+                        self._vocab = VocabIndex.from_rows(rows, rel.fetchall())
+                        self._vocab_sig = sig
+                finally:
+                    conn.commit()
+            self._vocab_checked = time.monotonic()
+            return self._vocab
+
+    def reload_vocab(self) -> int:
+        """Rebuild the vocab index now instead of at the next signature check."""
+        with self._vocab_lock:
+            self._vocab = None
+        return len(self._vocab_index())
 
-        elif task_type == "DEFINITION":
-            if not definition:
-                return None
-            correct = definition
-            prompt = f"Pick the <b>definition</b> of:\n<b>{html.escape(word)}</b>"
-            distractors = self._random_field_values(
-                "definition", k_options - 1, exclude_vocab_id=vocab_id
-            )
-
-        elif task_type == "GAPFILL":
-            if not example:
-                return None
-            blanked = example
-            if word and word.lower() in blanked.lower():
-                blanked = blanked.replace(word, "____").replace(word.capitalize(), "____")
-            else:
-                blanked = blanked + " (____)"
-            correct = word
-            prompt = f"Fill the blank:\n<blockquote>{html.escape(blanked)}</blockquote>"
-            distractors = self._random_words(k_options - 1, exclude_vocab_id=vocab_id)
-        else:
-            return None
-
-        options = [correct] + [d for d in distractors if d and d != correct]
-        options = list(dict.fromkeys([o.strip() for o in options if o and o.strip()]))
-
-        if len(options) < k_options:
-            pad = self._random_words(k_options - len(options), exclude_vocab_id=vocab_id)
-            for p in pad:
-                if p not in options:
-                    options.append(p)
-
-        if len(options) < 2:
-            return None
-
-        options = options[:k_options]
-        random.shuffle(options)
-        correct_idx = options.index(correct)
-
-        return {
-            "task_type": task_type,
-            "vocab_id": vocab_id,
-            "prompt": prompt,
-            "options": options,
-            "correct_idx": correct_idx,
-        }
+    def build_question(self, task_type: str, k_options: int = 4) -> Optional[dict[str, Any]]:
+        return self._vocab_index().build_question(task_type, k_options)
 
     # ---- events ----
     def create_event(self, minutes: int, phase_seconds: int, *, chat_id: int) -> int:
         now = int(time.time())
         ends_at = now + minutes * 60
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO events(chat_id, started_at, ends_at, phase_seconds, is_active)
-            VALUES (?, ?, ?, ?, 1)
-            """,
-            (chat_id, now, ends_at, phase_seconds),
-        )
-        conn.commit()
-        eid = int(cur.lastrowid)
-        conn.close()
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                INSERT INTO events(chat_id, started_at, ends_at, phase_seconds, is_active)
+                VALUES (?, ?, ?, ?, 1)
+                """,
+                (chat_id, now, ends_at, phase_seconds),
+            )
+            conn.commit()
+            eid = int(cur.lastrowid)
         return eid
 
     def deactivate_events(self, *, chat_id: int) -> None:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            "UPDATE events SET is_active = 0 WHERE chat_id = ? AND is_active = 1",
-            (chat_id,),
-        )
-        conn.commit()
-        conn.close()
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT id FROM events WHERE chat_id = ? AND is_active = 1", (chat_id,)
+            )
+            event_ids = [int(r["id"]) for r in cur.fetchall()]
+            if not event_ids:
+                return
+            cur.execute(
+                f"UPDATE events SET is_active = 0 WHERE id IN ({','.join('?' * len(event_ids))})",
+                event_ids,
+            )
+            conn.commit()
+        # finished events are rarely read again; reload on demand if they are
+        with self._boards_lock:
+            for event_id in event_ids:
+                self._boards.pop(event_id, None)
 
     def get_active_event(self, *, chat_id: int) -> Optional[sqlite3.Row]:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT * FROM events
-            WHERE chat_id = ? AND is_active = 1
-            ORDER BY id DESC
-            LIMIT 1
-            """,
-            (chat_id,),
-        )
-        row = cur.fetchone()
-        conn.close()
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT * FROM events
+                WHERE chat_id = ? AND is_active = 1
+                ORDER BY id DESC
+                LIMIT 1
+                """,
+                (chat_id,),
+            )
+            row = cur.fetchone()
         return row
 
     def ensure_player(self, event_id: int, user_id: int, *, chat_id: int) -> None:
         now = int(time.time())
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT OR IGNORE INTO event_players(event_id, chat_id, user_id, joined_at)
-            VALUES (?, ?, ?, ?)
-            """,
-            (event_id, chat_id, user_id, now),
-        )
-        cur.execute(
-            """
-            INSERT OR IGNORE INTO player_prefs(event_id, user_id, auto_queue)
-            VALUES (?, ?, 1)
-            """,
-            (event_id, user_id),
-        )
-        conn.commit()
-        conn.close()
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                INSERT OR IGNORE INTO event_players(event_id, chat_id, user_id, joined_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (event_id, chat_id, user_id, now),
+            )
+            cur.execute(
+                """
+                INSERT OR IGNORE INTO player_prefs(event_id, user_id, auto_queue)
+                VALUES (?, ?, 1)
+                """,
+                (event_id, user_id),
+            )
+            conn.commit()
+        with self._boards_lock:
+            board = self._boards.get(event_id)
+            if board and user_id not in board.stats:
+                board.put({"user_id": user_id})
 
     def remove_player(self, event_id: int, user_id: int) -> None:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            "DELETE FROM event_players WHERE event_id = ? AND user_id = ?",
-            (event_id, user_id),
-        )
-        cur.execute(
-            "DELETE FROM player_prefs WHERE event_id = ? AND user_id = ?",
-            (event_id, user_id),
-        )
-        conn.commit()
-        conn.close()
+        self.results.discard(event_id, user_id)
+        with self._boards_lock:
+            board = self._boards.get(event_id)
+            if board:
+                board.remove(user_id)
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "DELETE FROM event_players WHERE event_id = ? AND user_id = ?",
+                (event_id, user_id),
+            )
+            cur.execute(
+                "DELETE FROM player_prefs WHERE event_id = ? AND user_id = ?",
+                (event_id, user_id),
+            )
+            conn.commit()
 
     def set_auto_queue(self, event_id: int, user_id: int, auto_queue: int) -> None:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO player_prefs(event_id, user_id, auto_queue)
-            VALUES (?, ?, ?)
-            ON CONFLICT(event_id, user_id) DO UPDATE SET auto_queue=excluded.auto_queue
-            """,
-            (event_id, user_id, int(auto_queue)),
-        )
-        conn.commit()
-        conn.close()
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                INSERT INTO player_prefs(event_id, user_id, auto_queue)
+                VALUES (?, ?, ?)
+                ON CONFLICT(event_id, user_id) DO UPDATE SET auto_queue=excluded.auto_queue
+                """,
+                (event_id, user_id, int(auto_queue)),
+            )
+            conn.commit()
 
     def get_auto_queue(self, event_id: int, user_id: int) -> int:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT auto_queue FROM player_prefs WHERE event_id = ? AND user_id = ?",
-            (event_id, user_id),
-        )
-        row = cur.fetchone()
-        conn.close()
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT auto_queue FROM player_prefs WHERE event_id = ? AND user_id = ?",
+                (event_id, user_id),
+            )
+            row = cur.fetchone()
         return int(row["auto_queue"]) if row else 1
 
-    def record_round_result(
-        self, event_id: int, user_id: int, points: int, is_correct: bool
-    ) -> None:
-        conn = self._connect()
-        cur = conn.cursor()
-        if is_correct:
+    # ---- ratings ----
+    def get_rating(self, user_id: int) -> float:
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT rating FROM ratings WHERE user_id = ?", (user_id,))
+            row = cur.fetchone()
+        return float(row["rating"]) if row else DEFAULT_RATING
+
+    def update_ratings(
+        self, p1_id: int, p2_id: int, p1_score: float, *, k: float = 32.0
+    ) -> tuple[float, float]:
+        """
+        Elo update after one duel. `p1_score` is 1 for a p1 win, 0 for a loss,
+        0.5 for a draw. Returns the new (p1, p2) ratings.
+        """
+        now = int(time.time())
+        with self._conn() as conn:
+            cur = conn.cursor()
             cur.execute(
+                "SELECT user_id, rating FROM ratings WHERE user_id IN (?, ?)", (p1_id, p2_id)
+            )
+            current = {int(r["user_id"]): float(r["rating"]) for r in cur.fetchall()}
+            r1 = current.get(p1_id, DEFAULT_RATING)
+            r2 = current.get(p2_id, DEFAULT_RATING)
+            expected1 = 1.0 / (1.0 + 10 ** ((r2 - r1) / 400.0))
+            r1 += k * (p1_score - expected1)
+            r2 += k * ((1.0 - p1_score) - (1.0 - expected1))
+            cur.executemany(
                 """
-                UPDATE event_players
-                SET points = points + ?, correct = correct + 1
-                WHERE event_id = ? AND user_id = ?
+                INSERT INTO ratings(user_id, rating, games, updated_at)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                  rating=excluded.rating,
+                  games=games + 1,
+                  updated_at=excluded.updated_at
                 """,
-                (points, event_id, user_id),
+                [(p1_id, r1, now), (p2_id, r2, now)],
             )
-        else:
+            conn.commit()
+        return r1, r2
+
+    # ---- TMA classroom games ----
+    def save_tma_checkpoint(self, seq: int, rooms: dict[str, dict[str, Any]]) -> None:
+        """Replace all room snapshots with `rooms`, taken at journal sequence `seq`."""
+        now = int(time.time())
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM tma_checkpoints")
+            cur.executemany(
+                "INSERT INTO tma_checkpoints(room, seq, state_json, updated_at) VALUES (?, ?, ?, ?)",
+                [(room, seq, json.dumps(state), now) for room, state in rooms.items()],
+            )
+            conn.commit()
+
+    def load_tma_checkpoint(self) -> tuple[int, dict[str, dict[str, Any]]]:
+        with self._conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT room, seq, state_json FROM tma_checkpoints")
+            rows = cur.fetchall()
+        seq = max((int(r["seq"]) for r in rows), default=0)
+        return seq, {r["room"]: json.loads(r["state_json"]) for r in rows}
+
+    def save_classroom_results(
+        self,
+        *,
+        chat_id: int,
+        started_at: int,
+        round_seconds: int,
+        players: list[dict[str, Any]],
+    ) -> int:
+        """Store a finished classroom game as an inactive event with its players' totals."""
+        now = int(time.time())
+        with self._conn() as conn:
+            cur = conn.cursor()
             cur.execute(
                 """
-                UPDATE event_players
-                SET points = points + ?, wrong = wrong + 1
-                WHERE event_id = ? AND user_id = ?
+                INSERT INTO events(chat_id, started_at, ends_at, phase_seconds, is_active)
+                VALUES (?, ?, ?, ?, 0)
                 """,
-                (points, event_id, user_id),
+                (chat_id, started_at, now, round_seconds),
             )
-        conn.commit()
-        conn.close()
+            event_id = int(cur.lastrowid)
+            cur.executemany(
+                """
+                INSERT INTO event_players(event_id, chat_id, user_id, joined_at, points, correct, wrong)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        event_id,
+                        chat_id,
+                        int(p["user_id"]),
+                        started_at,
+                        int(p["score"]),
+                        int(p["correct"]),
+                        int(p["wrong"]),
+                    )
+                    for p in players
+                ],
+            )
+            conn.commit()
+        return event_id
+
+    # ---- results (write-behind, see write_behind.ResultBuffer) ----
+    def record_round_result(
+        self, event_id: int, user_id: int, points: int, is_correct: bool
+    ) -> None:
+        delta = {
+            "points": points,
+            "correct": 1 if is_correct else 0,
+            "wrong": 0 if is_correct else 1,
+        }
+        # one critical section: a cold _board() load in between would already
+        # include this delta via results.for_event and then count it twice
+        with self._boards_lock:
+            self.results.add(event_id, user_id, **delta)
+            board = self._boards.get(event_id)
+            if board:
+                board.add(user_id, **delta)
 
     def record_duel_win_loss(
         self, event_id: int, winner_id: Optional[int], loser_id: Optional[int]
     ) -> None:
-        conn = self._connect()
-        cur = conn.cursor()
-        if winner_id is not None:
-            cur.execute(
-                "UPDATE event_players SET wins = wins + 1 WHERE event_id = ? AND user_id = ?",
-                (event_id, winner_id),
-            )
-        if loser_id is not None:
-            cur.execute(
-                "UPDATE event_players SET losses = losses + 1 WHERE event_id = ? AND user_id = ?",
-                (event_id, loser_id),
-            )
-        conn.commit()
-        conn.close()
-
-    def leaderboard(self, event_id: int, limit: int = 10) -> list[sqlite3.Row]:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT user_id, wins, losses, points, correct, wrong
-            FROM event_players
-            WHERE event_id = ?
-            ORDER BY wins DESC, points DESC, correct DESC
-            LIMIT ?
-            """,
-            (event_id, limit),
-        )
-        rows = cur.fetchall()
-        conn.close()
-        return rows
-
-    def leaderboard_all(self, event_id: int) -> list[sqlite3.Row]:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT user_id, wins, losses, points, correct, wrong
-            FROM event_players
-            WHERE event_id = ?
-            ORDER BY wins DESC, points DESC, correct DESC
-            """,
-            (event_id,),
-        )
-        rows = cur.fetchall()
-        conn.close()
-        return rows
-
-    def get_player_stats(self, event_id: int, user_id: int) -> Optional[sqlite3.Row]:
-        conn = self._connect()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT user_id, wins, losses, points, correct, wrong
-            FROM event_players
-            WHERE event_id = ? AND user_id = ?
-            """,
-            (event_id, user_id),
-        )
-        row = cur.fetchone()
-        conn.close()
-        return row
-
-
+        with self._boards_lock:
+            board = self._boards.get(event_id)
+            if winner_id is not None:
+                self.results.add(event_id, winner_id, wins=1)
+                if board:
+                    board.add(winner_id, wins=1)
+            if loser_id is not None:
+                self.results.add(event_id, loser_id, losses=1)
+                if board:
+                    board.add(loser_id, losses=1)
+
+    def flush_results(self) -> int:
+        """Write pending result deltas in one transaction; returns rows written."""
+        # Reads keep overlaying the taken rows until settle(), so no board lock
+        # is held across the write; only cold _board() loads wait for it.
+        with self._flush_lock:
+            rows = self.results.take()
+            if not rows:
+                return 0
+            try:
+                with self._conn() as conn:
+                    conn.executemany(
+                        """
+                        UPDATE event_players
+                        SET points = points + ?,
+                            correct = correct + ?,
+                            wrong = wrong + ?,
+                            wins = wins + ?,
+                            losses = losses + ?
+                        WHERE event_id = ? AND user_id = ?
+                        """,
+                        rows,
+                    )
+                    conn.commit()
+            except Exception:
+                self.results.restore()
+                raise
+            self.results.settle()
+        self.results.flushes += 1
+        self.results.rows_flushed += len(rows)
+        return len(rows)
+
+    # ---- leaderboard (in-memory, see ranking.EventBoard) ----
+    def _board(self, event_id: int) -> EventBoard:
+        # caller holds self._boards_lock
+        board = self._boards.get(event_id)
+        if board is None:
+            # under _flush_lock the rows and the in-flight overlay agree: a
+            # flush committing in between would otherwise be counted twice
+            with self._flush_lock, self._conn() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    """
+                    SELECT user_id, wins, losses, points, correct, wrong
+                    FROM event_players
+                    WHERE event_id = ?
+                    """,
+                    (event_id,),
+                )
+                rows = [dict(r) for r in cur.fetchall()]
+                pending = self.results.for_event(event_id)
+            for r in rows:
+                for k, v in pending.get(int(r["user_id"]), {}).items():
+                    r[k] += v
+            board = EventBoard(rows)
+            self._boards[event_id] = board
+        return board
+
+    def leaderboard(self, event_id: int, limit: int = 10) -> list[dict[str, Any]]:
+        with self._boards_lock:
+            return self._board(event_id).top(limit)
+
+    def leaderboard_all(self, event_id: int) -> list[dict[str, Any]]:
+        with self._boards_lock:
+            board = self._board(event_id)
+            return board.top(len(board.ranks))
+
+    def get_player_stats(self, event_id: int, user_id: int) -> Optional[dict[str, Any]]:
+        with self._boards_lock:
+            return self._board(event_id).row(user_id)
+
+    def player_rank(self, event_id: int, user_id: int) -> Optional[int]:
+        with self._boards_lock:
+            return self._board(event_id).ranks.rank_of(user_id)
+
+    def leaderboard_around(self, event_id: int, user_id: int, k: int = 2) -> list[dict[str, Any]]:
+        """Rows (with "rank") for up to k players above and below `user_id`."""
+        with self._boards_lock:
+            board = self._board(event_id)
+            return [
+                {"rank": rank, **board.stats[uid]}
+                for rank, uid in board.ranks.around(user_id, k)
+            ]
+
+    def standing(
+        self, event_id: int, user_id: int, top_n: int = 10
+    ) -> tuple[Optional[int], Optional[dict[str, Any]], list[dict[str, Any]]]:
+        """(rank, own row, top rows) in one call, for recap/leaderboard screens."""
+        with self._boards_lock:
+            board = self._board(event_id)
+            return board.ranks.rank_of(user_id), board.row(user_id), board.top(top_n)
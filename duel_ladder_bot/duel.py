@@ -9,36 +9,38 @@ from telegram.ext import ContextTypes
 from . import state
 from .config import (
     DEFAULT_ROUNDS_PER_DUEL,
+    ELO_K,
     DEFAULT_ROUND_SECONDS,
     GLOBAL_CHAT_ID,
     PRE_DUEL_COUNTDOWN_SECONDS,
     REST_BETWEEN_DUELS_SECONDS,
-    TASK_TYPES,
 )
 from .helpers import (
     build_post_duel_summary,
     countdown_edit_message,
     current_task_type,
     display_name,
+    gather_isolated,
     safe_answer_cbq,
     score_points,
 )
 from .keyboards import kb_options, reply_kb_main
-from .runtime import db
+from .outbox import PRIO_QUESTION, PRIO_REVEAL
+from .runtime import adb, events, outbox, questions, timers
 
 
 # ----------------------------
 # Matchmaking (non-stop)
 # ----------------------------
 async def maybe_enqueue_and_match(uid: int, context: ContextTypes.DEFAULT_TYPE) -> None:
-    ev = db.get_active_event(chat_id=GLOBAL_CHAT_ID)
+    ev = await events.active(GLOBAL_CHAT_ID)
     if not ev:
         return
     event_id = int(ev["id"])
 
-    if not db.get_player_stats(event_id=event_id, user_id=uid):
+    if not await adb.get_player_stats(event_id=event_id, user_id=uid):
         return
-    if db.get_auto_queue(event_id=event_id, user_id=uid) != 1:
+    if await adb.get_auto_queue(event_id=event_id, user_id=uid) != 1:
         return
     if uid in state.user_to_duel:
         return
@@ -50,17 +52,20 @@ async def maybe_enqueue_and_match(uid: int, context: ContextTypes.DEFAULT_TYPE)
             phase_seconds=int(ev["phase_seconds"]),
         )
 
-    if uid not in state.global_event.queue:
-        state.global_event.queue.append(uid)
-        await context.bot.send_message(
-            chat_id=uid, text="🔎 Searching for an opponent…", reply_markup=reply_kb_main()
+    rating = await adb.get_rating(uid)
+    if state.global_event.queue.push(uid, rating):
+        await outbox.send_message(
+            context.bot,
+            chat_id=uid,
+            text="🔎 Searching for an opponent…",
+            reply_markup=reply_kb_main(),
         )
 
     await try_matchmake(context)
 
 
 async def try_matchmake(context: ContextTypes.DEFAULT_TYPE) -> None:
-    ev = db.get_active_event(chat_id=GLOBAL_CHAT_ID)
+    ev = await events.active(GLOBAL_CHAT_ID)
     if not ev:
         return
     event_id = int(ev["id"])
@@ -68,19 +73,7 @@ async def try_matchmake(context: ContextTypes.DEFAULT_TYPE) -> None:
     if not state.global_event:
         return
 
-    while len(state.global_event.queue) >= 2:
-        p1 = state.global_event.queue.pop(0)
-        p2 = None
-        for i, cand in enumerate(state.global_event.queue):
-            if cand != p1:
-                p2 = cand
-                state.global_event.queue.pop(i)
-                break
-
-        if p2 is None:
-            state.global_event.queue.insert(0, p1)
-            return
-
+    for p1, p2 in state.global_event.queue.take_pairs():
         if p1 in state.user_to_duel or p2 in state.user_to_duel:
             continue
 
@@ -102,6 +95,12 @@ async def try_matchmake(context: ContextTypes.DEFAULT_TYPE) -> None:
         context.application.create_task(start_duel_flow(duel_id, context))
 
 
+async def matchmake_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    # search windows widen with waiting time, so pairs can appear without new arrivals
+    if state.global_event and len(state.global_event.queue) >= 2:
+        await try_matchmake(context)
+
+
 async def start_duel_flow(duel_id: int, context: ContextTypes.DEFAULT_TYPE) -> None:
     duel = state.active_duels.get(duel_id)
     if not duel or duel.is_done:
@@ -109,22 +108,22 @@ async def start_duel_flow(duel_id: int, context: ContextTypes.DEFAULT_TYPE) -> N
 
     intro = (
         "⚔️ <b>Duel found!</b>\n\n"
-        f"👥 <b>{html.escape(display_name(duel.p1_id))}</b> vs <b>{html.escape(display_name(duel.p2_id))}</b>\n"
+        f"👥 <b>{html.escape(await display_name(duel.p1_id))}</b> vs <b>{html.escape(await display_name(duel.p2_id))}</b>\n"
         f"🧩 Mode: <b>{html.escape(duel.task_type)}</b>\n"
         f"🔢 Rounds: <b>{duel.rounds_total}</b>\n\n"
         "Rest a bit — starting soon…"
     )
-    await context.bot.send_message(
-        chat_id=duel.p1_id,
-        text=intro,
-        parse_mode="HTML",
-        reply_markup=reply_kb_main(),
-    )
-    await context.bot.send_message(
-        chat_id=duel.p2_id,
-        text=intro,
-        parse_mode="HTML",
-        reply_markup=reply_kb_main(),
+    await gather_isolated(
+        *(
+            outbox.send_message(
+                context.bot,
+                chat_id=uid,
+                text=intro,
+                parse_mode="HTML",
+                reply_markup=reply_kb_main(),
+            )
+            for uid in (duel.p1_id, duel.p2_id)
+        )
     )
 
     # Countdown (1 message edited per user)
@@ -146,61 +145,66 @@ async def run_next_round(duel: state.DuelState, context: ContextTypes.DEFAULT_TY
         await finish_duel(duel, context)
         return
 
-    q = db.build_question(duel.task_type, k_options=4)
-    if not q:
-        for t in TASK_TYPES:
-            q = db.build_question(t, k_options=4)
-            if q:
-                duel.task_type = t
-                break
-
-    if not q:
+    q = await questions.take(duel.task_type)
+    if q:
+        duel.task_type = q["task_type"]
+    else:
         msg = "⚠️ Not enough vocabulary in DB to generate questions."
-        await context.bot.send_message(chat_id=duel.p1_id, text=msg, reply_markup=reply_kb_main())
-        await context.bot.send_message(chat_id=duel.p2_id, text=msg, reply_markup=reply_kb_main())
+        await gather_isolated(
+            *(
+                outbox.send_message(
+                    context.bot, chat_id=uid, text=msg, reply_markup=reply_kb_main()
+                )
+                for uid in (duel.p1_id, duel.p2_id)
+            )
+        )
         await finish_duel(duel, context, force_draw=True)
         return
 
     duel.active_question = q
     duel.round_started_at = time.time()
+    duel.round_started_at_by_user = {}
     duel.answers = {}
+    duel.revealed = False
     duel.msg_id_by_user = {}
 
+    names = {uid: await display_name(uid) for uid in (duel.p1_id, duel.p2_id)}
+
     def round_header(opp_uid: int) -> str:
         return (
             f"🧠 <b>Round {duel.round_idx + 1}/{duel.rounds_total}</b>\n"
-            f"👤 Opponent: <b>{html.escape(display_name(opp_uid))}</b>\n"
+            f"👤 Opponent: <b>{html.escape(names[opp_uid])}</b>\n"
             f"⭐ Score: <b>{duel.p1_score} - {duel.p2_score}</b>\n\n"
         )
 
     kb = kb_options(duel.duel_id, duel.round_idx, q["options"])
-    m1 = await context.bot.send_message(
-        chat_id=duel.p1_id,
-        text=round_header(duel.p2_id) + q["prompt"],
-        parse_mode="HTML",
-        reply_markup=kb,
-    )
-    m2 = await context.bot.send_message(
-        chat_id=duel.p2_id,
-        text=round_header(duel.p1_id) + q["prompt"],
-        parse_mode="HTML",
-        reply_markup=kb,
+
+    async def send_round(uid: int, opp_uid: int) -> None:
+        m = await outbox.send_message(
+            context.bot,
+            priority=PRIO_QUESTION,
+            chat_id=uid,
+            text=round_header(opp_uid) + q["prompt"],
+            parse_mode="HTML",
+            reply_markup=kb,
+        )
+        # latency is measured from this player's own delivery, not the shared start
+        duel.round_started_at_by_user[uid] = time.time()
+        duel.msg_id_by_user[uid] = m.message_id
+
+    await gather_isolated(
+        send_round(duel.p1_id, duel.p2_id),
+        send_round(duel.p2_id, duel.p1_id),
     )
-    duel.msg_id_by_user[duel.p1_id] = m1.message_id
-    duel.msg_id_by_user[duel.p2_id] = m2.message_id
 
-    duel.timer_job = context.job_queue.run_once(
-        end_round_job,
-        when=duel.round_seconds,
-        data={"duel_id": duel.duel_id, "round_idx": duel.round_idx},
+    duel.timer = timers.call_later(
+        duel.round_seconds, end_round, duel.duel_id, duel.round_idx, context
     )
 
 
-async def end_round_job(context: ContextTypes.DEFAULT_TYPE) -> None:
-    duel_id = context.job.data["duel_id"]
-    round_idx = context.job.data["round_idx"]
+async def end_round(duel_id: int, round_idx: int, context: ContextTypes.DEFAULT_TYPE) -> None:
     duel = state.active_duels.get(duel_id)
-    if not duel or duel.is_done or duel.round_idx != round_idx:
+    if not duel or duel.is_done or duel.round_idx != round_idx or duel.revealed:
         return
     await reveal_and_advance(duel, context, timed_out=True)
 
@@ -208,6 +212,9 @@ async def end_round_job(context: ContextTypes.DEFAULT_TYPE) -> None:
 async def reveal_and_advance(
     duel: state.DuelState, context: ContextTypes.DEFAULT_TYPE, timed_out: bool
 ) -> None:
+    if duel.revealed:
+        return
+    duel.revealed = True
     q = duel.active_question
     if not q:
         await finish_duel(duel, context, force_draw=True)
@@ -229,8 +236,8 @@ async def reveal_and_advance(
     p1_line, p1_pts, p1_ok = eval_user(duel.p1_id)
     p2_line, p2_pts, p2_ok = eval_user(duel.p2_id)
 
-    db.record_round_result(duel.event_id, duel.p1_id, p1_pts, p1_ok)
-    db.record_round_result(duel.event_id, duel.p2_id, p2_pts, p2_ok)
+    await adb.record_round_result(duel.event_id, duel.p1_id, p1_pts, p1_ok)
+    await adb.record_round_result(duel.event_id, duel.p2_id, p2_pts, p2_ok)
 
     duel.p1_score += p1_pts
     duel.p2_score += p2_pts
@@ -239,30 +246,32 @@ async def reveal_and_advance(
     result = (
         f"{header}\n\n"
         f"✅ Correct answer: <b>{html.escape(str(correct_text))}</b>\n\n"
-        f"{html.escape(display_name(duel.p1_id))}: {html.escape(p1_line)}\n"
-        f"{html.escape(display_name(duel.p2_id))}: {html.escape(p2_line)}\n\n"
+        f"{html.escape(await display_name(duel.p1_id))}: {html.escape(p1_line)}\n"
+        f"{html.escape(await display_name(duel.p2_id))}: {html.escape(p2_line)}\n\n"
         f"⭐ Score: <b>{duel.p1_score} - {duel.p2_score}</b>"
     )
 
-    for uid in [duel.p1_id, duel.p2_id]:
-        msg_id = duel.msg_id_by_user.get(uid)
-        if msg_id:
-            try:
-                await context.bot.edit_message_text(
-                    chat_id=uid,
-                    message_id=msg_id,
-                    text=result,
-                    parse_mode="HTML",
-                )
-            except Exception:
-                pass
+    await gather_isolated(
+        *(
+            outbox.edit_message_text(
+                context.bot,
+                priority=PRIO_REVEAL,
+                chat_id=uid,
+                message_id=duel.msg_id_by_user[uid],
+                text=result,
+                parse_mode="HTML",
+            )
+            for uid in (duel.p1_id, duel.p2_id)
+            if duel.msg_id_by_user.get(uid)
+        )
+    )
 
     duel.round_idx += 1
     duel.active_question = None
     duel.msg_id_by_user = {}
-    duel.timer_job = None
+    duel.timer = None
 
-    await asyncio.sleep(0.7)
+    await timers.sleep(0.7)
     await run_next_round(duel, context)
 
 
@@ -282,43 +291,43 @@ async def finish_duel(
             winner, loser = duel.p2_id, duel.p1_id
 
     if winner is not None and loser is not None:
-        db.record_duel_win_loss(duel.event_id, winner_id=winner, loser_id=loser)
+        await adb.record_duel_win_loss(duel.event_id, winner_id=winner, loser_id=loser)
+    if not force_draw:
+        p1_score = 1.0 if winner == duel.p1_id else 0.0 if winner == duel.p2_id else 0.5
+        await adb.update_ratings(duel.p1_id, duel.p2_id, p1_score, k=ELO_K)
 
     if winner is None:
         outcome = "🤝 <b>Draw!</b>"
     else:
-        outcome = f"🏅 Winner: <b>{html.escape(display_name(winner))}</b>"
+        outcome = f"🏅 Winner: <b>{html.escape(await display_name(winner))}</b>"
 
     text = (
         "🏁 <b>Duel finished</b>\n\n"
-        f"👥 {html.escape(display_name(duel.p1_id))} vs {html.escape(display_name(duel.p2_id))}\n"
+        f"👥 {html.escape(await display_name(duel.p1_id))} vs {html.escape(await display_name(duel.p2_id))}\n"
         f"⭐ Final score: <b>{duel.p1_score} - {duel.p2_score}</b>\n"
         f"{outcome}\n"
     )
 
-    await context.bot.send_message(
-        chat_id=duel.p1_id, text=text, parse_mode="HTML", reply_markup=reply_kb_main()
-    )
-    await context.bot.send_message(
-        chat_id=duel.p2_id, text=text, parse_mode="HTML", reply_markup=reply_kb_main()
-    )
+    async def send_finish(uid: int) -> None:
+        await outbox.send_message(
+            context.bot,
+            chat_id=uid, text=text, parse_mode="HTML", reply_markup=reply_kb_main()
+        )
+        # Post-duel mini leaderboard recap
+        summary = await build_post_duel_summary(duel.event_id, uid)
+        await outbox.send_message(
+            context.bot,
+            chat_id=uid, text=summary, parse_mode="HTML", reply_markup=reply_kb_main()
+        )
 
-    # Post-duel mini leaderboard recap
-    summary_p1 = build_post_duel_summary(duel.event_id, duel.p1_id)
-    summary_p2 = build_post_duel_summary(duel.event_id, duel.p2_id)
-    await context.bot.send_message(
-        chat_id=duel.p1_id, text=summary_p1, parse_mode="HTML", reply_markup=reply_kb_main()
-    )
-    await context.bot.send_message(
-        chat_id=duel.p2_id, text=summary_p2, parse_mode="HTML", reply_markup=reply_kb_main()
-    )
+    await gather_isolated(send_finish(duel.p1_id), send_finish(duel.p2_id))
 
     state.active_duels.pop(duel.duel_id, None)
     state.user_to_duel.pop(duel.p1_id, None)
     state.user_to_duel.pop(duel.p2_id, None)
 
     # Rest between battles (non-stop pacing)
-    await asyncio.sleep(REST_BETWEEN_DUELS_SECONDS)
+    await timers.sleep(REST_BETWEEN_DUELS_SECONDS)
 
     # Auto-continue (non-stop)
     await maybe_enqueue_and_match(duel.p1_id, context)
@@ -356,20 +365,18 @@ async def on_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         return
     if uid not in (duel.p1_id, duel.p2_id):
         return
-    if duel.round_idx != round_idx:
+    if duel.round_idx != round_idx or duel.revealed:
         return
     if uid in duel.answers:
         return
 
-    latency_ms = int((time.time() - duel.round_started_at) * 1000)
+    started_at = duel.round_started_at_by_user.get(uid, duel.round_started_at)
+    latency_ms = max(0, int((time.time() - started_at) * 1000))
     duel.answers[uid] = {"choice": choice_idx, "latency_ms": latency_ms}
 
     if duel.p1_id in duel.answers and duel.p2_id in duel.answers:
-        try:
-            if duel.timer_job:
-                duel.timer_job.schedule_removal()
-        except Exception:
-            pass
+        if duel.timer:
+            duel.timer.cancel()
         await reveal_and_advance(duel, context, timed_out=False)
 
 
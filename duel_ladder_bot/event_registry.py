@@ -0,0 +1,49 @@
+"""
+In-memory registry of the active event per chat.
+
+Handlers ask `events.active(chat_id)` instead of querying `events` on every
+update. The cache is filled on the first miss and replaced by `start()` /
+`stop()`, which are the only code paths that change which event is active.
+"""
+
+from typing import Any, Optional
+
+from .async_db import AsyncDB
+
+
+class EventRegistry:
+    def __init__(self, adb: AsyncDB):
+        self.adb = adb
+        self._active: dict[int, Optional[dict[str, Any]]] = {}
+        # bumped on every start/stop so a slow cold read can't overwrite newer state
+        self._generation = 0
+
+    async def active(self, chat_id: int) -> Optional[dict[str, Any]]:
+        if chat_id in self._active:
+            return self._active[chat_id]
+        generation = self._generation
+        row = await self.adb.get_active_event(chat_id=chat_id)
+        ev = dict(row) if row else None
+        if generation == self._generation:
+            self._active[chat_id] = ev
+        return ev
+
+    async def start(self, minutes: int, phase_seconds: int, *, chat_id: int) -> dict[str, Any]:
+        await self.adb.create_event(minutes=minutes, phase_seconds=phase_seconds, chat_id=chat_id)
+        self.invalidate(chat_id)
+        ev = await self.active(chat_id)
+        assert ev is not None  # just created
+        return ev
+
+    async def stop(self, *, chat_id: int) -> None:
+        self._generation += 1
+        await self.adb.deactivate_events(chat_id=chat_id)
+        self._generation += 1
+        self._active[chat_id] = None
+
+    def invalidate(self, chat_id: Optional[int] = None) -> None:
+        self._generation += 1
+        if chat_id is None:
+            self._active.clear()
+        else:
+            self._active.pop(chat_id, None)
@@ -1,5 +1,4 @@
 import html
-import time
 from typing import Tuple
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, WebAppInfo
@@ -17,7 +16,7 @@ from ..config import (
 )
 from ..helpers import cache_user, current_task_type, require_private
 from ..keyboards import reply_kb_main
-from ..runtime import BOT_USERNAME, db, get_tma_url, set_tma_url
+from ..runtime import BOT_USERNAME, adb, events, get_tma_url, questions, set_tma_url
 
 
 async def cmd_admin_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -137,8 +136,9 @@ async def cmd_event_start(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     await stop_event(context)
 
-    eid = db.create_event(minutes=minutes, phase_seconds=phase_seconds, chat_id=GLOBAL_CHAT_ID)
-    ends_at = int(time.time()) + minutes * 60
+    ev = await events.start(minutes=minutes, phase_seconds=phase_seconds, chat_id=GLOBAL_CHAT_ID)
+    eid = int(ev["id"])
+    ends_at = int(ev["ends_at"])
 
     state.global_event = state.GlobalEventState(
         event_id=eid, ends_at=ends_at, phase_seconds=phase_seconds
@@ -191,7 +191,8 @@ async def stop_event(context: ContextTypes.DEFAULT_TYPE) -> None:
         except Exception:
             pass
         state.global_event.queue.clear()
-    db.deactivate_events(chat_id=GLOBAL_CHAT_ID)
+    await adb.flush_results()
+    await events.stop(chat_id=GLOBAL_CHAT_ID)
     state.global_event = None
 
 
@@ -232,9 +233,10 @@ async def cmd_addword(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     if not word:
         await update.effective_message.reply_text("Word is required.")
         return
-    vid = db.add_word(word, definition, translation, synonyms, antonyms, example)
+    vid = await adb.add_word(word, definition, translation, synonyms, antonyms, example)
+    questions.clear()
     await update.effective_message.reply_text(
-        f"Added vocab id={vid}. Total words: {db.count_words()}"
+        f"Added vocab id={vid}. Total words: {await adb.count_words()}"
     )
 
 
@@ -261,18 +263,20 @@ async def cmd_importwords(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             if not word:
                 bad += 1
                 continue
-            db.add_word(word, definition, translation, synonyms, antonyms, example)
+            await adb.add_word(word, definition, translation, synonyms, antonyms, example)
             ok += 1
         except Exception:
             bad += 1
+    if ok:
+        questions.clear()
     await update.effective_message.reply_text(
-        f"Imported: {ok}, failed: {bad}. Total words: {db.count_words()}"
+        f"Imported: {ok}, failed: {bad}. Total words: {await adb.count_words()}"
     )
 
 
 async def cmd_words_count(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await cache_user(update)
-    await update.effective_message.reply_text(f"Words in DB: {db.count_words()}")
+    await update.effective_message.reply_text(f"Words in DB: {await adb.count_words()}")
 
 
 async def cmd_vocab_reset(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -286,7 +290,7 @@ async def cmd_vocab_reset(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.effective_message.reply_text("⛔ Admins only.")
         return
 
-    ev = db.get_active_event(chat_id=GLOBAL_CHAT_ID)
+    ev = await events.active(GLOBAL_CHAT_ID)
     if ev:
         await update.effective_message.reply_text(
             "⛔ Stop the active event first with /event_stop, then run /vocab_reset CONFIRM."
@@ -300,10 +304,11 @@ async def cmd_vocab_reset(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return
 
-    before = db.count_words()
-    db.wipe_words()
+    before = await adb.count_words()
+    await adb.wipe_words()
+    questions.clear()
     await update.effective_message.reply_text(
-        f"✅ Vocab wiped. Deleted {before} rows. Words in DB now: {db.count_words()}."
+        f"✅ Vocab wiped. Deleted {before} rows. Words in DB now: {await adb.count_words()}."
     )
 
 
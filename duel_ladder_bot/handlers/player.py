@@ -7,7 +7,7 @@ from ..config import GLOBAL_CHAT_ID
 from ..dashboard import send_dashboard
 from ..helpers import cache_user, display_name, require_private
 from ..keyboards import reply_kb_main
-from ..runtime import db, get_tma_url
+from ..runtime import adb, events, get_tma_url
 from ..duel import maybe_enqueue_and_match
 from ..solo import cmd_solo, cmd_solo_stop
 
@@ -81,22 +81,22 @@ async def cmd_leave(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.effective_message.reply_text("Open the bot in a private chat 🙂")
         return
 
-    ev = db.get_active_event(chat_id=GLOBAL_CHAT_ID)
+    ev = await events.active(GLOBAL_CHAT_ID)
     if not ev:
         await update.effective_message.reply_text("⛔ No active event.")
         return
 
     event_id = int(ev["id"])
     uid = update.effective_user.id
-    if not db.get_player_stats(event_id=event_id, user_id=uid):
+    if not await adb.get_player_stats(event_id=event_id, user_id=uid):
         await update.effective_message.reply_text("You’re not joined. Tap 🎮 Join & Play.")
         return
 
-    db.set_auto_queue(event_id=event_id, user_id=uid, auto_queue=0)
+    await adb.set_auto_queue(event_id=event_id, user_id=uid, auto_queue=0)
     from .. import state  # local import to avoid cycles
 
-    if state.global_event and uid in state.global_event.queue:
-        state.global_event.queue = [u for u in state.global_event.queue if u != uid]
+    if state.global_event:
+        state.global_event.queue.remove(uid)
 
     await update.effective_message.reply_text(
         "🚪 Left the queue. You won’t be auto-matched (use ▶️ Resume to queue again).",
@@ -110,7 +110,7 @@ async def cmd_join(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.effective_message.reply_text("Open the bot in a private chat 🙂")
         return
 
-    ev = db.get_active_event(chat_id=GLOBAL_CHAT_ID)
+    ev = await events.active(GLOBAL_CHAT_ID)
     if not ev:
         await update.effective_message.reply_text("⛔ No active event.")
         return
@@ -118,8 +118,8 @@ async def cmd_join(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     event_id = int(ev["id"])
     uid = update.effective_user.id
 
-    db.ensure_player(event_id=event_id, user_id=uid, chat_id=GLOBAL_CHAT_ID)
-    db.set_auto_queue(event_id=event_id, user_id=uid, auto_queue=1)
+    await adb.ensure_player(event_id=event_id, user_id=uid, chat_id=GLOBAL_CHAT_ID)
+    await adb.set_auto_queue(event_id=event_id, user_id=uid, auto_queue=1)
 
     await update.effective_message.reply_text(
         "🎮 <b>Joined!</b>\n" "🔥 Non-stop mode is ON — matchmaking starts now…",
@@ -134,21 +134,21 @@ async def cmd_pause(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not require_private(update):
         await update.effective_message.reply_text("Open the bot in a private chat 🙂")
         return
-    ev = db.get_active_event(chat_id=GLOBAL_CHAT_ID)
+    ev = await events.active(GLOBAL_CHAT_ID)
     if not ev:
         await update.effective_message.reply_text("No active event.")
         return
     event_id = int(ev["id"])
     uid = update.effective_user.id
-    if not db.get_player_stats(event_id=event_id, user_id=uid):
+    if not await adb.get_player_stats(event_id=event_id, user_id=uid):
         await update.effective_message.reply_text("You are not joined. Tap 🎮 Join & Play.")
         return
 
-    db.set_auto_queue(event_id=event_id, user_id=uid, auto_queue=0)
+    await adb.set_auto_queue(event_id=event_id, user_id=uid, auto_queue=0)
     from .. import state  # local import to avoid handler import cycles
 
-    if state.global_event and uid in state.global_event.queue:
-        state.global_event.queue = [u for u in state.global_event.queue if u != uid]
+    if state.global_event:
+        state.global_event.queue.remove(uid)
 
     await update.effective_message.reply_text(
         "⏸ Paused. You will not be auto-matched.", reply_markup=reply_kb_main()
@@ -160,17 +160,17 @@ async def cmd_resume(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     if not require_private(update):
         await update.effective_message.reply_text("Open the bot in a private chat 🙂")
         return
-    ev = db.get_active_event(chat_id=GLOBAL_CHAT_ID)
+    ev = await events.active(GLOBAL_CHAT_ID)
     if not ev:
         await update.effective_message.reply_text("No active event.")
         return
     event_id = int(ev["id"])
     uid = update.effective_user.id
-    if not db.get_player_stats(event_id=event_id, user_id=uid):
+    if not await adb.get_player_stats(event_id=event_id, user_id=uid):
         await update.effective_message.reply_text("Join first: 🎮 Join & Play.")
         return
 
-    db.set_auto_queue(event_id=event_id, user_id=uid, auto_queue=1)
+    await adb.set_auto_queue(event_id=event_id, user_id=uid, auto_queue=1)
     await update.effective_message.reply_text(
         "▶️ Resumed. Matchmaking starts…", reply_markup=reply_kb_main()
     )
@@ -182,23 +182,23 @@ async def cmd_mystats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     if not require_private(update):
         await update.effective_message.reply_text("Open the bot in a private chat 🙂")
         return
-    ev = db.get_active_event(chat_id=GLOBAL_CHAT_ID)
+    ev = await events.active(GLOBAL_CHAT_ID)
     if not ev:
         await update.effective_message.reply_text("No active event.")
         return
     event_id = int(ev["id"])
     uid = update.effective_user.id
-    row = db.get_player_stats(event_id=event_id, user_id=uid)
+    row = await adb.get_player_stats(event_id=event_id, user_id=uid)
     if not row:
         await update.effective_message.reply_text("Not joined. Tap 🎮 Join & Play.")
         return
 
-    autoq = db.get_auto_queue(event_id=event_id, user_id=uid)
+    autoq = await adb.get_auto_queue(event_id=event_id, user_id=uid)
     mode = "🔥 Non-stop ON" if autoq == 1 else "⏸ Paused"
 
     text = (
         "<b>📊 Your stats</b>\n\n"
-        f"👤 {html.escape(display_name(uid))}\n"
+        f"👤 {html.escape(await display_name(uid))}\n"
         f"⚙️ Mode: <b>{mode}</b>\n\n"
         f"✅ Wins: <b>{row['wins']}</b>\n"
         f"❌ Losses: <b>{row['losses']}</b>\n"
@@ -216,7 +216,7 @@ async def cmd_leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.effective_message.reply_text("Open the bot in a private chat 🙂")
         return
 
-    ev = db.get_active_event(chat_id=GLOBAL_CHAT_ID)
+    ev = await events.active(GLOBAL_CHAT_ID)
     if not ev:
         await update.effective_message.reply_text("⛔ No active event.")
         return
@@ -224,26 +224,17 @@ async def cmd_leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     event_id = int(ev["id"])
     uid = update.effective_user.id
 
-    all_rows = db.leaderboard_all(event_id)
-    if not all_rows:
+    my_rank, my_row, top = await adb.standing(event_id, uid, top_n=10)
+    if not top:
         await update.effective_message.reply_text("Leaderboard is empty. Join & play!")
         return
 
-    my_rank = None
-    my_row = None
-    for idx, r in enumerate(all_rows, start=1):
-        if int(r["user_id"]) == uid:
-            my_rank = idx
-            my_row = r
-            break
-
-    top = all_rows[:10]
     medals = {1: "🥇", 2: "🥈", 3: "🥉"}
 
     lines = ["<b>🏆 Leaderboard</b>", ""]
     for idx, r in enumerate(top, start=1):
         prefix = medals.get(idx, f"{idx}.")
-        name = html.escape(display_name(int(r["user_id"])))
+        name = html.escape(await display_name(int(r["user_id"])))
         row_txt = (
             f"{prefix} {name}\n   ✅ Wins: <b>{r['wins']}</b>   ⭐ Points: <b>{r['points']}</b>"
         )
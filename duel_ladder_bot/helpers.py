@@ -1,14 +1,16 @@
 import asyncio
 import html
 import time
+from typing import Any, Awaitable
 
 from telegram import Update
 from telegram.ext import ContextTypes
 
 from . import state
-from .config import TASK_TYPES
+from .config import TASK_TYPES, log
 from .keyboards import reply_kb_main
-from .runtime import db
+from .outbox import PRIO_COUNTDOWN
+from .runtime import adb, outbox, timers, users
 
 
 def require_private(update: Update) -> bool:
@@ -21,16 +23,24 @@ async def cache_user(update: Update) -> None:
     c = update.effective_chat
     if not u or not c:
         return
-    db.upsert_user(
-        user_id=u.id,
-        username=u.username or "",
-        full_name=u.full_name or "",
-        last_chat_id=c.id,
-    )
+    username = u.username or ""
+    full_name = u.full_name or ""
+    if not users.claim_write(u.id, username, full_name, c.id, int(time.time())):
+        return
+    try:
+        await adb.upsert_user(
+            user_id=u.id,
+            username=username,
+            full_name=full_name,
+            last_chat_id=c.id,
+        )
+    except Exception:
+        users.invalidate(u.id)  # retry the write on the next update
+        raise
 
 
-def display_name(user_id: int) -> str:
-    row = db.get_user(user_id)
+async def display_name(user_id: int) -> str:
+    row = await users.get(user_id)
     if not row:
         return f"User {user_id}"
     username = (row["username"] or "").strip()
@@ -68,51 +78,64 @@ async def safe_answer_cbq(update: Update) -> None:
         pass
 
 
+async def gather_isolated(*aws: Awaitable[Any]) -> list[Any]:
+    """
+    Await all concurrently (e.g. one send per duellist). A failure is logged
+    and returned as None instead of cancelling or failing the others.
+    """
+    results = await asyncio.gather(*aws, return_exceptions=True)
+    out: list[Any] = []
+    for r in results:
+        if isinstance(r, asyncio.CancelledError):
+            raise r
+        if isinstance(r, Exception):
+            log.warning("Telegram call failed: %s", r)
+            out.append(None)
+        else:
+            out.append(r)
+    return out
+
+
 async def countdown_edit_message(
     chat_id: int, seconds: int, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
     """
     Sends 1 message and edits it each second (less spam).
     """
-    msg = await context.bot.send_message(
+    msg = await outbox.send_message(
+        context.bot,
         chat_id=chat_id,
         text=f"🧘 Rest… <b>{seconds}</b> sec\nNext duel starts soon.",
         parse_mode="HTML",
         reply_markup=reply_kb_main(),
     )
     for t in range(seconds - 1, 0, -1):
-        try:
-            await context.bot.edit_message_text(
-                chat_id=chat_id,
-                message_id=msg.message_id,
-                text=f"🧘 Rest… <b>{t}</b> sec\nNext duel starts soon.",
-                parse_mode="HTML",
-                reply_markup=reply_kb_main(),
-            )
-        except Exception:
-            pass
-        await asyncio.sleep(1)
-
-
-def build_post_duel_summary(event_id: int, user_id: int) -> str:
-    all_rows = db.leaderboard_all(event_id)
-    if not all_rows:
-        return "🏆 Leaderboard is empty."
+        # not awaited: a tick that can't go out within a second is stale, so the
+        # outbox drops it (or replaces it with the next one) instead of queueing
+        outbox.post(
+            context.bot,
+            "edit_message_text",
+            priority=PRIO_COUNTDOWN,
+            ttl=1.0,
+            chat_id=chat_id,
+            message_id=msg.message_id,
+            text=f"🧘 Rest… <b>{t}</b> sec\nNext duel starts soon.",
+            parse_mode="HTML",
+            reply_markup=reply_kb_main(),
+        )
+        await timers.sleep(1)
+
 
-    rank = None
-    me = None
-    for idx, r in enumerate(all_rows, start=1):
-        if int(r["user_id"]) == user_id:
-            rank = idx
-            me = r
-            break
+async def build_post_duel_summary(event_id: int, user_id: int) -> str:
+    rank, me, top3 = await adb.standing(event_id, user_id, top_n=3)
+    if not top3:
+        return "🏆 Leaderboard is empty."
 
     medals = ["🥇", "🥈", "🥉"]
-    top3 = all_rows[:3]
     top_lines = []
     for i, r in enumerate(top3):
         top_lines.append(
-            f"{medals[i]} {html.escape(display_name(int(r['user_id'])))} — "
+            f"{medals[i]} {html.escape(await display_name(int(r['user_id'])))} — "
             f"W:{r['wins']} • Pts:{r['points']}"
         )
 
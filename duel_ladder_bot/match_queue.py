@@ -0,0 +1,63 @@
+"""
+FIFO matchmaking queue with O(1) push, pop, contains and remove.
+
+Entries live in a deque as (ticket, user_id). `_tickets` maps each queued user
+to their live ticket. `remove()` only drops the mapping, which leaves a
+tombstone in the deque. `pop()` skips tombstones, and the deque is compacted
+once tombstones outnumber live entries.
+"""
+
+from collections import deque
+from itertools import count
+from typing import Iterator, Optional
+
+
+class MatchQueue:
+    def __init__(self) -> None:
+        self._entries: deque[tuple[int, int]] = deque()
+        self._tickets: dict[int, int] = {}
+        self._next_ticket = count()
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._tickets
+
+    def __iter__(self) -> Iterator[int]:
+        """Queued user ids, oldest first."""
+        return (uid for ticket, uid in self._entries if self._tickets.get(uid) == ticket)
+
+    def push(self, user_id: int) -> bool:
+        """Append `user_id`; returns False if it was already queued."""
+        if user_id in self._tickets:
+            return False
+        ticket = next(self._next_ticket)
+        self._tickets[user_id] = ticket
+        self._entries.append((ticket, user_id))
+        return True
+
+    def pop(self) -> Optional[int]:
+        """Remove and return the oldest queued user, or None if empty."""
+        while self._entries:
+            ticket, uid = self._entries.popleft()
+            if self._tickets.get(uid) == ticket:
+                del self._tickets[uid]
+                return uid
+        return None
+
+    def remove(self, user_id: int) -> bool:
+        if self._tickets.pop(user_id, None) is None:
+            return False
+        if len(self._entries) > 2 * len(self._tickets) + 32:
+            self._compact()
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tickets.clear()
+
+    def _compact(self) -> None:
+        self._entries = deque(
+            (ticket, uid) for ticket, uid in self._entries if self._tickets.get(uid) == ticket
+        )
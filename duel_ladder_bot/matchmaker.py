@@ -0,0 +1,141 @@
+"""
+Rating-aware matchmaking queue.
+
+Queued players are kept in arrival order (a `MatchQueue`) and in rating
+buckets `bucket_width` wide. `take_pairs()` walks the queue oldest first. For
+each player it looks for the closest-rated opponent within a window that
+starts at `window` and grows by `window_growth` per second of waiting. Only
+the buckets the window covers are scanned. Once a player has waited
+`max_wait` seconds the window is unbounded, so anyone available will do.
+"""
+
+import time
+from typing import Any, Iterator, Optional
+
+from .match_queue import MatchQueue
+
+
+class Matchmaker:
+    def __init__(
+        self,
+        *,
+        bucket_width: float = 50.0,
+        window: float = 100.0,
+        window_growth: float = 20.0,
+        max_wait: float = 20.0,
+    ):
+        self.bucket_width = bucket_width
+        self.window = window
+        self.window_growth = window_growth
+        self.max_wait = max_wait
+
+        self._order = MatchQueue()
+        self._rating: dict[int, float] = {}
+        self._joined_at: dict[int, float] = {}
+        self._buckets: dict[int, set[int]] = {}
+
+        self.matches = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._gap_total = 0.0
+        self._gap_max = 0.0
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._order
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._order)
+
+    def _bucket(self, rating: float) -> int:
+        return int(rating // self.bucket_width)
+
+    def push(self, user_id: int, rating: float, now: Optional[float] = None) -> bool:
+        """Queue `user_id`; returns False if it was already queued."""
+        if not self._order.push(user_id):
+            return False
+        self._rating[user_id] = rating
+        self._joined_at[user_id] = time.monotonic() if now is None else now
+        self._buckets.setdefault(self._bucket(rating), set()).add(user_id)
+        return True
+
+    def remove(self, user_id: int) -> bool:
+        if not self._order.remove(user_id):
+            return False
+        b = self._bucket(self._rating.pop(user_id))
+        del self._joined_at[user_id]
+        members = self._buckets[b]
+        members.discard(user_id)
+        if not members:
+            del self._buckets[b]
+        return True
+
+    def clear(self) -> None:
+        self._order.clear()
+        self._rating.clear()
+        self._joined_at.clear()
+        self._buckets.clear()
+
+    def _window_for(self, user_id: int, now: float) -> Optional[float]:
+        """Allowed rating gap for `user_id` right now; None means unbounded."""
+        waited = now - self._joined_at[user_id]
+        if waited >= self.max_wait:
+            return None
+        return self.window + self.window_growth * waited
+
+    def _closest(self, user_id: int, window: Optional[float]) -> Optional[int]:
+        rating = self._rating[user_id]
+        if window is None:
+            lo, hi = min(self._buckets), max(self._buckets)
+        else:
+            lo, hi = self._bucket(rating - window), self._bucket(rating + window)
+        best: Optional[int] = None
+        best_key: tuple[float, float] = (float("inf"), 0.0)
+        for b in range(lo, hi + 1):
+            for cand in self._buckets.get(b, ()):
+                if cand == user_id:
+                    continue
+                gap = abs(self._rating[cand] - rating)
+                if window is not None and gap > window:
+                    continue
+                key = (gap, self._joined_at[cand])
+                if key < best_key:
+                    best, best_key = cand, key
+        return best
+
+    def take_pairs(self, now: Optional[float] = None) -> list[tuple[int, int]]:
+        """Remove and return every pair that can be matched now, longest-waiting first."""
+        now = time.monotonic() if now is None else now
+        pairs: list[tuple[int, int]] = []
+        for uid in list(self._order):
+            if uid not in self._order:
+                continue  # matched earlier in this pass
+            opp = self._closest(uid, self._window_for(uid, now))
+            if opp is None:
+                continue
+            self._record(now - self._joined_at[uid], abs(self._rating[uid] - self._rating[opp]))
+            self.remove(uid)
+            self.remove(opp)
+            pairs.append((uid, opp))
+        return pairs
+
+    def _record(self, wait: float, gap: float) -> None:
+        self.matches += 1
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+        self._gap_total += gap
+        self._gap_max = max(self._gap_max, gap)
+
+    def stats(self) -> dict[str, Any]:
+        n = self.matches
+        return {
+            "queued": len(self),
+            "buckets": len(self._buckets),
+            "matches": n,
+            "wait_s_avg": round(self._wait_total / n, 3) if n else 0.0,
+            "wait_s_max": round(self._wait_max, 3),
+            "rating_gap_avg": round(self._gap_total / n, 1) if n else 0.0,
+            "rating_gap_max": round(self._gap_max, 1),
+        }
@@ -0,0 +1,248 @@
+"""
+Versioned schema migrations for the SQLite database (run by `DB._init_schema`).
+
+`MIGRATIONS` is an ordered list of `(version, name, apply)` steps. `migrate()`
+reads the highest version recorded in `schema_version` and applies every newer
+step in its own `BEGIN IMMEDIATE` transaction together with its
+`schema_version` row. A step that fails leaves the database at the previous
+version, and when the bot and the TMA server open the same file at once only
+one of them applies each step (the other waits for the write lock, sees the
+row, and skips it).
+
+Steps run while the other process may be serving from the file, so they must
+be online-safe: CREATE TABLE/INDEX IF NOT EXISTS, ADD COLUMN, backfills. No
+table rewrites. Append new steps at the end; never edit or renumber one that
+has shipped.
+
+`check_query_plans()` runs EXPLAIN QUERY PLAN over the hot queries in `DB` and
+reports any that stopped using their index.
+"""
+
+import sqlite3
+import time
+from typing import Any, Callable
+
+from .config import log
+
+
+def _baseline(conn: sqlite3.Connection) -> None:
+    # the schema as it was before migrations; IF NOT EXISTS keeps it a no-op on old files
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vocab (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          word TEXT NOT NULL,
+          definition TEXT DEFAULT '',
+          translation TEXT DEFAULT '',
+          synonyms_json TEXT DEFAULT '[]',
+          antonyms_json TEXT DEFAULT '[]',
+          example TEXT DEFAULT ''
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+          user_id INTEGER PRIMARY KEY,
+          username TEXT DEFAULT '',
+          full_name TEXT DEFAULT '',
+          last_chat_id INTEGER DEFAULT NULL,
+          updated_at INTEGER NOT NULL
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS events (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          chat_id INTEGER NOT NULL,
+          started_at INTEGER NOT NULL,
+          ends_at INTEGER NOT NULL,
+          phase_seconds INTEGER NOT NULL,
+          is_active INTEGER NOT NULL DEFAULT 1
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS event_players (
+          event_id INTEGER NOT NULL,
+          chat_id INTEGER NOT NULL,
+          user_id INTEGER NOT NULL,
+          joined_at INTEGER NOT NULL,
+          wins INTEGER NOT NULL DEFAULT 0,
+          losses INTEGER NOT NULL DEFAULT 0,
+          points INTEGER NOT NULL DEFAULT 0,
+          correct INTEGER NOT NULL DEFAULT 0,
+          wrong INTEGER NOT NULL DEFAULT 0,
+          PRIMARY KEY (event_id, user_id)
+        );
+        """
+    )
+
+    # Per-event preference: auto queue for nonstop mode (1=yes, 0=pause)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS player_prefs (
+          event_id INTEGER NOT NULL,
+          user_id INTEGER NOT NULL,
+          auto_queue INTEGER NOT NULL DEFAULT 1,
+          PRIMARY KEY (event_id, user_id)
+        );
+        """
+    )
+
+    # Latest snapshot of every TMA classroom room (see tma_journal.GameJournal)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tma_checkpoints (
+          room TEXT PRIMARY KEY,
+          seq INTEGER NOT NULL,
+          state_json TEXT NOT NULL,
+          updated_at INTEGER NOT NULL
+        );
+        """
+    )
+
+    # Global Elo rating used by matchmaking (see matchmaker.Matchmaker)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ratings (
+          user_id INTEGER PRIMARY KEY,
+          rating REAL NOT NULL,
+          games INTEGER NOT NULL DEFAULT 0,
+          updated_at INTEGER NOT NULL
+        );
+        """
+    )
+
+
+def _event_indexes(conn: sqlite3.Connection) -> None:
+    # get_active_event / deactivate_events: WHERE chat_id = ? AND is_active = 1
+    # ORDER BY id DESC, answered from the index without a scan or sort
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_events_chat_active ON events(chat_id, is_active, id)"
+    )
+
+
+def _vocab_relations(conn: sqlite3.Connection) -> None:
+    # one row per synonym/antonym; vocab.synonyms_json/antonyms_json stay as a
+    # copy that add_word keeps writing, for anything still reading them
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vocab_relation (
+          vocab_id INTEGER NOT NULL,
+          kind TEXT NOT NULL,
+          term TEXT NOT NULL,
+          UNIQUE (vocab_id, kind, term)
+        )
+        """
+    )
+    for kind, column in (("synonym", "synonyms_json"), ("antonym", "antonyms_json")):
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO vocab_relation(vocab_id, kind, term)
+            SELECT v.id, '{kind}', trim(j.value)
+            FROM vocab AS v, json_each(v.{column}) AS j
+            WHERE json_valid(v.{column}) AND j.type = 'text' AND trim(j.value) != ''
+            ORDER BY v.id, j.key
+            """
+        )
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "baseline tables", _baseline),
+    (2, "events (chat_id, is_active, id) index", _event_indexes),
+    (3, "vocab_relation table", _vocab_relations),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+          version INTEGER PRIMARY KEY,
+          name TEXT NOT NULL,
+          applied_at INTEGER NOT NULL
+        )
+        """
+    )
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return int(row[0] or 0)
+
+
+def migrate(conn: sqlite3.Connection) -> list[int]:
+    """Apply pending steps; returns the versions applied by this call."""
+    if current_version(conn) >= LATEST:
+        return []
+    applied = []
+    for version, name, apply in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # re-read under the write lock: another process may have got here first
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            apply(conn)
+            conn.execute(
+                "INSERT INTO schema_version(version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, int(time.time())),
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        log.info("Applied schema migration %d (%s)", version, name)
+        applied.append(version)
+    if applied:
+        for problem in check_query_plans(conn):
+            log.warning("Query plan check: %s", problem)
+    return applied
+
+
+# name -> (query shape as issued by DB, sample params, index it must use)
+HOT_QUERIES: dict[str, tuple[str, tuple[Any, ...], str]] = {
+    "get_active_event": (
+        "SELECT * FROM events WHERE chat_id = ? AND is_active = 1 ORDER BY id DESC LIMIT 1",
+        (0,),
+        "idx_events_chat_active",
+    ),
+    "deactivate_events": (
+        "UPDATE events SET is_active = 0 WHERE chat_id = ? AND is_active = 1",
+        (0,),
+        "idx_events_chat_active",
+    ),
+    "event_board": (
+        "SELECT user_id, wins, losses, points, correct, wrong FROM event_players WHERE event_id = ?",
+        (0,),
+        "sqlite_autoindex_event_players_1",
+    ),
+    "flush_results": (
+        "UPDATE event_players SET points = points + ? WHERE event_id = ? AND user_id = ?",
+        (0, 0, 0),
+        "sqlite_autoindex_event_players_1",
+    ),
+}
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params: tuple[Any, ...] = ()) -> list[str]:
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def check_query_plans(conn: sqlite3.Connection) -> list[str]:
+    """One line per hot query that no longer uses its index or needs a sort."""
+    problems = []
+    for name, (sql, params, index) in HOT_QUERIES.items():
+        plan = query_plan(conn, sql, params)
+        if not any(index in step for step in plan):
+            problems.append(f"{name} does not use {index}: {plan}")
+        elif any("TEMP B-TREE" in step for step in plan):
+            problems.append(f"{name} sorts in a temp b-tree: {plan}")
+    return problems
@@ -0,0 +1,352 @@
+"""
+Rate-limit-aware scheduler for outgoing Telegram calls.
+
+Every send/edit from the duel engine, solo mode, helpers and the dashboard is
+queued here instead of hitting the Bot API directly:
+
+- a global token bucket and one bucket per chat keep us under Telegram's
+  flood limits (roughly 30 msg/s overall, ~1 msg/s per chat sustained);
+- items are dispatched by priority (round questions before reveals before
+  everything else before countdown edits);
+- a queued edit of a message that already has an edit pending replaces it
+  (the superseded caller gets None);
+- items with a `ttl` are dropped (result None) if they could not be sent in time;
+- `RetryAfter` (HTTP 429) pauses the chat and re-queues the item, unless it is
+  an edit that a newer edit of the same message (queued or sent) has superseded.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Hashable, Optional
+
+from .config import log
+
+PRIO_QUESTION = 0
+PRIO_REVEAL = 1
+PRIO_DEFAULT = 2
+PRIO_COUNTDOWN = 3
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 if it is available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class _Item:
+    __slots__ = (
+        "priority", "seq", "bot", "method", "kwargs", "chat_id",
+        "future", "key", "expires_at", "attempts", "cancelled",
+    )
+
+    def __init__(self, priority, seq, bot, method, kwargs, future, key, expires_at):
+        self.priority: int = priority
+        self.seq: int = seq
+        self.bot: Any = bot
+        self.method: str = method
+        self.kwargs: dict[str, Any] = kwargs
+        self.chat_id: int = int(kwargs.get("chat_id") or 0)
+        self.future: asyncio.Future = future
+        self.key: Optional[Hashable] = key
+        self.expires_at: Optional[float] = expires_at
+        self.attempts = 0
+        self.cancelled = False
+
+    def __lt__(self, other: "_Item") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Outbox:
+    def __init__(
+        self,
+        *,
+        global_rate: float = 25.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 5.0,
+        max_in_flight: int = 16,
+        max_retries: int = 3,
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+
+        self._heap: list[_Item] = []
+        self._pending_edits: dict[Hashable, _Item] = {}
+        # seq of the newest edit submitted per message, queued or already sent
+        self._latest_edits: dict[Hashable, int] = {}
+        self._global = TokenBucket(global_rate, max(1.0, global_rate))
+        self._chats: dict[int, TokenBucket] = {}
+        self._chat_paused_until: dict[int, float] = {}
+        self._seq = itertools.count()
+
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.retried = 0
+        self.max_depth = 0
+
+    # ---- public API ----
+    async def send_message(
+        self, bot: Any, *, priority: int = PRIO_DEFAULT, ttl: Optional[float] = None, **kwargs: Any
+    ) -> Any:
+        return await self.submit(bot, "send_message", priority=priority, ttl=ttl, **kwargs)
+
+    async def edit_message_text(
+        self, bot: Any, *, priority: int = PRIO_DEFAULT, ttl: Optional[float] = None, **kwargs: Any
+    ) -> Any:
+        return await self.submit(bot, "edit_message_text", priority=priority, ttl=ttl, **kwargs)
+
+    def submit(
+        self,
+        bot: Any,
+        method: str,
+        *,
+        priority: int = PRIO_DEFAULT,
+        ttl: Optional[float] = None,
+        **kwargs: Any,
+    ) -> asyncio.Future:
+        """Queue `bot.<method>(**kwargs)`; the future resolves to its result (or None if dropped)."""
+        loop = asyncio.get_running_loop()
+        self._ensure_running(loop)
+
+        key: Optional[Hashable] = None
+        if method == "edit_message_text" and kwargs.get("message_id"):
+            key = (kwargs.get("chat_id"), kwargs["message_id"])
+            older = self._pending_edits.get(key)
+            if older is not None:
+                older.cancelled = True
+                priority = min(priority, older.priority)
+                _resolve(older.future, None)
+                self.coalesced += 1
+
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        item = _Item(priority, next(self._seq), bot, method, kwargs, loop.create_future(), key, expires_at)
+        if key is not None:
+            self._pending_edits[key] = item
+            self._latest_edits[key] = item.seq
+        heapq.heappush(self._heap, item)
+        self.max_depth = max(self.max_depth, len(self._heap))
+        self._wakeup.set()
+        return item.future
+
+    def post(self, bot: Any, method: str, **kwargs: Any) -> None:
+        """Fire-and-forget `submit`; failures are logged."""
+        self.submit(bot, method, **kwargs).add_done_callback(_log_failure)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queue_depth": sum(1 for i in self._heap if not i.cancelled),
+            "max_depth": self.max_depth,
+            "in_flight": self._in_flight,
+            "sent": self.sent,
+            "failed": self.failed,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "retried": self.retried,
+            "paused_chats": sum(
+                1 for until in self._chat_paused_until.values() if until > time.monotonic()
+            ),
+        }
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Give queued items up to `timeout` seconds to go out, then stop."""
+        deadline = time.monotonic() + timeout
+        while (self._heap or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for item in self._heap:
+            _resolve(item.future, None)
+        self._heap.clear()
+        self._pending_edits.clear()
+        self._latest_edits.clear()
+
+    # ---- scheduling ----
+    def _ensure_running(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._task = loop.create_task(self._run())
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) > 4096:
+                now = time.monotonic()
+                self._chats = {c: b for c, b in self._chats.items() if not b.is_full(now)}
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _next_ready(self) -> tuple[Optional[_Item], Optional[float]]:
+        """Highest-priority item whose chat can send now, or the time to wait."""
+        now = time.monotonic()
+        global_wait = self._global.wait_time(now)
+        if global_wait > 0:
+            return None, global_wait
+
+        blocked: list[_Item] = []
+        blocked_chats: set[int] = set()
+        wait: Optional[float] = None
+        chosen: Optional[_Item] = None
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            if item.cancelled:
+                continue
+            if item.expires_at is not None and item.expires_at <= now:
+                self._forget(item)
+                self._done_editing(item)
+                _resolve(item.future, None)
+                self.dropped += 1
+                continue
+            if item.chat_id in blocked_chats:
+                blocked.append(item)
+                continue
+
+            chat_wait = max(
+                self._chat_paused_until.get(item.chat_id, 0.0) - now,
+                self._chat_bucket(item.chat_id).wait_time(now),
+            )
+            if chat_wait > 0:
+                blocked.append(item)
+                blocked_chats.add(item.chat_id)
+                wait = chat_wait if wait is None else min(wait, chat_wait)
+                if item.expires_at is not None:
+                    wait = min(wait, item.expires_at - now)
+                continue
+            chosen = item
+            break
+
+        for item in blocked:
+            heapq.heappush(self._heap, item)
+        if chosen is None:
+            return None, wait
+
+        self._global.take(now)
+        self._chat_bucket(chosen.chat_id).take(now)
+        self._forget(chosen)
+        return chosen, None
+
+    def _forget(self, item: _Item) -> None:
+        if item.key is not None and self._pending_edits.get(item.key) is item:
+            del self._pending_edits[item.key]
+
+    def _done_editing(self, item: _Item) -> None:
+        if item.key is not None and self._latest_edits.get(item.key) == item.seq:
+            del self._latest_edits[item.key]
+
+    def _superseded(self, item: _Item) -> bool:
+        return item.key is not None and self._latest_edits.get(item.key, item.seq) > item.seq
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None and self._slots is not None
+        while True:
+            await self._slots.acquire()
+            item, wait = self._next_ready()
+            if item is None:
+                self._slots.release()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._in_flight += 1
+            asyncio.get_running_loop().create_task(self._dispatch(item))
+
+    async def _dispatch(self, item: _Item) -> None:
+        assert self._wakeup is not None and self._slots is not None
+        try:
+            result = await getattr(item.bot, item.method)(**item.kwargs)
+        except Exception as e:
+            retry_after = _retry_after_seconds(e)
+            if retry_after is not None and self._superseded(item):
+                # a newer edit of the same message is queued or already sent:
+                # drop this one rather than spend a call on stale text (or
+                # overwrite the newer text) during flood control
+                self._chat_paused_until[item.chat_id] = time.monotonic() + retry_after
+                self.coalesced += 1
+                _resolve(item.future, None)
+            elif retry_after is not None and item.attempts < self.max_retries:
+                item.attempts += 1
+                self.retried += 1
+                self._chat_paused_until[item.chat_id] = time.monotonic() + retry_after
+                log.warning("Flood control on chat %s: retrying in %.1fs", item.chat_id, retry_after)
+                if item.key is not None:
+                    self._pending_edits[item.key] = item
+                heapq.heappush(self._heap, item)
+            else:
+                self.failed += 1
+                self._done_editing(item)
+                _fail(item.future, e)
+        else:
+            self.sent += 1
+            self._done_editing(item)
+            _resolve(item.future, result)
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+            self._wakeup.set()
+
+
+def _retry_after_seconds(e: Exception) -> Optional[float]:
+    # telegram.error.RetryAfter; duck-typed so this module does not import telegram
+    value = getattr(e, "retry_after", None)
+    if value is None:
+        return None
+    if hasattr(value, "total_seconds"):
+        return float(value.total_seconds())
+    return float(value)
+
+
+def _resolve(fut: asyncio.Future, result: Any) -> None:
+    if not fut.done():
+        fut.set_result(result)
+
+
+def _fail(fut: asyncio.Future, error: BaseException) -> None:
+    if not fut.done():
+        fut.set_exception(error)
+
+
+def _log_failure(fut: asyncio.Future) -> None:
+    if fut.cancelled():
+        return
+    e = fut.exception()
+    if e is not None:
+        log.warning("Queued Telegram call failed: %s", e)
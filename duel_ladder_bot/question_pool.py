@@ -0,0 +1,122 @@
+"""
+Pre-built question buffers so starting a round is a dequeue, not a build.
+
+One `QuestionPool` per task type keeps up to `size` questions ready and starts
+a background refill whenever it drops to `low_watermark`. `QuestionBank` owns
+the pools and implements the "fall back to any task type" rule that duels,
+solo mode and the classroom game share.
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+from .config import TASK_TYPES, log
+
+Question = dict[str, Any]
+BuildFn = Callable[[str], Awaitable[Optional[Question]]]
+
+
+class QuestionPool:
+    def __init__(self, task_type: str, build: BuildFn, *, size: int, low_watermark: int):
+        self.task_type = task_type
+        self.size = max(1, size)
+        self.low_watermark = min(max(0, low_watermark), self.size - 1)
+        self._build = build
+        self._buffer: deque[Question] = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+        # bumped by clear() so a refill that started before it drops its results
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.built = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    async def take(self) -> Optional[Question]:
+        if self._buffer:
+            q = self._buffer.popleft()
+            self.hits += 1
+        else:
+            # cold or exhausted: build inline once rather than wait for a refill
+            self.misses += 1
+            q = await self._build(self.task_type)
+            if q:
+                self.built += 1
+        self.maybe_refill()
+        return q
+
+    def maybe_refill(self) -> None:
+        if len(self._buffer) > self.low_watermark:
+            return
+        if self._refill_task and not self._refill_task.done():
+            return
+        self._refill_task = asyncio.get_running_loop().create_task(self._refill())
+
+    async def _refill(self) -> None:
+        generation = self._generation
+        try:
+            while len(self._buffer) < self.size:
+                q = await self._build(self.task_type)
+                if generation != self._generation:
+                    return
+                if not q:
+                    # no vocab for this task type (yet); take() will retry inline
+                    return
+                self._buffer.append(q)
+                self.built += 1
+        except Exception:
+            log.exception("Question pool refill failed for %s", self.task_type)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._buffer.clear()
+
+
+class QuestionBank:
+    def __init__(
+        self,
+        build: BuildFn,
+        *,
+        task_types: Optional[list[str]] = None,
+        size: int = 8,
+        low_watermark: int = 3,
+    ):
+        self.task_types = list(task_types or TASK_TYPES)
+        self.pools: dict[str, QuestionPool] = {
+            t: QuestionPool(t, build, size=size, low_watermark=low_watermark)
+            for t in self.task_types
+        }
+
+    async def take(self, task_type: str) -> Optional[Question]:
+        """
+        Next question for `task_type`, falling back to the other task types in
+        order. The returned dict's "task_type" is the type actually used.
+        """
+        order = [task_type] + [t for t in self.task_types if t != task_type]
+        for t in order:
+            pool = self.pools.get(t)
+            if pool is None:
+                continue
+            q = await pool.take()
+            if q:
+                return q
+        return None
+
+    def warm(self) -> None:
+        """Start filling every pool (call once the event loop is running)."""
+        for pool in self.pools.values():
+            pool.maybe_refill()
+
+    def clear(self) -> None:
+        """Drop buffered questions, e.g. after the vocab changed."""
+        for pool in self.pools.values():
+            pool.clear()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            t: {"ready": len(p), "hits": p.hits, "misses": p.misses, "built": p.built}
+            for t, p in self.pools.items()
+        }
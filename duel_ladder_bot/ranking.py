@@ -0,0 +1,108 @@
+"""
+Incrementally maintained rankings.
+
+`RankIndex` keeps (sort_key, user_id) pairs in a sorted list. Rank lookups
+are a binary search. An update is a binary search plus one list
+insert/delete. That is a pointer memmove, which stays in the microsecond
+range for thousands of players. Smaller keys rank higher, so pass negated
+values for "more is better" columns.
+"""
+
+from bisect import bisect_left, insort
+from typing import Any, Iterator, Optional
+
+Key = tuple[Any, ...]
+
+
+class RankIndex:
+    def __init__(self) -> None:
+        self._keys: dict[int, Key] = {}
+        self._order: list[tuple[Key, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._keys
+
+    def __iter__(self) -> Iterator[int]:
+        return (uid for _, uid in self._order)
+
+    def update(self, user_id: int, key: Key) -> None:
+        old = self._keys.get(user_id)
+        if old == key:
+            return
+        if old is not None:
+            del self._order[bisect_left(self._order, (old, user_id))]
+        self._keys[user_id] = key
+        insort(self._order, (key, user_id))
+
+    def remove(self, user_id: int) -> None:
+        old = self._keys.pop(user_id, None)
+        if old is not None:
+            del self._order[bisect_left(self._order, (old, user_id))]
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._order.clear()
+
+    def rank_of(self, user_id: int) -> Optional[int]:
+        """1-based rank, or None if the user is not ranked."""
+        key = self._keys.get(user_id)
+        if key is None:
+            return None
+        return bisect_left(self._order, (key, user_id)) + 1
+
+    def top(self, n: int) -> list[int]:
+        return [uid for _, uid in self._order[: max(0, n)]]
+
+    def around(self, user_id: int, k: int) -> list[tuple[int, int]]:
+        """(rank, user_id) for up to k neighbours on each side of `user_id`."""
+        rank = self.rank_of(user_id)
+        if rank is None:
+            return []
+        lo = max(0, rank - 1 - k)
+        hi = min(len(self._order), rank + k)
+        return [(i + 1, self._order[i][1]) for i in range(lo, hi)]
+
+
+STAT_FIELDS = ("wins", "losses", "points", "correct", "wrong")
+
+
+class EventBoard:
+    """Live `event_players` stats for one event, ranked by wins, points, correct."""
+
+    def __init__(self, rows: list[dict[str, Any]]):
+        self.stats: dict[int, dict[str, int]] = {}
+        self.ranks = RankIndex()
+        for r in rows:
+            self.put(r)
+
+    @staticmethod
+    def _key(s: dict[str, int]) -> Key:
+        return (-s["wins"], -s["points"], -s["correct"])
+
+    def put(self, row: dict[str, Any]) -> None:
+        uid = int(row["user_id"])
+        s = {"user_id": uid, **{f: int(row.get(f) or 0) for f in STAT_FIELDS}}
+        self.stats[uid] = s
+        self.ranks.update(uid, self._key(s))
+
+    def add(self, user_id: int, **delta: int) -> None:
+        s = self.stats.get(user_id)
+        if s is None:
+            return  # not joined: the UPDATE would not match a row either
+        for k, v in delta.items():
+            s[k] += v
+        self.ranks.update(user_id, self._key(s))
+
+    def remove(self, user_id: int) -> None:
+        self.stats.pop(user_id, None)
+        self.ranks.remove(user_id)
+
+    def row(self, user_id: int) -> Optional[dict[str, int]]:
+        s = self.stats.get(user_id)
+        return dict(s) if s else None
+
+    def top(self, n: int) -> list[dict[str, int]]:
+        return [dict(self.stats[uid]) for uid in self.ranks.top(n)]
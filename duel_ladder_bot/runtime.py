@@ -1,10 +1,59 @@
 from typing import Optional
 
-from .config import DB_PATH, TMA_URL
+from .async_db import AsyncDB
+from .config import (
+    DB_PATH,
+    DB_POOL_SIZE,
+    DB_PRAGMAS,
+    DB_WORKERS,
+    OUTBOX_CHAT_BURST,
+    OUTBOX_CHAT_RATE,
+    OUTBOX_GLOBAL_RATE,
+    OUTBOX_MAX_IN_FLIGHT,
+    QUESTION_POOL_LOW_WATERMARK,
+    QUESTION_POOL_SIZE,
+    TMA_URL,
+    USER_CACHE_SIZE,
+    USER_TOUCH_SECONDS,
+    VOCAB_CHECK_SECONDS,
+)
 from .db import DB
+from .event_registry import EventRegistry
+from .outbox import Outbox
+from .timers import DeadlineScheduler
+from .question_pool import QuestionBank
+from .user_cache import UserCache
 
 
-db = DB(DB_PATH)
+db = DB(
+    DB_PATH,
+    pool_size=DB_POOL_SIZE,
+    pragmas=DB_PRAGMAS,
+    vocab_check_seconds=VOCAB_CHECK_SECONDS,
+)
+# Use from coroutines: same methods as `db`, but awaitable and off the event loop.
+adb = AsyncDB(db, workers=DB_WORKERS)
+
+questions = QuestionBank(
+    lambda task_type: adb.build_question(task_type, k_options=4),
+    size=QUESTION_POOL_SIZE,
+    low_watermark=QUESTION_POOL_LOW_WATERMARK,
+)
+
+events = EventRegistry(adb)
+
+users = UserCache(adb, capacity=USER_CACHE_SIZE, touch_seconds=USER_TOUCH_SECONDS)
+
+# All Telegram sends/edits from game code go through here (rate limits, priorities).
+outbox = Outbox(
+    global_rate=OUTBOX_GLOBAL_RATE,
+    chat_rate=OUTBOX_CHAT_RATE,
+    chat_burst=OUTBOX_CHAT_BURST,
+    max_in_flight=OUTBOX_MAX_IN_FLIGHT,
+)
+
+# Round deadlines, countdown ticks and rests (one task for all of them).
+timers = DeadlineScheduler()
 
 # Set in `commands.post_init()`
 BOT_USERNAME: Optional[str] = None
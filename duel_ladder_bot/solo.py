@@ -1,7 +1,7 @@
 import html
 import time
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Optional
 
 from telegram import Update
 from telegram.ext import ContextTypes
@@ -9,7 +9,9 @@ from telegram.ext import ContextTypes
 from .config import DEFAULT_ROUNDS_PER_DUEL, DEFAULT_ROUND_SECONDS, GLOBAL_CHAT_ID, TASK_TYPES
 from .helpers import cache_user, current_task_type, require_private, score_points
 from .keyboards import kb_options, reply_kb_main
-from .runtime import db
+from .outbox import PRIO_QUESTION, PRIO_REVEAL
+from .runtime import adb, events, outbox, questions, timers
+from .timers import Timer
 
 
 @dataclass
@@ -25,7 +27,7 @@ class SoloSession:
     active_question: Optional[dict] = None
     round_started_at: float = 0.0
     msg_id: Optional[int] = None
-    timer_job: Any = None
+    timer: Optional[Timer] = None
 
 
 solo_sessions: dict[int, SoloSession] = {}
@@ -65,14 +67,14 @@ async def cmd_solo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     uid = update.effective_user.id
 
     # If there's an active global event and the user is joined, we record stats there.
-    ev = db.get_active_event(chat_id=GLOBAL_CHAT_ID)
+    ev = await events.active(GLOBAL_CHAT_ID)
     event_id: Optional[int] = None
     if ev:
         eid = int(ev["id"])
-        if db.get_player_stats(event_id=eid, user_id=uid):
+        if await adb.get_player_stats(event_id=eid, user_id=uid):
             event_id = eid
             # pause auto-queue while soloing
-            db.set_auto_queue(event_id=eid, user_id=uid, auto_queue=0)
+            await adb.set_auto_queue(event_id=eid, user_id=uid, auto_queue=0)
 
     # Stop existing solo session (if any) and start fresh
     await stop_solo(uid, context)
@@ -98,7 +100,13 @@ async def cmd_solo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     else:
         note += "\n<i>Note: points/correct/wrong will be recorded into the active event.</i>"
 
-    await update.effective_message.reply_text(note, parse_mode="HTML", reply_markup=reply_kb_main())
+    await outbox.send_message(
+        context.bot,
+        chat_id=update.effective_chat.id,
+        text=note,
+        parse_mode="HTML",
+        reply_markup=reply_kb_main(),
+    )
     await _run_next_solo_round(sess, context)
 
 
@@ -108,21 +116,18 @@ async def cmd_solo_stop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         return
     uid = update.effective_user.id
     stopped = await stop_solo(uid, context)
-    if stopped:
-        await update.effective_message.reply_text("🛑 Solo mode stopped.", reply_markup=reply_kb_main())
-    else:
-        await update.effective_message.reply_text("No active solo session.", reply_markup=reply_kb_main())
+    text = "🛑 Solo mode stopped." if stopped else "No active solo session."
+    await outbox.send_message(
+        context.bot, chat_id=update.effective_chat.id, text=text, reply_markup=reply_kb_main()
+    )
 
 
 async def stop_solo(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> bool:
     sess = solo_sessions.pop(user_id, None)
     if not sess:
         return False
-    try:
-        if sess.timer_job:
-            sess.timer_job.schedule_removal()
-    except Exception:
-        pass
+    if sess.timer:
+        sess.timer.cancel()
     return True
 
 
@@ -131,17 +136,12 @@ async def _run_next_solo_round(sess: SoloSession, context: ContextTypes.DEFAULT_
         await _finish_solo(sess, context)
         return
 
-    q = db.build_question(sess.task_type, k_options=4)
-    if not q:
-        # fall back to any available task type
-        for t in TASK_TYPES:
-            q = db.build_question(t, k_options=4)
-            if q:
-                sess.task_type = t
-                break
-
-    if not q:
-        await context.bot.send_message(
+    q = await questions.take(sess.task_type)
+    if q:
+        sess.task_type = q["task_type"]
+    else:
+        await outbox.send_message(
+            context.bot,
             chat_id=sess.user_id,
             text="⚠️ Not enough vocabulary in DB to generate questions.",
             reply_markup=reply_kb_main(),
@@ -159,7 +159,9 @@ async def _run_next_solo_round(sess: SoloSession, context: ContextTypes.DEFAULT_
         f"⭐ Score: <b>{sess.score}</b>\n\n"
         + q["prompt"]
     )
-    msg = await context.bot.send_message(
+    msg = await outbox.send_message(
+        context.bot,
+        priority=PRIO_QUESTION,
         chat_id=sess.user_id,
         text=text,
         parse_mode="HTML",
@@ -167,18 +169,14 @@ async def _run_next_solo_round(sess: SoloSession, context: ContextTypes.DEFAULT_
     )
     sess.msg_id = msg.message_id
 
-    sess.timer_job = context.job_queue.run_once(
-        _solo_timeout_job,
-        when=sess.round_seconds,
-        data={"user_id": sess.user_id, "session_id": sess.session_id, "round_idx": sess.round_idx},
+    sess.timer = timers.call_later(
+        sess.round_seconds, _solo_timeout, sess.user_id, sess.session_id, sess.round_idx, context
     )
 
 
-async def _solo_timeout_job(context: ContextTypes.DEFAULT_TYPE) -> None:
-    data = context.job.data
-    uid = int(data["user_id"])
-    session_id = int(data["session_id"])
-    round_idx = int(data["round_idx"])
+async def _solo_timeout(
+    uid: int, session_id: int, round_idx: int, context: ContextTypes.DEFAULT_TYPE
+) -> None:
     sess = solo_sessions.get(uid)
     if not sess or sess.session_id != session_id or sess.round_idx != round_idx:
         return
@@ -208,12 +206,9 @@ async def handle_solo_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         return
 
     # stop timer
-    try:
-        if sess.timer_job:
-            sess.timer_job.schedule_removal()
-    except Exception:
-        pass
-    sess.timer_job = None
+    if sess.timer:
+        sess.timer.cancel()
+    sess.timer = None
 
     await _reveal_solo(sess, context, choice_idx=choice_idx, timed_out=False)
 
@@ -250,7 +245,7 @@ async def _reveal_solo(
 
     # optionally record into event stats
     if sess.event_id is not None:
-        db.record_round_result(sess.event_id, sess.user_id, pts, ok)
+        await adb.record_round_result(sess.event_id, sess.user_id, pts, ok)
 
     result = (
         f"{verdict}\n\n"
@@ -262,7 +257,9 @@ async def _reveal_solo(
 
     if sess.msg_id:
         try:
-            await context.bot.edit_message_text(
+            await outbox.edit_message_text(
+                context.bot,
+                priority=PRIO_REVEAL,
                 chat_id=sess.user_id,
                 message_id=sess.msg_id,
                 text=result,
@@ -270,8 +267,12 @@ async def _reveal_solo(
                 reply_markup=None,
             )
         except Exception:
-            await context.bot.send_message(
-                chat_id=sess.user_id, text=result, parse_mode="HTML", reply_markup=reply_kb_main()
+            await outbox.send_message(
+                context.bot,
+                chat_id=sess.user_id,
+                text=result,
+                parse_mode="HTML",
+                reply_markup=reply_kb_main(),
             )
 
     sess.round_idx += 1
@@ -289,6 +290,8 @@ async def _finish_solo(sess: SoloSession, context: ContextTypes.DEFAULT_TYPE) ->
         f"⭐ Final score: <b>{sess.score}</b>\n\n"
         "Run /solo to start again, or /menu to go back."
     )
-    await context.bot.send_message(chat_id=uid, text=text, parse_mode="HTML", reply_markup=reply_kb_main())
+    await outbox.send_message(
+        context.bot, chat_id=uid, text=text, parse_mode="HTML", reply_markup=reply_kb_main()
+    )
 
 
@@ -0,0 +1,130 @@
+"""
+Opt-in startup profiling for the entry points (`--profile-startup`).
+
+`enable()` puts an import timer in front of `sys.meta_path`, so every module
+imported afterwards records how long its body took to run. `phase(name)`
+times init steps (schema check, app build, post_init calls). `ready()`
+prints both breakdowns once, when the entry point starts serving.
+
+Profiling is off by default, and then `phase()` just yields and
+`ready()` does nothing.
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class _ImportTimer:
+    """meta_path finder that only wraps other finders' loaders with a timer."""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            loader = spec.loader
+            # instance loaders only; builtin/frozen importers are classes shared by all modules
+            if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+                loader.exec_module = self._timed(fullname, loader.exec_module)
+            return spec
+        return None
+
+    def _timed(self, name: str, exec_module):
+        profiler = self.profiler
+
+        def exec_timed(module):
+            profiler._children.append(0.0)
+            started = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                total = time.perf_counter() - started
+                nested = profiler._children.pop()
+                if profiler._children:
+                    profiler._children[-1] += total
+                profiler.imports.append((name, total, total - nested))
+
+        return exec_timed
+
+
+class StartupProfiler:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.started = time.perf_counter()
+        self.phases: list[tuple[str, float, float]] = []  # (name, offset, seconds)
+        self.imports: list[tuple[str, float, float]] = []  # (module, inclusive, self)
+        self._children: list[float] = []
+        self._reported = False
+
+    def enable(self) -> None:
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started = time.perf_counter()
+        sys.meta_path.insert(0, _ImportTimer(self))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, started - self.started, time.perf_counter() - started))
+
+    def ready(self, label: str = "ready") -> None:
+        """Print the report (once)."""
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        print(self.report(label), file=sys.stderr, flush=True)
+
+    def report(self, label: str = "ready", top: int = 12) -> str:
+        total_ms = (time.perf_counter() - self.started) * 1000
+        lines = [f"startup profile: {label} after {total_ms:.1f} ms"]
+
+        by_package: dict[str, float] = {}
+        for name, _, own in self.imports:
+            root = name.split(".")[0]
+            by_package[root] = by_package.get(root, 0.0) + own
+        import_ms = sum(by_package.values()) * 1000
+        lines.append(f"  imports: {len(self.imports)} modules, {import_ms:.1f} ms")
+        for root, own in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+            lines.append(f"    {own * 1000:8.1f} ms  {root}")
+
+        ours = [(n, inc) for n, inc, _ in self.imports if n.startswith("duel_ladder_bot.")]
+        if ours:
+            lines.append("  package modules (inclusive):")
+            for name, inc in sorted(ours, key=lambda kv: -kv[1])[:top]:
+                lines.append(f"    {inc * 1000:8.1f} ms  {name}")
+
+        if self.phases:
+            lines.append("  init phases:")
+            for name, offset, seconds in sorted(self.phases, key=lambda p: p[1]):
+                lines.append(f"    {seconds * 1000:8.1f} ms  {name}  (at +{offset * 1000:.1f} ms)")
+        return "\n".join(lines)
+
+
+profiler = StartupProfiler()
+enable = profiler.enable
+phase = profiler.phase
+ready = profiler.ready
+
+
+def enable_from_argv(argv: Optional[list[str]] = None) -> bool:
+    """Turn profiling on if `--profile-startup` is in argv (and strip it)."""
+    argv = sys.argv if argv is None else argv
+    if "--profile-startup" not in argv:
+        return False
+    argv.remove("--profile-startup")
+    enable()
+    return True
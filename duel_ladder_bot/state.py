@@ -1,6 +1,24 @@
 from dataclasses import dataclass, field
 from typing import Any, Optional
 
+from .config import (
+    MATCH_BUCKET_WIDTH,
+    MATCH_MAX_WAIT_SECONDS,
+    MATCH_WINDOW,
+    MATCH_WINDOW_GROWTH,
+)
+from .matchmaker import Matchmaker
+from .timers import Timer
+
+
+def new_matchmaker() -> Matchmaker:
+    return Matchmaker(
+        bucket_width=MATCH_BUCKET_WIDTH,
+        window=MATCH_WINDOW,
+        window_growth=MATCH_WINDOW_GROWTH,
+        max_wait=MATCH_MAX_WAIT_SECONDS,
+    )
+
 
 @dataclass
 class GlobalEventState:
@@ -8,7 +26,7 @@ class GlobalEventState:
     ends_at: int
     phase_seconds: int
     task_idx: int = 0
-    queue: list[int] = field(default_factory=list)
+    queue: Matchmaker = field(default_factory=new_matchmaker)
     phase_job: Any = None
     end_job: Any = None
 
@@ -27,9 +45,14 @@ class DuelState:
     p2_score: int = 0
     active_question: Optional[dict] = None
     round_started_at: float = 0.0
+    # when each player's question message was actually delivered
+    round_started_at_by_user: dict[int, float] = field(default_factory=dict)
     answers: dict[int, dict] = field(default_factory=dict)
+    # set before the first await of the reveal, so the round timer and the
+    # second answer can't both score the same round
+    revealed: bool = False
     msg_id_by_user: dict[int, int] = field(default_factory=dict)
-    timer_job: Any = None
+    timer: Optional[Timer] = None
     is_done: bool = False
 
 
@@ -0,0 +1,178 @@
+"""
+One-coroutine deadline scheduler for round timers, countdowns and rests.
+
+Timers sit in a heap ordered by deadline. A single task sleeps until the
+earliest deadline and fires everything that is due. `Timer.cancel()` only
+marks the entry, which is O(1); dead entries are skipped when they reach the
+top and are compacted away when they make up most of the heap. With nothing
+scheduled the task waits on an event, so an idle scheduler uses no CPU.
+"""
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import time
+from typing import Any, Callable, Optional
+
+from .config import log
+
+
+class Timer:
+    __slots__ = ("when", "seq", "callback", "args", "cancelled", "_scheduler")
+
+    def __init__(
+        self,
+        when: float,
+        seq: int,
+        callback: Callable[..., Any],
+        args: tuple,
+        scheduler: "DeadlineScheduler",
+    ):
+        self.when = when
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._scheduler: Optional["DeadlineScheduler"] = scheduler
+
+    def __lt__(self, other: "Timer") -> bool:
+        return (self.when, self.seq) < (other.when, other.seq)
+
+    def cancel(self) -> None:
+        if self.cancelled:
+            return
+        self.cancelled = True
+        if self._scheduler is not None:
+            self._scheduler._on_cancel()
+
+
+class DeadlineScheduler:
+    def __init__(self) -> None:
+        self._heap: list[Timer] = []
+        self._seq = itertools.count()
+        self._dead = 0  # cancelled entries still in the heap
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        """
+        Run `callback(*args)` after `delay` seconds. Coroutine functions are
+        started as tasks; plain callables run inline on the scheduler task.
+        """
+        return self.call_at(time.monotonic() + max(0.0, delay), callback, *args)
+
+    def call_at(self, when: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        """Like `call_later`, with a `time.monotonic()` deadline."""
+        self._ensure_running()
+        timer = Timer(when, next(self._seq), callback, args, self)
+        earliest = not self._heap or timer < self._heap[0]
+        heapq.heappush(self._heap, timer)
+        self.scheduled += 1
+        if earliest:
+            self._wakeup.set()
+        return timer
+
+    async def sleep(self, delay: float) -> None:
+        """`asyncio.sleep` backed by this scheduler."""
+        fut = asyncio.get_running_loop().create_future()
+        timer = self.call_later(delay, _resolve, fut)
+        try:
+            await fut
+        finally:
+            timer.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        fired = self.fired
+        return {
+            "pending": len(self._heap) - self._dead,
+            "scheduled": self.scheduled,
+            "fired": fired,
+            "cancelled": self.cancelled,
+            "lag_ms_avg": round(self._lag_total * 1000 / fired, 3) if fired else 0.0,
+            "lag_ms_max": round(self._lag_max * 1000, 3),
+        }
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for timer in self._heap:
+            timer._scheduler = None
+        self._heap.clear()
+        self._dead = 0
+
+    def _on_cancel(self) -> None:
+        self.cancelled += 1
+        self._dead += 1
+        if self._dead > 64 and self._dead * 2 > len(self._heap):
+            for timer in self._heap:
+                if timer.cancelled:
+                    timer._scheduler = None
+            self._heap = [t for t in self._heap if not t.cancelled]
+            heapq.heapify(self._heap)
+            self._dead = 0
+
+    def _ensure_running(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            heap = self._heap  # replaced by compaction
+            while heap and heap[0].cancelled:
+                heapq.heappop(heap)._scheduler = None
+                self._dead -= 1
+
+            self._wakeup.clear()
+            if not heap:
+                await self._wakeup.wait()
+                continue
+            delay = heap[0].when - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            timer = heapq.heappop(heap)
+            timer._scheduler = None
+            lag = -delay
+            self.fired += 1
+            self._lag_total += lag
+            self._lag_max = max(self._lag_max, lag)
+            self._fire(timer)
+
+    def _fire(self, timer: Timer) -> None:
+        try:
+            if inspect.iscoroutinefunction(timer.callback):
+                task = asyncio.get_running_loop().create_task(timer.callback(*timer.args))
+                task.add_done_callback(_log_failure)
+            else:
+                timer.callback(*timer.args)
+        except Exception:
+            log.exception("Timer callback %r failed", timer.callback)
+
+
+def _resolve(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+def _log_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        log.error("Timer task failed", exc_info=task.exception())
@@ -0,0 +1,131 @@
+"""
+Telegram Mini App auth, shared by the aiohttp server and the serverless
+adapter (netlify/functions/api.py), so it must not import aiohttp or the DB.
+"""
+import hashlib
+import hmac
+import json
+import time
+import urllib.parse
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .config import (
+    ADMIN_TOKEN,
+    BOT_TOKEN,
+    TMA_AUTH_CACHE_SECONDS,
+    TMA_AUTH_CACHE_SIZE,
+    TMA_AUTH_MAX_AGE_SECONDS,
+    TMA_SESSION_MAX_AGE_SECONDS,
+    log,
+)
+
+# Derived once; HMAC key for the data-check-string
+_SECRET_KEY = hmac.new(b"WebAppData", BOT_TOKEN.encode(), hashlib.sha256).digest() if BOT_TOKEN else b""
+
+# sha256(initData) -> (expires_at, user). Clients resend the same initData on
+# every request, so after the first check a request costs one sha256.
+_auth_cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+
+def validate_init_data(init_data: str) -> Optional[Dict[str, Any]]:
+    """Validate Telegram WebApp initData and extract user info."""
+    if not BOT_TOKEN:
+        return None
+
+    now = time.time()
+    cache_key = hashlib.sha256(init_data.encode()).digest()
+    hit = _auth_cache.get(cache_key)
+    if hit is not None:
+        expires_at, user = hit
+        if now < expires_at:
+            _auth_cache.move_to_end(cache_key)
+            return user
+        del _auth_cache[cache_key]
+
+    checked = _check_init_data(init_data, now)
+    if checked is None:
+        return None
+    user, auth_date = checked
+    expires_at = min(now + TMA_AUTH_CACHE_SECONDS, auth_date + TMA_AUTH_MAX_AGE_SECONDS)
+    _auth_cache[cache_key] = (expires_at, user)
+    while len(_auth_cache) > TMA_AUTH_CACHE_SIZE:
+        _auth_cache.popitem(last=False)
+    return user
+
+
+def _check_init_data(init_data: str, now: float) -> Optional[Tuple[Dict[str, Any], int]]:
+    """Full HMAC + auth_date check; returns (user, auth_date)."""
+    try:
+        parsed = urllib.parse.parse_qs(init_data)
+        data_check_string_parts = []
+        received_hash = None
+
+        for key in sorted(parsed.keys()):
+            if key == "hash":
+                received_hash = parsed[key][0]
+            else:
+                data_check_string_parts.append(f"{key}={parsed[key][0]}")
+
+        if not received_hash:
+            return None
+
+        data_check_string = "\n".join(data_check_string_parts)
+        computed_hash = hmac.new(_SECRET_KEY, data_check_string.encode(), hashlib.sha256).hexdigest()
+
+        if not hmac.compare_digest(computed_hash, received_hash):
+            log.warning("TMA auth failed: hash mismatch")
+            return None
+
+        auth_date = int(parsed.get("auth_date", ["0"])[0])
+        if now - auth_date > TMA_AUTH_MAX_AGE_SECONDS:
+            log.warning("TMA auth failed: initData expired")
+            return None
+
+        # Extract user
+        if "user" in parsed:
+            user_data = json.loads(parsed["user"][0])
+            return user_data, auth_date
+        return None
+
+    except Exception as e:
+        log.warning(f"TMA auth error: {e}")
+        return None
+
+
+# Answer sessions: /join hands out "<user_id>.<issued, hex>.<hmac(room:user_id:issued)>"
+# so the answer path checks one short HMAC instead of the full initData.
+# Stateless, but the issue time is signed and tokens expire after
+# TMA_SESSION_MAX_AGE_SECONDS; clients then fall back to initData and re-join.
+_SESSION_KEY = hmac.new(b"TmaSession", BOT_TOKEN.encode(), hashlib.sha256).digest() if BOT_TOKEN else b""
+
+
+def _session_sig(room_code: str, user_id: int, issued: int) -> str:
+    msg = f"{room_code}:{user_id}:{issued}".encode()
+    return hmac.digest(_SESSION_KEY, msg, "sha256")[:16].hex()
+
+
+def issue_session(room_code: str, user_id: int, now: Optional[float] = None) -> str:
+    issued = int(time.time() if now is None else now)
+    return f"{user_id}.{issued:x}.{_session_sig(room_code, user_id, issued)}"
+
+
+def check_session(room_code: str, token: str, now: Optional[float] = None) -> Optional[int]:
+    """User id for a valid, unexpired session token, else None."""
+    uid, _, rest = token.partition(".")
+    issued_hex, _, sig = rest.partition(".")
+    try:
+        user_id = int(uid)
+        issued = int(issued_hex, 16)
+    except ValueError:
+        return None
+    age = (time.time() if now is None else now) - issued
+    if not 0 <= age <= TMA_SESSION_MAX_AGE_SECONDS:
+        return None
+    if not hmac.compare_digest(sig, _session_sig(room_code, user_id, issued)):
+        return None
+    return user_id
+
+
+def check_admin_token(token: str) -> bool:
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
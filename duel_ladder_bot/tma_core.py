@@ -0,0 +1,237 @@
+"""
+Framework-free classroom game for the serverless adapter.
+
+The whole game is one JSON-safe dict, and every operation is a plain
+function of (game, now, ...). Nothing runs between requests, so `tick()`
+moves the clock-driven phases (round over, pause over) forward whenever a
+request comes in. A handler loads the dict from a `tma_store` store, applies
+one operation and saves it back in the same transaction.
+
+Scoring and round pacing match `tma_server.ClassroomGame`, which keeps the
+long-running server's own in-memory version (rank index, SSE, journal).
+"""
+
+from typing import Any, Callable, Optional
+
+from .config import TASK_TYPES
+
+# Pause between a round's results and the next question
+ROUND_PAUSE_SECONDS = 2
+# Correct answers this fast score 2 points, slower ones 1
+FAST_ANSWER_MS = 5000
+
+Game = dict[str, Any]
+QuestionFn = Callable[[str], Optional[dict[str, Any]]]
+
+
+def answer_points(is_correct: bool, time_ms: int) -> int:
+    if not is_correct:
+        return 0
+    return 2 if time_ms <= FAST_ANSWER_MS else 1
+
+
+def new_game(version: int = 0) -> Game:
+    # user ids are str keys: the dict round-trips through JSON
+    return {
+        "version": version + 1,
+        "is_open": False,
+        "is_running": False,
+        "is_finished": False,
+        "players": {},          # uid -> {name, score, correct, wrong, seq}
+        "current_round": 0,
+        "total_rounds": 10,
+        "round_seconds": 12,
+        "question": None,
+        "task_type": "SYNONYM",
+        "round_started": 0.0,   # wall clock
+        "round_ended": 0.0,     # 0 while a question is live
+        "answers": {},          # uid -> [choice, time_ms]
+        "last_results": None,
+    }
+
+
+def _changed(g: Game) -> None:
+    g["version"] += 1
+
+
+def reset(g: Game) -> None:
+    version = g.get("version", 0)
+    g.clear()
+    g.update(new_game(version))
+
+
+def open_lobby(g: Game, total_rounds: int = 10, round_seconds: int = 12) -> None:
+    reset(g)
+    g["is_open"] = True
+    g["total_rounds"] = total_rounds
+    g["round_seconds"] = round_seconds
+
+
+def join(g: Game, user_id: int, name: str) -> bool:
+    if not g["is_open"] or g["is_running"] or g["is_finished"]:
+        return False
+    players = g["players"]
+    key = str(user_id)
+    if key not in players:
+        players[key] = {"name": name, "score": 0, "correct": 0, "wrong": 0, "seq": len(players)}
+        _changed(g)
+    return True
+
+
+def start(g: Game, now: float, questions: QuestionFn) -> bool:
+    if not g["players"] or g["is_running"]:
+        return False
+    g["is_open"] = False
+    g["is_running"] = True
+    g["current_round"] = 0
+    _next_round(g, now, questions)
+    return True
+
+
+def _take_question(task_type: str, questions: QuestionFn) -> Optional[dict[str, Any]]:
+    # same fallback order as question_pool.QuestionBank.take
+    for t in [task_type] + [t for t in TASK_TYPES if t != task_type]:
+        q = questions(t)
+        if q:
+            return q
+    return None
+
+
+def _finish(g: Game) -> None:
+    g["is_running"] = False
+    g["is_finished"] = True
+    g["question"] = None
+    _changed(g)
+
+
+def _next_round(g: Game, now: float, questions: QuestionFn) -> None:
+    g["current_round"] += 1
+    if g["current_round"] > g["total_rounds"]:
+        _finish(g)
+        return
+    q = _take_question(TASK_TYPES[(g["current_round"] - 1) % len(TASK_TYPES)], questions)
+    if q is None:
+        _finish(g)
+        return
+    g["question"] = q
+    g["task_type"] = q["task_type"]
+    g["round_started"] = now
+    g["round_ended"] = 0.0
+    g["answers"] = {}
+    _changed(g)
+
+
+def end_round(g: Game, now: float) -> None:
+    q = g["question"]
+    if not q:
+        return
+    correct_idx = q["correct_idx"]
+    results = []
+    for key, player in g["players"].items():
+        ans = g["answers"].get(key)
+        is_correct = ans is not None and ans[0] == correct_idx
+        pts = answer_points(is_correct, ans[1]) if ans is not None else 0
+        if is_correct:
+            player["correct"] += 1
+            player["score"] += pts
+        else:
+            player["wrong"] += 1
+        results.append({
+            "user_id": int(key),
+            "name": player["name"],
+            "correct": is_correct,
+            "points": pts,
+            "time_ms": ans[1] if ans is not None else None,
+        })
+    g["last_results"] = {
+        "round": g["current_round"],
+        "correct_answer": q["options"][correct_idx],
+        "correct_idx": correct_idx,
+        "player_results": results,
+    }
+    g["question"] = None
+    g["round_ended"] = now
+    _changed(g)
+
+
+def tick(g: Game, now: float, questions: QuestionFn) -> None:
+    """Apply whatever the clock says happened since the last request."""
+    if not g["is_running"]:
+        return
+    if g["question"]:
+        deadline = g["round_started"] + g["round_seconds"]
+        if now < deadline and len(g["answers"]) < len(g["players"]):
+            return
+        # a round nobody asked about ends at its deadline, not at `now`
+        end_round(g, min(now, deadline))
+    if now >= g["round_ended"] + ROUND_PAUSE_SECONDS:
+        _next_round(g, now, questions)
+
+
+def advance(g: Game, now: float, questions: QuestionFn) -> bool:
+    """Admin "next": end the live round, or skip the pause after it."""
+    if not g["is_running"]:
+        return False
+    if g["question"]:
+        end_round(g, now)
+    else:
+        _next_round(g, now, questions)
+    return True
+
+
+def submit_answer(g: Game, user_id: int, choice: int, now: float) -> bool:
+    key = str(user_id)
+    if not g["is_running"] or not g["question"] or key not in g["players"]:
+        return False
+    if key in g["answers"]:
+        return False
+    g["answers"][key] = [choice, max(0, int((now - g["round_started"]) * 1000))]
+    _changed(g)
+    if len(g["answers"]) >= len(g["players"]):
+        end_round(g, now)
+    return True
+
+
+def _ranked(g: Game) -> list[tuple[str, dict[str, Any]]]:
+    return sorted(g["players"].items(), key=lambda kv: (-kv[1]["score"], -kv[1]["correct"], kv[1]["seq"]))
+
+
+def _board(ranked: list[tuple[str, dict[str, Any]]]) -> list[dict[str, Any]]:
+    return [
+        {"rank": i + 1, "user_id": int(k), "name": p["name"], "score": p["score"],
+         "correct": p["correct"], "wrong": p["wrong"]}
+        for i, (k, p) in enumerate(ranked)
+    ]
+
+
+def view(g: Game, user_id: Optional[int], now: float) -> dict[str, Any]:
+    """The /api/state payload, same shape as `ClassroomGame.to_state_dict`."""
+    ranked = _ranked(g)
+    q = g["question"]
+    state: dict[str, Any] = {
+        "version": g["version"],
+        "is_open": g["is_open"],
+        "is_running": g["is_running"],
+        "is_finished": g["is_finished"],
+        "player_count": len(g["players"]),
+        "current_round": g["current_round"],
+        "total_rounds": g["total_rounds"],
+        "round_seconds": g["round_seconds"],
+        "answered_count": len(g["answers"]) if q else 0,
+        "leaderboard": _board(ranked[:5]),
+        "time_remaining": max(0.0, g["round_started"] + g["round_seconds"] - now) if q else 0,
+    }
+    if q and g["is_running"]:
+        state["question"] = {"prompt": q["prompt"], "options": q["options"], "task_type": g["task_type"]}
+    if g["is_finished"]:
+        state["final_leaderboard"] = _board(ranked)
+
+    key = str(user_id) if user_id else None
+    if key in g["players"]:
+        player = g["players"][key]
+        state["my_rank"] = next(i + 1 for i, (k, _) in enumerate(ranked) if k == key)
+        state["my_score"] = player["score"]
+        state["my_correct"] = player["correct"]
+        state["my_wrong"] = player["wrong"]
+        state["already_answered"] = key in g["answers"]
+    return state
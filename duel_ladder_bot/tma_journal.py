@@ -0,0 +1,115 @@
+"""
+Crash recovery for TMA classroom games.
+
+Every state transition (open, join, round start, answer, round end, finish...)
+is recorded as one JSON line with a global sequence number. `record()` only
+appends to an in-memory list, so it adds no I/O to request handlers. `flush()`
+writes the batch to an append-only file with one write + fsync in a worker
+thread. `checkpoint()` stores full room snapshots in SQLite and drops the
+entries they cover from the file. On startup `load()` returns the last
+checkpoint plus the journal entries written after it.
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, Optional
+
+from .async_db import AsyncDB
+from .config import log
+
+Entry = dict[str, Any]
+
+
+class GameJournal:
+    def __init__(self, path: str, adb: AsyncDB):
+        self.path = path
+        self.adb = adb
+        self.seq = 0
+        self._pending: list[tuple[int, str]] = []
+        self._io_lock: Optional[asyncio.Lock] = None
+
+        self.records = 0
+        self.flushes = 0
+        self.checkpoints = 0
+
+    def record(self, room: str, kind: str, data: dict[str, Any]) -> None:
+        self.seq += 1
+        line = json.dumps(
+            {"seq": self.seq, "room": room, "kind": kind, "data": data}, separators=(",", ":")
+        )
+        self._pending.append((self.seq, line))
+        self.records += 1
+
+    def _lock(self) -> asyncio.Lock:
+        if self._io_lock is None:
+            self._io_lock = asyncio.Lock()
+        return self._io_lock
+
+    async def flush(self) -> None:
+        async with self._lock():
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            try:
+                await asyncio.to_thread(self._append, [line for _, line in batch])
+            except Exception:
+                self._pending[:0] = batch  # keep order; retried on the next flush
+                raise
+            self.flushes += 1
+
+    def _append(self, lines: list[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def checkpoint(self, rooms: dict[str, dict[str, Any]]) -> None:
+        """
+        Persist `rooms` (snapshots taken by the caller just now, i.e. at
+        `self.seq`) and drop the journal entries they cover.
+        """
+        seq = self.seq
+        async with self._lock():
+            await self.adb.save_tma_checkpoint(seq, rooms)
+            # a flush queued ahead of us may have written entries after `seq`
+            await asyncio.to_thread(self._truncate, seq)
+            self._pending = [(s, line) for s, line in self._pending if s > seq]
+            self.checkpoints += 1
+
+    def _truncate(self, seq: int) -> None:
+        """Drop the entries up to `seq` from the file."""
+        keep = [line for line, entry in self._read() if entry["seq"] > seq]
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(keep)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def _read(self) -> list[tuple[str, Entry]]:
+        entries: list[tuple[str, Entry]] = []
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append((line, json.loads(line)))
+                    except ValueError:
+                        log.warning("Skipping torn TMA journal line")
+        return entries
+
+    def load(self) -> tuple[dict[str, dict[str, Any]], list[Entry]]:
+        """(room snapshots, journal entries after them); call before serving."""
+        ckpt_seq, rooms = self.adb.db.load_tma_checkpoint()
+        entries = [entry for _, entry in self._read() if entry["seq"] > ckpt_seq]
+        self.seq = max([ckpt_seq] + [e["seq"] for e in entries])
+        return rooms, entries
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "seq": self.seq,
+            "pending": len(self._pending),
+            "records": self.records,
+            "flushes": self.flushes,
+            "checkpoints": self.checkpoints,
+        }
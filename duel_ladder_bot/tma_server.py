@@ -3,19 +3,45 @@ Telegram Mini App (TMA) backend server.
 Serves the web frontend and provides real-time game state via REST/SSE.
 """
 import asyncio
-import hashlib
-import hmac
+import functools
 import html
 import json
 import os
+import secrets
+import sys
 import time
-import urllib.parse
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from aiohttp import web
 
-from .config import ADMIN_TOKEN, BOT_TOKEN, TASK_TYPES, log
-from .runtime import db
+from .config import (
+    TASK_TYPES,
+    TMA_CHAT_ID,
+    TMA_CHECKPOINT_SECONDS,
+    TMA_JOURNAL_FLUSH_SECONDS,
+    TMA_JOURNAL_PATH,
+    TMA_MAX_ROOMS,
+    TMA_ROOM_IDLE_SECONDS,
+    log,
+)
+from .ranking import RankIndex
+from .runtime import adb, db, questions, timers
+from .startup import phase, ready
+from .tma_auth import check_admin_token, check_session, issue_session, validate_init_data
+from .tma_core import ROUND_PAUSE_SECONDS, answer_points
+from .tma_journal import GameJournal
+
+# Room served by the legacy /api/... routes (see GameRegistry)
+DEFAULT_ROOM = "MAIN"
+ROOM_CODE_LENGTH = 5
+# How often idle rooms are looked for
+ROOM_SWEEP_SECONDS = 60
+
+# /api/events sends a comment line this often so proxies keep the stream open
+SSE_HEARTBEAT_SECONDS = 15
+
+# so a key that appears with value None still counts as changed in a patch
+_MISSING = object()
 
 # ---------------------------------------------------------------------------
 # In-memory game state for the TMA classroom game (single active game)
@@ -25,27 +51,95 @@ class ClassroomGame:
     """Single classroom game instance."""
 
     def __init__(self):
+        self._driver: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Future] = None
+        # Bumped on every state change; /api/events pushes when it moves
+        self.version = 0
+        # version restarts at 0 in every instance (restart, restore, re-created
+        # room code), so ETags and SSE ids carry this too
+        self.epoch = secrets.token_hex(4)
+        self._listeners: Set[asyncio.Queue] = set()
+        self._shared: Dict[str, Any] = {}
+        self._shared_bytes = b"{}"
+        self._shared_version = -1
+        self._change_pending = False
+        self.last_activity = time.monotonic()
+        # Set by GameRegistry.attach_journal(): records state transitions for crash recovery
+        self.journal: Optional[Callable[[str, Dict[str, Any]], None]] = None
         self.reset()
 
     def reset(self):
+        if self._driver:
+            self._driver.cancel()
+            self._driver = None
         self.is_open = False          # Lobby open for joining?
         self.is_running = False       # Game in progress?
         self.is_finished = False      # Game ended?
         self.players: Dict[int, Dict[str, Any]] = {}  # user_id -> {name, score, correct, wrong}
+        # Ranked by score, then correct answers, then join order; updated in join/end_round
+        self.ranks = RankIndex()
+        self._join_seq: Dict[int, int] = {}
         self.current_round = 0
         self.total_rounds = 10
         self.round_seconds = 12
         self.current_question: Optional[Dict[str, Any]] = None
         self.round_start_time: float = 0
-        self.answers: Dict[int, Dict[str, Any]] = {}  # user_id -> {choice, time}
+        self._round_start_mono: float = 0  # same instant, on the monotonic clock
+        # This round's answers in arrival order: (user_id, choice, latency_ms).
+        # Only appended to while the round runs; end_round() consumes it.
+        self._inbox: List[Tuple[int, int, int]] = []
+        self._answered: Set[int] = set()
         self.task_type = "SYNONYM"
         self.round_results: List[Dict[str, Any]] = []
+        self.started_at = 0
+        self.results_saved = False    # final scores written to events/event_players?
+        self._changed()
+        self._log("reset")
+
+    def _log(self, kind: str, **data: Any):
+        if self.journal is not None:
+            self.journal(kind, data)
+
+    def _changed(self):
+        self._change_pending = False
+        self.version += 1
+        self.last_activity = time.monotonic()
+        for q in self._listeners:
+            if q.empty():  # listeners always read the latest state, one wakeup is enough
+                q.put_nowait(self.version)
+
+    def _changed_soon(self):
+        """Coalesce a burst (e.g. answers) into one version bump per loop iteration."""
+        if not self._change_pending:
+            self._change_pending = True
+            asyncio.get_running_loop().call_soon(self._flush_change)
+
+    def _flush_change(self):
+        if self._change_pending:
+            self._changed()
+
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._listeners.add(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        self._listeners.discard(q)
+
+    def close_listeners(self):
+        """Tell every /api/events stream to finish (server shutdown)."""
+        for q in self._listeners:
+            if not q.empty():
+                q.get_nowait()
+            q.put_nowait(None)
 
     def open_lobby(self, total_rounds: int = 10, round_seconds: int = 12):
         self.reset()
         self.is_open = True
         self.total_rounds = total_rounds
         self.round_seconds = round_seconds
+        self._changed()
+        self._log("open", rounds=total_rounds, seconds=round_seconds)
 
     def join(self, user_id: int, name: str) -> bool:
         if not self.is_open or self.is_running or self.is_finished:
@@ -57,8 +151,16 @@ class ClassroomGame:
                 "correct": 0,
                 "wrong": 0,
             }
+            self._join_seq[user_id] = len(self._join_seq)
+            self._rerank(user_id)
+            self._changed()
+            self._log("join", user_id=user_id, name=name)
         return True
 
+    def _rerank(self, user_id: int):
+        p = self.players[user_id]
+        self.ranks.update(user_id, (-p["score"], -p["correct"], self._join_seq[user_id]))
+
     def player_count(self) -> int:
         return len(self.players)
 
@@ -68,9 +170,77 @@ class ClassroomGame:
         self.is_open = False
         self.is_running = True
         self.current_round = 0
+        self.started_at = int(time.time())
+        self._changed()
+        self._log("start", started_at=self.started_at)
+        return True
+
+    def start_rounds(self) -> bool:
+        """Start the game and the task that runs its rounds."""
+        if not self.start_game():
+            return False
+        self._driver = asyncio.get_running_loop().create_task(self._drive())
+        return True
+
+    def resume(self):
+        """Continue a game restored from the journal (round loop / result saving)."""
+        if self._driver is not None:
+            return
+        if self.is_running:
+            self._driver = asyncio.get_running_loop().create_task(self._drive(resume=True))
+        elif self.is_finished and not self.results_saved:
+            self._driver = asyncio.get_running_loop().create_task(self._save_results())
+
+    async def _drive(self, resume: bool = False):
+        # Each wait ends at its deadline or as soon as advance_now() is called
+        # (everyone answered / admin skip), so transitions are immediate.
+        try:
+            if resume:
+                if self.current_question:
+                    await self._wait(self.time_remaining())
+                    self.end_round()
+                await self._wait(ROUND_PAUSE_SECONDS)
+            while await self.next_round():
+                await self._wait(self.round_seconds)
+                self.end_round()
+                await self._wait(ROUND_PAUSE_SECONDS)
+            if self.is_finished:
+                await self._save_results()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("Classroom game round loop failed")
+
+    async def _save_results(self):
+        if self.results_saved or not self.players:
+            return
+        event_id = await adb.save_classroom_results(
+            chat_id=TMA_CHAT_ID,
+            started_at=self.started_at or int(time.time()),
+            round_seconds=self.round_seconds,
+            players=[{"user_id": uid, **p} for uid, p in self.players.items()],
+        )
+        self.results_saved = True
+        self._log("saved", event_id=event_id)
+
+    async def _wait(self, seconds: float):
+        fut = asyncio.get_running_loop().create_future()
+        self._wake = fut
+        timer = timers.call_later(seconds, _wake_up, fut)
+        try:
+            await fut
+        finally:
+            timer.cancel()
+            self._wake = None
+
+    def advance_now(self) -> bool:
+        """End the current round (or the pause after it) right away."""
+        if self._wake is None or self._wake.done():
+            return False
+        self._wake.set_result(None)
         return True
 
-    def next_round(self) -> bool:
+    async def next_round(self) -> bool:
         if not self.is_running or self.is_finished:
             return False
 
@@ -78,45 +248,71 @@ class ClassroomGame:
         if self.current_round > self.total_rounds:
             self.is_running = False
             self.is_finished = True
+            self._changed()
+            self._log("finish")
             return False
 
         # Pick task type (rotate)
         self.task_type = TASK_TYPES[(self.current_round - 1) % len(TASK_TYPES)]
         
-        # Build question
-        q = db.build_question(self.task_type, k_options=4)
-        if not q:
-            # Fallback to any type
-            for t in TASK_TYPES:
-                q = db.build_question(t, k_options=4)
-                if q:
-                    self.task_type = t
-                    break
-        
-        if not q:
+        q = await questions.take(self.task_type)
+        if q:
+            self.task_type = q["task_type"]
+        else:
             self.is_running = False
             self.is_finished = True
+            self._changed()
+            self._log("finish")
             return False
 
         self.current_question = q
-        self.round_start_time = time.time()
-        self.answers = {}
+        self._start_clock(time.time())
+        self._changed()
+        self._log(
+            "round",
+            round=self.current_round,
+            task_type=self.task_type,
+            question=q,
+            started_at=self.round_start_time,
+        )
         return True
 
-    def submit_answer(self, user_id: int, choice: int) -> bool:
-        if not self.is_running or user_id not in self.players:
+    def _start_clock(self, started_at: float):
+        """Start a round at wall time `started_at` (now, or earlier when restoring)."""
+        self.round_start_time = started_at
+        self._round_start_mono = time.monotonic() - (time.time() - started_at)
+        self._inbox = []
+        self._answered = set()
+
+    def submit_answer(self, user_id: int, choice: int, arrived: Optional[float] = None) -> bool:
+        """
+        Record an answer; `arrived` is the `time.monotonic()` the request came
+        in, so time spent queued behind other requests does not count.
+        """
+        if not self.current_question or not self.is_running:
             return False
-        if user_id in self.answers:
-            return False  # Already answered
-        if not self.current_question:
-            return False
-
-        latency_ms = int((time.time() - self.round_start_time) * 1000)
-        self.answers[user_id] = {"choice": choice, "time": latency_ms}
+        if user_id in self._answered or user_id not in self.players:
+            return False  # Already answered / not playing
+
+        if arrived is None:
+            arrived = time.monotonic()
+        latency_ms = max(0, int((arrived - self._round_start_mono) * 1000))
+        self._answered.add(user_id)
+        self._inbox.append((user_id, choice, latency_ms))
+        self._log("answer", user_id=user_id, choice=choice, time=latency_ms)
+        self._changed_soon()
+        if self.all_answered():
+            self.advance_now()
         return True
 
+    def has_answered(self, user_id: int) -> bool:
+        return user_id in self._answered
+
+    def answered_count(self) -> int:
+        return len(self._answered)
+
     def all_answered(self) -> bool:
-        return len(self.answers) >= len(self.players)
+        return len(self._answered) >= len(self.players)
 
     def time_remaining(self) -> float:
         if not self.is_running or not self.current_question:
@@ -131,6 +327,9 @@ class ClassroomGame:
 
         correct_idx = self.current_question["correct_idx"]
         correct_text = self.current_question["options"][correct_idx]
+        answers = {uid: (choice, ms) for uid, choice, ms in self._inbox}
+        self._inbox = []
+        self._answered = set()
         
         results = {
             "round": self.current_round,
@@ -140,7 +339,7 @@ class ClassroomGame:
         }
 
         for uid, player in self.players.items():
-            ans = self.answers.get(uid)
+            ans = answers.get(uid)
             if ans is None:
                 # No answer = wrong
                 player["wrong"] += 1
@@ -152,60 +351,124 @@ class ClassroomGame:
                     "time_ms": None,
                 })
             else:
-                is_correct = ans["choice"] == correct_idx
+                choice, time_ms = ans
+                is_correct = choice == correct_idx
                 # Points: 2 for fast correct, 1 for slow correct, 0 for wrong
+                pts = answer_points(is_correct, time_ms)
                 if is_correct:
-                    pts = 2 if ans["time"] <= 5000 else 1
                     player["correct"] += 1
+                    player["score"] += pts
+                    self._rerank(uid)
                 else:
-                    pts = 0
                     player["wrong"] += 1
-                player["score"] += pts
                 results["player_results"].append({
                     "user_id": uid,
                     "name": player["name"],
                     "correct": is_correct,
                     "points": pts,
-                    "time_ms": ans["time"],
+                    "time_ms": time_ms,
                 })
 
         self.round_results.append(results)
         self.current_question = None
+        self._changed()
+        self._log("end_round")
         return results
 
+    # ---- crash recovery (see tma_journal.GameJournal) ----
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-safe copy of the game state; players/answers as lists to keep int ids and order."""
+        return {
+            "is_open": self.is_open,
+            "is_running": self.is_running,
+            "is_finished": self.is_finished,
+            "players": [[uid, p] for uid, p in self.players.items()],
+            "current_round": self.current_round,
+            "total_rounds": self.total_rounds,
+            "round_seconds": self.round_seconds,
+            "current_question": self.current_question,
+            "round_start_time": self.round_start_time,
+            "answers": [[uid, {"choice": c, "time": ms}] for uid, c, ms in self._inbox],
+            "task_type": self.task_type,
+            "round_results": self.round_results,
+            "started_at": self.started_at,
+            "results_saved": self.results_saved,
+        }
+
+    def restore(self, snap: Dict[str, Any]):
+        self.reset()
+        self.is_open = snap["is_open"]
+        self.is_running = snap["is_running"]
+        self.is_finished = snap["is_finished"]
+        for uid, p in snap["players"]:
+            self.players[uid] = p
+            self._join_seq[uid] = len(self._join_seq)
+            self._rerank(uid)
+        self.current_round = snap["current_round"]
+        self.total_rounds = snap["total_rounds"]
+        self.round_seconds = snap["round_seconds"]
+        self.current_question = snap["current_question"]
+        self._start_clock(snap["round_start_time"])
+        for uid, a in snap["answers"]:
+            self._inbox.append((uid, a["choice"], a["time"]))
+            self._answered.add(uid)
+        self.task_type = snap["task_type"]
+        self.round_results = snap["round_results"]
+        self.started_at = snap["started_at"]
+        self.results_saved = snap["results_saved"]
+        self._changed()
+
+    def apply(self, kind: str, data: Dict[str, Any]):
+        """Replay one journal entry (the journal hook must be detached)."""
+        if kind == "reset":
+            self.reset()
+        elif kind == "open":
+            self.open_lobby(data["rounds"], data["seconds"])
+        elif kind == "join":
+            self.join(data["user_id"], data["name"])
+        elif kind == "start":
+            self.start_game()
+            self.started_at = data["started_at"]
+        elif kind == "round":
+            self.current_round = data["round"]
+            self.task_type = data["task_type"]
+            self.current_question = data["question"]
+            self._start_clock(data["started_at"])
+            self._changed()
+        elif kind == "answer":
+            self._inbox.append((data["user_id"], data["choice"], data["time"]))
+            self._answered.add(data["user_id"])
+            self._changed()
+        elif kind == "end_round":
+            self.end_round()
+        elif kind == "finish":
+            self.is_running = False
+            self.is_finished = True
+            self._changed()
+        elif kind == "saved":
+            self.results_saved = True
+
     def get_leaderboard(self, top_n: int = 10) -> List[Dict[str, Any]]:
-        sorted_players = sorted(
-            self.players.items(),
-            key=lambda x: (-x[1]["score"], -x[1]["correct"]),
-        )
         return [
-            {"rank": i + 1, "user_id": uid, **data}
-            for i, (uid, data) in enumerate(sorted_players[:top_n])
+            {"rank": i + 1, "user_id": uid, **self.players[uid]}
+            for i, uid in enumerate(self.ranks.top(top_n))
         ]
 
     def get_full_leaderboard(self) -> List[Dict[str, Any]]:
-        sorted_players = sorted(
-            self.players.items(),
-            key=lambda x: (-x[1]["score"], -x[1]["correct"]),
-        )
         return [
-            {"rank": i + 1, "user_id": uid, **data}
-            for i, (uid, data) in enumerate(sorted_players)
+            {"rank": i + 1, "user_id": uid, **self.players[uid]}
+            for i, uid in enumerate(self.ranks)
         ]
 
     def get_player_rank(self, user_id: int) -> Optional[int]:
-        sorted_players = sorted(
-            self.players.items(),
-            key=lambda x: (-x[1]["score"], -x[1]["correct"]),
-        )
-        for i, (uid, _) in enumerate(sorted_players):
-            if uid == user_id:
-                return i + 1
-        return None
+        return self.ranks.rank_of(user_id)
 
-    def to_state_dict(self, user_id: Optional[int] = None) -> Dict[str, Any]:
-        """Return current state for frontend."""
+    def shared_state(self) -> Dict[str, Any]:
+        """The part of the state every player sees; rebuilt once per version."""
+        if self._shared_version == self.version:
+            return self._shared
         state = {
+            "version": self.version,
             "is_open": self.is_open,
             "is_running": self.is_running,
             "is_finished": self.is_finished,
@@ -213,17 +476,10 @@ class ClassroomGame:
             "current_round": self.current_round,
             "total_rounds": self.total_rounds,
             "round_seconds": self.round_seconds,
-            "time_remaining": self.time_remaining(),
+            "answered_count": len(self._answered) if self.current_question else 0,
             "leaderboard": self.get_leaderboard(5),
         }
 
-        if user_id and user_id in self.players:
-            state["my_rank"] = self.get_player_rank(user_id)
-            state["my_score"] = self.players[user_id]["score"]
-            state["my_correct"] = self.players[user_id]["correct"]
-            state["my_wrong"] = self.players[user_id]["wrong"]
-            state["already_answered"] = user_id in self.answers
-
         if self.current_question and self.is_running:
             state["question"] = {
                 "prompt": self.current_question["prompt"],
@@ -234,70 +490,198 @@ class ClassroomGame:
         if self.is_finished:
             state["final_leaderboard"] = self.get_full_leaderboard()
 
+        self._shared = state
+        self._shared_bytes = json.dumps(state, separators=(",", ":")).encode()
+        self._shared_version = self.version
         return state
 
+    @property
+    def tag(self) -> str:
+        """Identifies this state version for ETag / SSE id comparisons."""
+        return f"{self.epoch}-{self.version}"
 
-# Singleton game instance
-game = ClassroomGame()
-
-# Background task for round timer
-_round_task: Optional[asyncio.Task] = None
-
-
-async def round_timer_loop(app: web.Application):
-    """Background loop that auto-ends rounds when time expires."""
-    global game
-    while True:
-        await asyncio.sleep(0.5)
-        if game.is_running and game.current_question:
-            if game.time_remaining() <= 0 or game.all_answered():
-                game.end_round()
-                await asyncio.sleep(2)  # Brief pause between rounds
-                if not game.next_round():
-                    # Game finished
-                    pass
-
-
-# ---------------------------------------------------------------------------
-# Telegram WebApp auth validation
-# ---------------------------------------------------------------------------
-
-def validate_init_data(init_data: str) -> Optional[Dict[str, Any]]:
-    """Validate Telegram WebApp initData and extract user info."""
-    if not BOT_TOKEN:
-        return None
-
-    try:
-        parsed = urllib.parse.parse_qs(init_data)
-        data_check_string_parts = []
-        received_hash = None
-
-        for key in sorted(parsed.keys()):
-            if key == "hash":
-                received_hash = parsed[key][0]
-            else:
-                data_check_string_parts.append(f"{key}={parsed[key][0]}")
+    def user_state(self, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Per-request fields: the clock plus this player's own numbers."""
+        state: Dict[str, Any] = {"time_remaining": self.time_remaining()}
+        if user_id and user_id in self.players:
+            state["my_rank"] = self.get_player_rank(user_id)
+            state["my_score"] = self.players[user_id]["score"]
+            state["my_correct"] = self.players[user_id]["correct"]
+            state["my_wrong"] = self.players[user_id]["wrong"]
+            state["already_answered"] = user_id in self._answered
+        return state
 
-        if not received_hash:
-            return None
+    def to_state_dict(self, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Return current state for frontend."""
+        return {**self.shared_state(), **self.user_state(user_id)}
+
+    def is_idle(self) -> bool:
+        """No round loop and no open /events streams."""
+        return (self._driver is None or self._driver.done()) and not self._listeners
+
+    def memory_estimate(self) -> int:
+        """Approximate bytes held by this game's state (walks players and results)."""
+        return (
+            _deep_sizeof(self.players)
+            + _deep_sizeof(self._inbox)
+            + _deep_sizeof(self.round_results)
+            + _deep_sizeof(self.current_question)
+            + _deep_sizeof(self._join_seq)
+            + sys.getsizeof(self._shared_bytes)
+            + 64 * (len(self.ranks) + len(self._listeners))
+        )
 
-        data_check_string = "\n".join(data_check_string_parts)
-        secret_key = hmac.new(b"WebAppData", BOT_TOKEN.encode(), hashlib.sha256).digest()
-        computed_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    def state_bytes(self, user_id: Optional[int] = None) -> bytes:
+        """`to_state_dict` as JSON, splicing the cached shared bytes with the user part."""
+        self.shared_state()
+        user = json.dumps(self.user_state(user_id), separators=(",", ":")).encode()
+        return self._shared_bytes[:-1] + b"," + user[1:]
+
+
+def _wake_up(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
+
+def _deep_sizeof(obj: Any) -> int:
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k) + _deep_sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_sizeof(v) for v in obj)
+    return size
+
+
+class GameRegistry:
+    """
+    All classroom games in this process, keyed by room code.
+
+    The default room backs the legacy `/api/...` routes and is never evicted.
+    Other rooms are dropped by `evict_idle()` once they have had no state
+    change for `idle_seconds` and have no round loop or open streams.
+    """
+
+    # no 0/O/1/I, codes are read out loud in class
+    CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+    def __init__(self, *, idle_seconds: float, max_rooms: int):
+        self.idle_seconds = idle_seconds
+        self.max_rooms = max(1, max_rooms)
+        self._rooms: Dict[str, ClassroomGame] = {DEFAULT_ROOM: ClassroomGame()}
+        self.evicted = 0
+        self.journal: Optional[GameJournal] = None
+
+    @property
+    def default(self) -> ClassroomGame:
+        return self._rooms[DEFAULT_ROOM]
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def __iter__(self):
+        return iter(self._rooms.values())
+
+    def get(self, code: str) -> Optional[ClassroomGame]:
+        return self._rooms.get(code.upper())
+
+    def create(self) -> Optional[str]:
+        """Create a room with a fresh code; None if the registry is full."""
+        if len(self._rooms) >= self.max_rooms:
+            self.evict_idle()
+            if len(self._rooms) >= self.max_rooms:
+                return None
+        while True:
+            code = "".join(secrets.choice(self.CODE_ALPHABET) for _ in range(ROOM_CODE_LENGTH))
+            if code not in self._rooms:
+                break
+        self._rooms[code] = ClassroomGame()
+        self._hook(code)
+        self._log(code, "create")
+        return code
+
+    def remove(self, code: str) -> bool:
+        code = code.upper()
+        if code == DEFAULT_ROOM or code not in self._rooms:
+            return False
+        room = self._rooms.pop(code)
+        room.journal = None
+        room.close_listeners()
+        room.reset()
+        self._log(code, "drop")
+        return True
 
-        if computed_hash != received_hash:
-            log.warning("TMA auth failed: hash mismatch")
-            return None
+    def evict_idle(self) -> int:
+        now = time.monotonic()
+        stale = [
+            code
+            for code, room in self._rooms.items()
+            if code != DEFAULT_ROOM and room.is_idle() and now - room.last_activity > self.idle_seconds
+        ]
+        for code in stale:
+            self.remove(code)
+        self.evicted += len(stale)
+        return len(stale)
+
+    # ---- crash recovery ----
+    def _log(self, code: str, kind: str):
+        if self.journal is not None:
+            self.journal.record(code, kind, {})
+
+    def _hook(self, code: str):
+        room = self._rooms[code]
+        room.journal = None if self.journal is None else functools.partial(self.journal.record, code)
+
+    def attach_journal(self, journal: Optional[GameJournal]):
+        """Record every room's transitions in `journal` (None detaches)."""
+        self.journal = journal
+        for code in self._rooms:
+            self._hook(code)
+
+    def snapshots(self) -> Dict[str, Dict[str, Any]]:
+        return {code: room.snapshot() for code, room in self._rooms.items()}
+
+    def restore(self, snapshots: Dict[str, Dict[str, Any]], entries: List[Dict[str, Any]]) -> int:
+        """
+        Rebuild rooms from a checkpoint plus the journal entries after it.
+        Call before attach_journal(), then resume() each room.
+        """
+        for code, snap in snapshots.items():
+            self._rooms.setdefault(code, ClassroomGame()).restore(snap)
+        for entry in entries:
+            code, kind = entry["room"], entry["kind"]
+            if kind == "drop":
+                if code != DEFAULT_ROOM:
+                    self._rooms.pop(code, None)
+                continue
+            room = self._rooms.setdefault(code, ClassroomGame())
+            if kind != "create":
+                room.apply(kind, entry["data"])
+        return len(entries)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        rooms = [
+            {
+                "room": code,
+                "players": room.player_count(),
+                "streams": len(room._listeners),
+                "is_running": room.is_running,
+                "idle_seconds": round(now - room.last_activity, 1),
+                "bytes": room.memory_estimate(),
+            }
+            for code, room in self._rooms.items()
+        ]
+        return {
+            "rooms": len(rooms),
+            "evicted": self.evicted,
+            "bytes_total": sum(r["bytes"] for r in rooms),
+            "per_room": rooms,
+        }
 
-        # Extract user
-        if "user" in parsed:
-            user_data = json.loads(parsed["user"][0])
-            return user_data
-        return None
 
-    except Exception as e:
-        log.warning(f"TMA auth error: {e}")
-        return None
+games = GameRegistry(idle_seconds=TMA_ROOM_IDLE_SECONDS, max_rooms=TMA_MAX_ROOMS)
+# The default room, for code that predates rooms
+game = games.default
 
 
 # ---------------------------------------------------------------------------
@@ -312,8 +696,24 @@ async def handle_index(request: web.Request) -> web.Response:
     return web.Response(text="TMA index.html not found", status=404)
 
 
+def _room_code(request: web.Request) -> str:
+    return request.match_info.get("room", DEFAULT_ROOM).upper()
+
+
+def _room(request: web.Request) -> Optional[ClassroomGame]:
+    return games.get(_room_code(request))
+
+
+def _no_room() -> web.Response:
+    return web.json_response({"ok": False, "error": "Unknown room"}, status=404)
+
+
 async def handle_state(request: web.Request) -> web.Response:
-    """Get current game state."""
+    """Get current game state (304 if the client's ETag is still current)."""
+    room = _room(request)
+    if room is None:
+        return _no_room()
+
     user_id = None
     init_data = request.headers.get("X-Telegram-Init-Data", "")
     if init_data:
@@ -321,12 +721,95 @@ async def handle_state(request: web.Request) -> web.Response:
         if user:
             user_id = user.get("id")
 
-    state = game.to_state_dict(user_id)
-    return web.json_response(state)
+    # every field except time_remaining changes only with the version,
+    # and clients count time_remaining down locally
+    etag = f'W/"{room.tag}-{user_id or 0}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("If-None-Match") == etag:
+        return web.Response(status=304, headers=headers)
+    return web.Response(
+        body=room.state_bytes(user_id), content_type="application/json", headers=headers
+    )
+
+
+def _sse_event(event: str, event_id: str, data: Dict[str, Any]) -> bytes:
+    payload = json.dumps(data, separators=(",", ":"))
+    return f"event: {event}\nid: {event_id}\ndata: {payload}\n\n".encode()
+
+
+async def handle_events(request: web.Request) -> web.StreamResponse:
+    """
+    Server-Sent Events stream of the game state.
+
+    The first event is a full `state` snapshot. After that, every state change
+    sends a `patch` with only the top-level keys that differ from what this
+    connection last got (null = key removed). A reconnect whose Last-Event-ID
+    matches the current tag (epoch + version) gets no snapshot until something changes.
+    EventSource can't set headers, so browsers identify with the short-lived
+    `session` token from /join in the query string, never the raw initData
+    (URLs end up in access logs and history). Without one the stream carries
+    the anonymous view.
+    """
+    room = _room(request)
+    if room is None:
+        return _no_room()
+
+    user_id = None
+    token = request.query.get("session", "")
+    if token:
+        user_id = check_session(_room_code(request), token)
+    else:
+        init_data = request.headers.get("X-Telegram-Init-Data", "")
+        user = validate_init_data(init_data) if init_data else None
+        if user:
+            user_id = user.get("id")
+
+    resp = web.StreamResponse(
+        headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+    await resp.prepare(request)
+
+    listener = room.subscribe()
+    sent: Optional[Dict[str, Any]] = None
+    try:
+        if request.headers.get("Last-Event-ID") != room.tag:
+            sent = room.to_state_dict(user_id)
+            await resp.write(_sse_event("state", room.tag, sent))
+
+        while True:
+            try:
+                version = await asyncio.wait_for(listener.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                await resp.write(b": ping\n\n")
+                continue
+            if version is None:
+                break
+
+            state = room.to_state_dict(user_id)
+            if sent is None:
+                await resp.write(_sse_event("state", room.tag, state))
+            else:
+                patch = {k: v for k, v in state.items() if sent.get(k, _MISSING) != v}
+                patch.update({k: None for k in sent if k not in state})
+                await resp.write(_sse_event("patch", room.tag, patch))
+            sent = state
+    except ConnectionResetError:
+        pass  # client went away
+    finally:
+        room.unsubscribe(listener)
+    return resp
 
 
 async def handle_join(request: web.Request) -> web.Response:
     """Join the game lobby."""
+    room = _room(request)
+    if room is None:
+        return _no_room()
+
     init_data = request.headers.get("X-Telegram-Init-Data", "")
     user = validate_init_data(init_data)
     if not user:
@@ -337,12 +820,21 @@ async def handle_join(request: web.Request) -> web.Response:
     if user.get("last_name"):
         name += " " + user.get("last_name")
 
-    ok = game.join(user_id, name)
-    return web.json_response({"ok": ok})
+    ok = room.join(user_id, name)
+    resp: Dict[str, Any] = {"ok": ok}
+    if user_id in room.players:
+        # lets the client use /answer/fast (also when rejoining a running game)
+        resp["session"] = issue_session(_room_code(request), user_id)
+    return web.json_response(resp)
 
 
 async def handle_answer(request: web.Request) -> web.Response:
     """Submit answer for current round."""
+    arrived = time.monotonic()
+    room = _room(request)
+    if room is None:
+        return _no_room()
+
     init_data = request.headers.get("X-Telegram-Init-Data", "")
     user = validate_init_data(init_data)
     if not user:
@@ -355,22 +847,53 @@ async def handle_answer(request: web.Request) -> web.Response:
         return web.json_response({"ok": False, "error": "Invalid body"}, status=400)
 
     user_id = user.get("id")
-    ok = game.submit_answer(user_id, choice)
+    ok = room.submit_answer(user_id, choice, arrived)
     return web.json_response({"ok": ok})
 
 
+_ANSWER_OK = b'{"ok":true}'
+_ANSWER_REJECTED = b'{"ok":false}'
+
+
+async def handle_answer_fast(request: web.Request) -> web.Response:
+    """
+    Compact answer submission for the burst right after a question appears:
+    X-TMA-Session header from /join, body is just the option index.
+    """
+    arrived = time.monotonic()
+    room = _room(request)
+    if room is None:
+        return _no_room()
+
+    user_id = check_session(_room_code(request), request.headers.get("X-TMA-Session", ""))
+    if user_id is None:
+        return web.json_response({"ok": False, "error": "Invalid session"}, status=401)
+
+    try:
+        choice = int(await request.read())
+    except ValueError:
+        return web.json_response({"ok": False, "error": "Invalid body"}, status=400)
+
+    ok = room.submit_answer(user_id, choice, arrived)
+    return web.Response(
+        body=_ANSWER_OK if ok else _ANSWER_REJECTED, content_type="application/json"
+    )
+
+
 # Admin endpoints (simple token-based for classroom use)
 
 
 def check_admin(request: web.Request) -> bool:
-    token = request.headers.get("X-Admin-Token", "")
-    return token == ADMIN_TOKEN
+    return check_admin_token(request.headers.get("X-Admin-Token", ""))
 
 
 async def handle_admin_open(request: web.Request) -> web.Response:
     """Admin: open lobby for joining."""
     if not check_admin(request):
         return web.json_response({"ok": False, "error": "Unauthorized"}, status=403)
+    room = _room(request)
+    if room is None:
+        return _no_room()
 
     try:
         body = await request.json()
@@ -379,7 +902,7 @@ async def handle_admin_open(request: web.Request) -> web.Response:
     except:
         rounds, seconds = 10, 12
 
-    game.open_lobby(rounds, seconds)
+    room.open_lobby(rounds, seconds)
     return web.json_response({"ok": True})
 
 
@@ -387,10 +910,11 @@ async def handle_admin_start(request: web.Request) -> web.Response:
     """Admin: start the game."""
     if not check_admin(request):
         return web.json_response({"ok": False, "error": "Unauthorized"}, status=403)
+    room = _room(request)
+    if room is None:
+        return _no_room()
 
-    ok = game.start_game()
-    if ok:
-        game.next_round()
+    ok = room.start_rounds()
     return web.json_response({"ok": ok})
 
 
@@ -398,8 +922,11 @@ async def handle_admin_reset(request: web.Request) -> web.Response:
     """Admin: reset game to initial state."""
     if not check_admin(request):
         return web.json_response({"ok": False, "error": "Unauthorized"}, status=403)
+    room = _room(request)
+    if room is None:
+        return _no_room()
 
-    game.reset()
+    room.reset()
     return web.json_response({"ok": True})
 
 
@@ -407,13 +934,33 @@ async def handle_admin_next(request: web.Request) -> web.Response:
     """Admin: manually advance to next round."""
     if not check_admin(request):
         return web.json_response({"ok": False, "error": "Unauthorized"}, status=403)
+    room = _room(request)
+    if room is None:
+        return _no_room()
 
-    if game.current_question:
-        game.end_round()
-    ok = game.next_round()
+    ok = room.advance_now()
     return web.json_response({"ok": ok})
 
 
+async def handle_admin_create_room(request: web.Request) -> web.Response:
+    """Admin: create a new room and return its code."""
+    if not check_admin(request):
+        return web.json_response({"ok": False, "error": "Unauthorized"}, status=403)
+
+    code = games.create()
+    if code is None:
+        return web.json_response({"ok": False, "error": "Too many rooms"}, status=503)
+    return web.json_response({"ok": True, "room": code})
+
+
+async def handle_admin_rooms(request: web.Request) -> web.Response:
+    """Admin: list rooms with player counts and memory estimates."""
+    if not check_admin(request):
+        return web.json_response({"ok": False, "error": "Unauthorized"}, status=403)
+
+    return web.json_response({"ok": True, **games.stats()})
+
+
 # ---------------------------------------------------------------------------
 # App factory
 # ---------------------------------------------------------------------------
@@ -423,36 +970,86 @@ def create_tma_app() -> web.Application:
 
     # Routes
     app.router.add_get("/", handle_index)
-    app.router.add_get("/api/state", handle_state)
-    app.router.add_post("/api/join", handle_join)
-    app.router.add_post("/api/answer", handle_answer)
-
-    # Admin routes
-    app.router.add_post("/api/admin/open", handle_admin_open)
-    app.router.add_post("/api/admin/start", handle_admin_start)
-    app.router.add_post("/api/admin/reset", handle_admin_reset)
-    app.router.add_post("/api/admin/next", handle_admin_next)
+    # /api/... is the default room; /api/rooms/{room}/... any other room
+    for prefix in ("/api", "/api/rooms/{room}"):
+        app.router.add_get(prefix + "/state", handle_state)
+        app.router.add_get(prefix + "/events", handle_events)
+        app.router.add_post(prefix + "/join", handle_join)
+        app.router.add_post(prefix + "/answer", handle_answer)
+        app.router.add_post(prefix + "/answer/fast", handle_answer_fast)
+
+        # Admin routes
+        app.router.add_post(prefix + "/admin/open", handle_admin_open)
+        app.router.add_post(prefix + "/admin/start", handle_admin_start)
+        app.router.add_post(prefix + "/admin/reset", handle_admin_reset)
+        app.router.add_post(prefix + "/admin/next", handle_admin_next)
+
+    app.router.add_get("/api/admin/rooms", handle_admin_rooms)
+    app.router.add_post("/api/admin/rooms", handle_admin_create_room)
 
     # Static files
     static_path = os.path.join(os.path.dirname(__file__), "static")
     if os.path.isdir(static_path):
         app.router.add_static("/static/", static_path, name="static")
 
-    # Background task
+    def sweep_rooms():
+        evicted = games.evict_idle()
+        if evicted:
+            log.info("Evicted %d idle TMA rooms", evicted)
+        timers.call_later(ROOM_SWEEP_SECONDS, sweep_rooms)
+
+    async def flush_journal():
+        try:
+            await games.journal.flush()
+        except Exception:
+            log.exception("TMA journal flush failed")
+        timers.call_later(TMA_JOURNAL_FLUSH_SECONDS, flush_journal)
+
+    async def checkpoint_rooms():
+        try:
+            await games.journal.checkpoint(games.snapshots())
+        except Exception:
+            log.exception("TMA checkpoint failed")
+        timers.call_later(TMA_CHECKPOINT_SECONDS, checkpoint_rooms)
+
     async def start_background(app):
-        global _round_task
-        _round_task = asyncio.create_task(round_timer_loop(app))
+        with phase("warm question bank"):
+            questions.warm()
+        journal = GameJournal(TMA_JOURNAL_PATH, adb)
+        with phase("restore classroom rooms"):
+            snapshots, entries = journal.load()
+            replayed = games.restore(snapshots, entries)
+        if snapshots or replayed:
+            log.info("Restored %d TMA rooms (%d journal entries replayed)", len(games), replayed)
+        games.attach_journal(journal)
+        for room in games:
+            room.resume()
+        timers.call_later(ROOM_SWEEP_SECONDS, sweep_rooms)
+        timers.call_later(TMA_JOURNAL_FLUSH_SECONDS, flush_journal)
+        timers.call_later(TMA_CHECKPOINT_SECONDS, checkpoint_rooms)
+        ready("tma serving")
+
+    async def close_streams(app):
+        for room in games:
+            room.close_listeners()
 
     async def stop_background(app):
-        global _round_task
-        if _round_task:
-            _round_task.cancel()
+        # Checkpoint, then detach so the resets below are not journaled:
+        # a restart picks the games up where they were.
+        if games.journal is not None:
             try:
-                await _round_task
-            except asyncio.CancelledError:
-                pass
+                await games.journal.checkpoint(games.snapshots())
+            except Exception:
+                log.exception("Final TMA checkpoint failed")
+            games.attach_journal(None)
+        for room in games:
+            room.reset()
+        await timers.close()
+        adb.close()
+        db.close()
 
     app.on_startup.append(start_background)
+    app.on_shutdown.append(close_streams)
     app.on_cleanup.append(stop_background)
 
     return app
@@ -460,7 +1057,8 @@ def create_tma_app() -> web.Application:
 
 def run_tma_server(host: str = "0.0.0.0", port: int = 8080):
     """Run the TMA server standalone."""
-    app = create_tma_app()
+    with phase("create_tma_app"):
+        app = create_tma_app()
     log.info(f"Starting TMA server on {host}:{port}")
     web.run_app(app, host=host, port=port)
 
@@ -0,0 +1,93 @@
+"""
+Where the serverless adapter keeps classroom game state between invocations.
+
+A store maps a key (one per room) to a JSON document. `update()` runs a
+read-modify-write under the store's exclusive lock/transaction, so two
+concurrent invocations can't both act on the same old state.
+
+- `MemoryStore`: a dict in this process. Local development and tests; on a
+  serverless platform it only lives as long as the warm instance.
+- `SQLiteStore`: a SQLite file; `BEGIN IMMEDIATE` serializes writers across
+  processes that share the file.
+
+`store_from_env()` picks one from config.TMA_STATE_STORE ("memory" or
+"sqlite:<path>").
+"""
+
+import json
+import sqlite3
+import threading
+from typing import Any, Callable, Optional, TypeVar
+
+from .config import TMA_STATE_STORE
+
+Doc = dict[str, Any]
+T = TypeVar("T")
+
+
+class MemoryStore:
+    def __init__(self) -> None:
+        self._docs: dict[str, str] = {}  # serialized, like an external KV would hold it
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Doc]:
+        raw = self._docs.get(key)
+        return None if raw is None else json.loads(raw)
+
+    def update(self, key: str, fn: Callable[[Optional[Doc]], tuple[Optional[Doc], T]]) -> T:
+        """`fn(current) -> (new doc or None to leave it, result)`, atomically."""
+        with self._lock:
+            doc, result = fn(self.get(key))
+            if doc is not None:
+                self._docs[key] = json.dumps(doc, separators=(",", ":"))
+            return result
+
+
+class SQLiteStore:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # opened on first use and kept for the life of a warm instance
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS tma_state (key TEXT PRIMARY KEY, doc TEXT NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Doc]:
+        with self._lock:
+            row = self._connection().execute("SELECT doc FROM tma_state WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def update(self, key: str, fn: Callable[[Optional[Doc]], tuple[Optional[Doc], T]]) -> T:
+        """`fn(current) -> (new doc or None to leave it, result)`, in one write transaction."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT doc FROM tma_state WHERE key = ?", (key,)).fetchone()
+                doc, result = fn(None if row is None else json.loads(row[0]))
+                if doc is not None:
+                    conn.execute(
+                        "INSERT INTO tma_state(key, doc) VALUES (?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET doc = excluded.doc",
+                        (key, json.dumps(doc, separators=(",", ":"))),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return result
+
+
+def store_from_env(spec: str = TMA_STATE_STORE) -> "MemoryStore | SQLiteStore":
+    if spec == "memory":
+        return MemoryStore()
+    if spec.startswith("sqlite:"):
+        return SQLiteStore(spec[len("sqlite:"):])
+    raise ValueError(f"Unknown TMA_STATE_STORE: {spec!r}")
@@ -0,0 +1,104 @@
+"""
+In-process LRU cache of `users` rows.
+
+`helpers.display_name` reads from it. `helpers.cache_user` writes through
+only when the username, full name or chat actually changed, or when the
+cached `updated_at` is older than `touch_seconds`. Unchanged button presses
+cost no SQL at all.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .async_db import AsyncDB
+
+# cached "no such user" marker, so repeated lookups of unknown ids stay in memory
+_MISSING: dict[str, Any] = {}
+
+
+class UserCache:
+    def __init__(self, adb: AsyncDB, *, capacity: int = 2048, touch_seconds: int = 300):
+        self.adb = adb
+        self.capacity = max(1, capacity)
+        self.touch_seconds = touch_seconds
+        self._entries: "OrderedDict[int, dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.skipped_writes = 0
+
+    def _store(self, user_id: int, entry: dict[str, Any]) -> None:
+        # caller holds self._lock
+        self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    async def get(self, user_id: int) -> Optional[dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry or None
+
+        self.misses += 1
+        # misses go through AsyncDB: callers are handlers on the event loop
+        row = await self.adb.get_user(user_id)
+        entry = dict(row) if row else _MISSING
+        with self._lock:
+            # a concurrent cache_user() may have stored fresher data meanwhile
+            if user_id not in self._entries:
+                self._store(user_id, entry)
+            entry = self._entries[user_id]
+        return entry or None
+
+    def claim_write(
+        self, user_id: int, username: str, full_name: str, last_chat_id: int, now: int
+    ) -> bool:
+        """
+        Record the latest profile and return True if it must be written to the DB.
+        Callers that get True are expected to run `db.upsert_user` themselves.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if (
+                entry
+                and entry.get("username") == username
+                and entry.get("full_name") == full_name
+                and entry.get("last_chat_id") == last_chat_id
+                and now - int(entry.get("updated_at") or 0) < self.touch_seconds
+            ):
+                self._entries.move_to_end(user_id)
+                self.skipped_writes += 1
+                return False
+
+            self._store(
+                user_id,
+                {
+                    "user_id": user_id,
+                    "username": username,
+                    "full_name": full_name,
+                    "last_chat_id": last_chat_id,
+                    "updated_at": now,
+                },
+            )
+            self.writes += 1
+            return True
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "skipped_writes": self.skipped_writes,
+        }
@@ -0,0 +1,270 @@
+"""
+In-memory vocab index used by `DB.build_question`.
+
+Rows are stored column-wise (parallel lists addressed by position) together
+with, per task type, the positions of the rows that can produce a question of
+that type. Picking a target or sampling k distractors is then O(k) instead of
+an `ORDER BY RANDOM()` scan over the whole table.
+
+Synonyms/antonyms are also indexed the other way round (term -> rows listing
+it), so distractors can leave out every word related to the target, whichever
+side of the pair lists the relation.
+
+The index is append-only; wiping the vocab replaces the whole index object, so
+a caller holding a reference always sees consistent positions.
+"""
+
+import html
+import random
+import threading
+from typing import AbstractSet, Any, Iterable, Optional
+
+from .config import TASK_TYPES
+
+
+class VocabIndex:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+        self.ids: list[int] = []
+        self.words: list[str] = []
+        self.definitions: list[str] = []
+        self.translations: list[str] = []
+        self.examples: list[str] = []
+        self.synonyms: list[list[str]] = []
+        self.antonyms: list[list[str]] = []
+
+        # task type -> positions of rows eligible for that task
+        self.eligible: dict[str, list[int]] = {t: [] for t in TASK_TYPES}
+        self.with_word: list[int] = []
+        # kind -> casefolded term -> positions of rows listing it as that kind
+        self.listed_by: dict[str, dict[str, list[int]]] = {"synonym": {}, "antonym": {}}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any], relations: Iterable[Any] = ()) -> "VocabIndex":
+        """`rows` from `vocab`, `relations` as (vocab_id, kind, term) from `vocab_relation`."""
+        related: dict[str, dict[int, list[str]]] = {"synonym": {}, "antonym": {}}
+        for vocab_id, kind, term in relations:
+            by_id = related.get(kind)
+            if by_id is not None:
+                by_id.setdefault(vocab_id, []).append(term)
+        synonyms, antonyms = related["synonym"], related["antonym"]
+
+        idx = cls()
+        for r in rows:
+            vocab_id = int(r["id"])
+            idx.add(
+                vocab_id,
+                r["word"],
+                r["definition"],
+                r["translation"],
+                synonyms.get(vocab_id, []),
+                antonyms.get(vocab_id, []),
+                r["example"],
+            )
+        return idx
+
+    @classmethod
+    def from_dicts(cls, items: Iterable[dict[str, Any]]) -> "VocabIndex":
+        """From vocab.json-style dicts (word, synonyms, antonyms, ...); ids are 1-based positions."""
+        idx = cls()
+        for i, v in enumerate(items, start=1):
+            idx.add(
+                i,
+                v.get("word"),
+                v.get("definition"),
+                v.get("translation"),
+                v.get("synonyms") or [],
+                v.get("antonyms") or [],
+                v.get("example"),
+            )
+        return idx
+
+    def add(
+        self,
+        vocab_id: int,
+        word: Optional[str],
+        definition: Optional[str],
+        translation: Optional[str],
+        synonyms: list[str],
+        antonyms: list[str],
+        example: Optional[str],
+    ) -> None:
+        word = (word or "").strip()
+        definition = (definition or "").strip()
+        translation = (translation or "").strip()
+        example = (example or "").strip()
+        synonyms = [s.strip() for s in synonyms if s and s.strip()]
+        antonyms = [a.strip() for a in antonyms if a and a.strip()]
+
+        with self._lock:
+            pos = len(self.ids)
+            # fill the row first, then publish its position in the eligibility lists
+            self.words.append(word)
+            self.definitions.append(definition)
+            self.translations.append(translation)
+            self.examples.append(example)
+            self.synonyms.append(synonyms)
+            self.antonyms.append(antonyms)
+            self.ids.append(vocab_id)
+
+            if word:
+                self.with_word.append(pos)
+            for kind, terms in (("synonym", synonyms), ("antonym", antonyms)):
+                by_term = self.listed_by[kind]
+                for term in terms:
+                    by_term.setdefault(term.casefold(), []).append(pos)
+            for task_type, ok in (
+                ("SYNONYM", bool(synonyms)),
+                ("ANTONYM", bool(antonyms)),
+                ("TRANSLATE", bool(translation)),
+                ("DEFINITION", bool(definition)),
+                ("GAPFILL", bool(example)),
+            ):
+                if ok and task_type in self.eligible:
+                    self.eligible[task_type].append(pos)
+
+    def pick(self, task_type: str) -> Optional[int]:
+        """Random position of a row eligible for `task_type` (any row for unknown types)."""
+        pool = self.eligible.get(task_type)
+        if pool is None:
+            pool = self.with_word
+        if not pool:
+            return None
+        return random.choice(pool)
+
+    def related(self, pos: int, kind: str) -> set[str]:
+        """Casefolded words that are `kind` ("synonym"/"antonym") of the row at `pos`."""
+        own = self.synonyms[pos] if kind == "synonym" else self.antonyms[pos]
+        out = {t.casefold() for t in own}
+        for other in self.listed_by[kind].get(self.words[pos].casefold(), ()):
+            out.add(self.words[other].casefold())
+        return out
+
+    def build_question(self, task_type: str, k_options: int = 4) -> Optional[dict[str, Any]]:
+        """Random multiple-choice question of `task_type`, or None if no row fits."""
+        pos = self.pick(task_type)
+        if pos is None:
+            return None
+
+        vocab_id = self.ids[pos]
+        word = self.words[pos]
+        definition = self.definitions[pos]
+        translation = self.translations[pos]
+        example = self.examples[pos]
+        synonyms = self.synonyms[pos]
+        antonyms = self.antonyms[pos]
+
+        correct: Optional[str] = None
+        distractors: list[str] = []
+        prompt: str = ""
+        # word-type distractors that would also be a right answer
+        exclude = {word.casefold()}
+
+        if task_type == "SYNONYM":
+            if not synonyms:
+                return None
+            correct = random.choice(synonyms)
+            prompt = f"Pick a <b>synonym</b> for:\n<b>{html.escape(word)}</b>"
+            exclude |= self.related(pos, "synonym")
+            distractors = self.sample_words(k_options - 1, exclude_pos=pos, exclude=exclude)
+
+        elif task_type == "ANTONYM":
+            if not antonyms:
+                return None
+            correct = random.choice(antonyms)
+            prompt = f"Pick an <b>antonym</b> for:\n<b>{html.escape(word)}</b>"
+            exclude |= self.related(pos, "antonym")
+            distractors = self.sample_words(k_options - 1, exclude_pos=pos, exclude=exclude)
+
+        elif task_type == "TRANSLATE":
+            if not translation:
+                return None
+            correct = translation
+            prompt = f"Pick the <b>translation</b> for:\n<b>{html.escape(word)}</b>"
+            distractors = self.sample_translations(k_options - 1, exclude_pos=pos)
+
+        elif task_type == "DEFINITION":
+            if not definition:
+                return None
+            correct = definition
+            prompt = f"Pick the <b>definition</b> of:\n<b>{html.escape(word)}</b>"
+            distractors = self.sample_definitions(k_options - 1, exclude_pos=pos)
+
+        elif task_type == "GAPFILL":
+            if not example:
+                return None
+            blanked = example
+            if word and word.lower() in blanked.lower():
+                blanked = blanked.replace(word, "____").replace(word.capitalize(), "____")
+            else:
+                blanked = blanked + " (____)"
+            correct = word
+            prompt = f"Fill the blank:\n<blockquote>{html.escape(blanked)}</blockquote>"
+            # a synonym of the word fits the blank just as well
+            exclude |= self.related(pos, "synonym")
+            distractors = self.sample_words(k_options - 1, exclude_pos=pos, exclude=exclude)
+        else:
+            return None
+
+        options = [correct] + [d for d in distractors if d and d != correct]
+        options = list(dict.fromkeys([o.strip() for o in options if o and o.strip()]))
+
+        if len(options) < k_options:
+            pad = self.sample_words(k_options - len(options), exclude_pos=pos, exclude=exclude)
+            for p in pad:
+                if p not in options:
+                    options.append(p)
+
+        if len(options) < 2:
+            return None
+
+        options = options[:k_options]
+        random.shuffle(options)
+        correct_idx = options.index(correct)
+
+        return {
+            "task_type": task_type,
+            "vocab_id": vocab_id,
+            "prompt": prompt,
+            "options": options,
+            "correct_idx": correct_idx,
+        }
+
+    def sample_words(
+        self, limit: int, exclude_pos: int, exclude: AbstractSet[str] = frozenset()
+    ) -> list[str]:
+        """Up to `limit` distinct words, skipping `exclude_pos` and casefolded `exclude`."""
+        return self._sample(self.with_word, self.words, limit, exclude_pos, exclude)
+
+    def sample_translations(self, limit: int, exclude_pos: int) -> list[str]:
+        return self._sample(self.eligible["TRANSLATE"], self.translations, limit, exclude_pos)
+
+    def sample_definitions(self, limit: int, exclude_pos: int) -> list[str]:
+        return self._sample(self.eligible["DEFINITION"], self.definitions, limit, exclude_pos)
+
+    @staticmethod
+    def _sample(
+        pool: list[int],
+        column: list[str],
+        limit: int,
+        exclude_pos: int,
+        exclude: AbstractSet[str] = frozenset(),
+    ) -> list[str]:
+        if limit <= 0 or not pool:
+            return []
+        # oversample a little so duplicates / the excluded row don't leave us short
+        picks = random.sample(pool, min(len(pool), limit * 6))
+        out: list[str] = []
+        for pos in picks:
+            if pos == exclude_pos:
+                continue
+            v = column[pos]
+            if v and v not in out and v.casefold() not in exclude:
+                out.append(v)
+                if len(out) >= limit:
+                    break
+        return out
@@ -0,0 +1,94 @@
+"""
+Write-behind buffer for `event_players` stat counters.
+
+Round and duel results are accumulated here as per-(event_id, user_id) deltas
+and written in one `executemany` transaction by `DB.flush_results()`. Reads in
+`DB` overlay the pending deltas, so callers never see stale numbers.
+
+A flush moves the pending deltas to an in-flight map (`take`) and clears it
+once the transaction has committed (`settle`), so reads still see rows that
+are being written without the flush holding any lock across the I/O.
+"""
+
+import threading
+from typing import Optional
+
+# order matters: matches the UPDATE in DB.flush_results()
+FIELDS = ("points", "correct", "wrong", "wins", "losses")
+
+Key = tuple[int, int]
+
+
+class ResultBuffer:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: dict[Key, list[int]] = {}
+        # taken by a flush that has not committed yet
+        self._in_flight: dict[Key, list[int]] = {}
+        self.flushes = 0
+        self.rows_flushed = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(
+        self,
+        event_id: int,
+        user_id: int,
+        *,
+        points: int = 0,
+        correct: int = 0,
+        wrong: int = 0,
+        wins: int = 0,
+        losses: int = 0,
+    ) -> None:
+        with self._lock:
+            d = self._pending.setdefault((event_id, user_id), [0] * len(FIELDS))
+            d[0] += points
+            d[1] += correct
+            d[2] += wrong
+            d[3] += wins
+            d[4] += losses
+
+    def _unflushed(self, key: Key) -> Optional[list[int]]:
+        # caller holds self._lock
+        a, b = self._pending.get(key), self._in_flight.get(key)
+        if a and b:
+            return [x + y for x, y in zip(a, b)]
+        return a or b
+
+    def delta(self, event_id: int, user_id: int) -> Optional[dict[str, int]]:
+        with self._lock:
+            d = self._unflushed((event_id, user_id))
+            return dict(zip(FIELDS, d)) if d else None
+
+    def for_event(self, event_id: int) -> dict[int, dict[str, int]]:
+        with self._lock:
+            keys = {k for k in (*self._pending, *self._in_flight) if k[0] == event_id}
+            return {k[1]: dict(zip(FIELDS, self._unflushed(k))) for k in keys}
+
+    def discard(self, event_id: int, user_id: int) -> None:
+        with self._lock:
+            self._pending.pop((event_id, user_id), None)
+            self._in_flight.pop((event_id, user_id), None)
+
+    def take(self) -> list[tuple[int, ...]]:
+        """Move all pending deltas in flight and return them as (*FIELDS, event_id, user_id) rows."""
+        with self._lock:
+            assert not self._in_flight, "previous flush not settled"
+            self._in_flight, self._pending = self._pending, {}
+            return [(*d, eid, uid) for (eid, uid), d in self._in_flight.items()]
+
+    def settle(self) -> None:
+        """The taken rows are committed: stop overlaying them."""
+        with self._lock:
+            self._in_flight = {}
+
+    def restore(self) -> None:
+        """The flush failed: put the taken rows back, merged with anything added since."""
+        with self._lock:
+            for key, d in self._in_flight.items():
+                p = self._pending.setdefault(key, [0] * len(FIELDS))
+                for i, v in enumerate(d):
+                    p[i] += v
+            self._in_flight = {}
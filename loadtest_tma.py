@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Load test for classroom answer ingestion.
+
+Starts run_tma.py in a child process on a free port with a throwaway
+database, joins N players over HTTP, warms one keep-alive connection per
+player and (unless --no-streams) keeps each player's /api/events stream
+open like the Mini App does, then fires all N answers for one question at
+once and reports client-side latency percentiles.
+
+Client and server share the machine, so on few cores the numbers are an
+upper bound on what the server alone would show.
+
+Usage:
+  python loadtest_tma.py [--players 500] [--path fast|legacy|both] [--no-streams]
+                         [--p99-budget-ms 500]
+
+Exits with status 1 if a measured p99 is over the budget.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+import aiohttp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BOT_TOKEN = "123456:loadtest"
+ADMIN_TOKEN = "loadtest"
+SEED_WORDS = ["happy", "sad", "big", "small", "fast", "slow", "hot", "cold", "old", "new"]
+
+
+def make_init_data(user_id: int) -> str:
+    """initData signed the way Telegram does it, with the test BOT_TOKEN."""
+    fields = {
+        "auth_date": str(int(time.time())),
+        "query_id": f"lt{user_id}",
+        "user": json.dumps({"id": user_id, "first_name": f"P{user_id}"}, separators=(",", ":")),
+    }
+    check = "\n".join(f"{k}={fields[k]}" for k in sorted(fields))
+    secret = hmac.new(b"WebAppData", BOT_TOKEN.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret, check.encode(), hashlib.sha256).hexdigest()
+    return urllib.parse.urlencode(fields)
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    idx = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+def start_server(port: int, tmp: str) -> subprocess.Popen:
+    """run_tma.py against a fresh database seeded with a few words."""
+    db_path = os.path.join(tmp, "loadtest.sqlite3")
+    env = dict(
+        os.environ,
+        DB_PATH=db_path,
+        BOT_TOKEN=BOT_TOKEN,
+        ADMIN_TOKEN=ADMIN_TOKEN,
+        TMA_JOURNAL_PATH=os.path.join(tmp, "loadtest.tma-journal"),
+    )
+    seed = (
+        "from duel_ladder_bot.runtime import db\n"
+        f"for w in {SEED_WORDS!r}:\n"
+        "    db.add_word(w, 'def ' + w, 'tr ' + w, ['syn ' + w], ['ant ' + w], '')\n"
+    )
+    subprocess.run([sys.executable, "-c", seed], cwd=HERE, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "run_tma.py"), "--host", "127.0.0.1", "--port", str(port)],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_for_state(session: aiohttp.ClientSession, base: str, predicate, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            async with session.get(base + "/api/state") as r:
+                if r.status == 200 and predicate(await r.json()):
+                    return
+        except aiohttp.ClientConnectionError:
+            pass  # server still starting
+        if time.monotonic() > deadline:
+            raise TimeoutError("server did not reach the expected state")
+        await asyncio.sleep(0.05)
+
+
+async def warm_up(session: aiohttp.ClientSession, base: str, n: int):
+    """Open n keep-alive connections so the burst measures requests, not TCP handshakes."""
+    async def one():
+        async with session.get(base + "/api/state") as r:
+            await r.read()
+    await asyncio.gather(*(one() for _ in range(n)))
+
+
+async def open_streams(session: aiohttp.ClientSession, base: str, players: list) -> list:
+    """One /api/events stream per player, drained in the background."""
+    async def drain(token: str):
+        params = {"session": token}
+        async with session.get(base + "/api/events", params=params, timeout=None) as r:
+            async for _ in r.content.iter_any():
+                pass
+    return [asyncio.create_task(drain(token)) for _, token in players]
+
+
+async def burst(session: aiohttp.ClientSession, base: str, players: list, path: str) -> list:
+    """All players answer the current question at once; returns latencies in ms."""
+    go = asyncio.Event()
+    choice = 0  # correctness does not matter here
+
+    async def one(player) -> float:
+        init_data, token = player
+        await go.wait()
+        t0 = time.perf_counter()
+        if path == "fast":
+            r = await session.post(
+                base + "/api/answer/fast", data=str(choice), headers={"X-TMA-Session": token}
+            )
+        else:
+            r = await session.post(
+                base + "/api/answer", json={"choice": choice},
+                headers={"X-Telegram-Init-Data": init_data},
+            )
+        body = await r.json()
+        elapsed = (time.perf_counter() - t0) * 1000
+        if not body.get("ok"):
+            raise RuntimeError(f"answer rejected: {r.status} {body}")
+        return elapsed
+
+    tasks = [asyncio.create_task(one(p)) for p in players]
+    await asyncio.sleep(0.05)  # let every task reach go.wait()
+    go.set()
+    return sorted(await asyncio.gather(*tasks))
+
+
+def report(path: str, latencies: list, wall_ms: float) -> float:
+    p99 = percentile(latencies, 99)
+    print(
+        f"{path:>6}: n={len(latencies)}  p50={percentile(latencies, 50):.1f}ms  "
+        f"p95={percentile(latencies, 95):.1f}ms  p99={p99:.1f}ms  max={latencies[-1]:.1f}ms  "
+        f"burst={wall_ms:.0f}ms ({len(latencies) / wall_ms * 1000:.0f} req/s)"
+    )
+    return p99
+
+
+async def run(args, base: str) -> bool:
+    paths = ["fast", "legacy"] if args.path == "both" else [args.path]
+    failed = False
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_for_state(session, base, lambda s: True)
+        admin = {"X-Admin-Token": ADMIN_TOKEN}
+        await session.post(
+            base + "/api/admin/open", json={"rounds": len(paths), "seconds": 120}, headers=admin
+        )
+        players = []
+        for uid in range(1, args.players + 1):
+            init_data = make_init_data(uid)
+            r = await session.post(base + "/api/join", headers={"X-Telegram-Init-Data": init_data})
+            players.append((init_data, (await r.json()).get("session", "")))
+        streams = [] if args.no_streams else await open_streams(session, base, players)
+        await session.post(base + "/api/admin/start", headers=admin)
+
+        for round_no, path in enumerate(paths, start=1):
+            await wait_for_state(
+                session, base, lambda s: s["current_round"] == round_no and "question" in s
+            )
+            await warm_up(session, base, len(players))
+            t0 = time.perf_counter()
+            latencies = await burst(session, base, players, path)
+            p99 = report(path, latencies, (time.perf_counter() - t0) * 1000)
+            failed = failed or p99 > args.p99_budget_ms
+        for task in streams:
+            task.cancel()
+        await asyncio.gather(*streams, return_exceptions=True)
+    return failed
+
+
+def main(args) -> int:
+    tmp = tempfile.mkdtemp(prefix="tma-loadtest-")
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = start_server(port, tmp)
+    try:
+        failed = asyncio.run(run(args, f"http://127.0.0.1:{port}"))
+    finally:
+        server.terminate()
+        server.wait()
+    print("FAIL" if failed else "PASS", f"(p99 budget {args.p99_budget_ms:.0f}ms)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Burst-load the TMA answer endpoint")
+    parser.add_argument("--players", type=int, default=500, help="Simultaneous submissions")
+    parser.add_argument("--path", choices=["fast", "legacy", "both"], default="both")
+    parser.add_argument("--no-streams", action="store_true", help="Don't hold /api/events open")
+    parser.add_argument("--p99-budget-ms", type=float, default=500.0)
+    args = parser.parse_args()
+    sys.exit(main(args))
@@ -1,111 +1,218 @@
 """
-Netlify Function wrapper for TMA API.
-Handles all API routes in a single serverless function.
+Lambda-style Python function for the TMA classroom API (the Netlify site
+itself serves tma-api.js; see NETLIFY_DEPLOYMENT.md).
+
+A plain `handler(event, context)` over the framework-free game core: no
+aiohttp, no bot runtime, no DB pool. Each request loads its room from the
+state store (TMA_STATE_STORE, see duel_ladder_bot/tma_store.py), applies one
+operation in the store's transaction and saves it back, so the game survives
+across invocations of the same instance.
+
+The default store, sqlite:/tmp/tma-state.sqlite3, is local to each instance:
+a request routed to another (or a fresh) instance sees a different game. For
+state consistent across instances, point TMA_STATE_STORE at a location they
+all share.
+
+Routes (also under /rooms/<code>/...):
+  GET  /state            POST /join            POST /answer
+  POST /answer/fast      POST /admin/open|start|reset|next
+
+The first response of an instance carries `Server-Timing: cold;dur=<ms>`
+(module import time) so cold starts show up in the browser's network panel.
 """
 import json
 import os
 import sys
-from typing import Any, Dict
+import time
+
+_IMPORT_STARTED = time.perf_counter()
 
-# Add parent directory to path so we can import duel_ladder_bot
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+sys.path.insert(0, ROOT)
 
-from duel_ladder_bot.tma_server import (
-    game,
+from duel_ladder_bot import tma_core  # noqa: E402
+from duel_ladder_bot.config import log  # noqa: E402
+from duel_ladder_bot.tma_auth import (  # noqa: E402
+    check_admin_token,
+    check_session,
+    issue_session,
     validate_init_data,
-    ADMIN_TOKEN,
-    handle_join,
-    handle_state,
-    handle_answer,
-    handle_admin_open,
-    handle_admin_start,
-    handle_admin_reset,
-    handle_admin_next,
-    check_admin,
 )
+from duel_ladder_bot.tma_store import store_from_env  # noqa: E402
 
-# Import aiohttp web for request/response handling
-from aiohttp import web
+DEFAULT_ROOM = "MAIN"
 
+STORE = store_from_env()
+COLD_START_MS = (time.perf_counter() - _IMPORT_STARTED) * 1000
+_cold = True
 
-def handler(event, context):
-    """Netlify Function handler."""
+# Built from public/vocab.json the first time a question is needed
+_vocab = None
+
+
+def _questions(task_type):
+    global _vocab
+    if _vocab is None:
+        from duel_ladder_bot.vocab_index import VocabIndex
+
+        items = []
+        for base in (ROOT, os.getcwd()):
+            path = os.path.join(base, "public", "vocab.json")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    items = json.load(f)
+                break
+        _vocab = VocabIndex.from_dicts(items)
+    return _vocab.build_question(task_type, k_options=4)
+
+
+def _route(path):
+    """'/api/rooms/ab12c/state' -> ('AB12C', 'state')."""
+    for prefix in ("/.netlify/functions/api", "/api"):
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+            break
+    parts = [p for p in path.split("/") if p]
+    room = DEFAULT_ROOM
+    if len(parts) >= 2 and parts[0] == "rooms":
+        room, parts = parts[1].upper(), parts[2:]
+    return room, "/".join(parts)
+
+
+def _json_body(event):
     try:
-        # Parse request
-        path = event.get('path', '')
-        method = event.get('httpMethod', 'GET')
-        headers = event.get('headers', {}) or {}
-        body = event.get('body', '')
-        
-        # Parse body if present
-        request_body = None
-        if body:
+        return json.loads(event.get("body") or "{}") or {}
+    except ValueError:
+        return {}
+
+
+def _user(headers):
+    init_data = headers.get("x-telegram-init-data", "")
+    return validate_init_data(init_data) if init_data else None
+
+
+def _in_room(room, fn, create=False):
+    """Run `fn(game)` on the room's state inside one store transaction."""
+    def txn(doc):
+        if doc is None:
+            if not create and room != DEFAULT_ROOM:
+                return None, None
+            doc = tma_core.new_game()
+        version = doc["version"]
+        result = fn(doc)
+        return (doc if doc["version"] != version else None), result
+
+    return STORE.update("room:" + room, txn)
+
+
+def _dispatch(method, room, route, headers, event):
+    now = time.time()
+
+    if route == "state" and method == "GET":
+        user = _user(headers)
+        uid = user.get("id") if user else None
+
+        def op(g):
+            tma_core.tick(g, now, _questions)
+            return tma_core.view(g, uid, now)
+
+    elif route == "join" and method == "POST":
+        user = _user(headers)
+        if not user:
+            return 401, {"ok": False, "error": "Invalid auth"}
+        uid = user.get("id")
+        name = user.get("first_name", "Player")
+        if user.get("last_name"):
+            name += " " + user.get("last_name")
+
+        def op(g):
+            resp = {"ok": tma_core.join(g, uid, name)}
+            if str(uid) in g["players"]:
+                resp["session"] = issue_session(room, uid)
+            return resp
+
+    elif route in ("answer", "answer/fast") and method == "POST":
+        if route == "answer":
+            user = _user(headers)
+            uid = user.get("id") if user else None
             try:
-                request_body = json.loads(body)
-            except:
-                pass
-        
-        # Create a mock request object
-        class MockRequest:
-            def __init__(self):
-                self.method = method
-                self.path = path
-                self.headers = headers
-                self._body = request_body
-                self._json = request_body
-            
-            async def json(self):
-                return self._json or {}
-        
-        mock_req = MockRequest()
-        
-        # Route to appropriate handler
-        if path == '/api/join' and method == 'POST':
-            response = await handle_join(mock_req)
-        elif path == '/api/state' and method == 'GET':
-            response = await handle_state(mock_req)
-        elif path == '/api/answer' and method == 'POST':
-            response = await handle_answer(mock_req)
-        elif path == '/api/admin/open' and method == 'POST':
-            response = await handle_admin_open(mock_req)
-        elif path == '/api/admin/start' and method == 'POST':
-            response = await handle_admin_start(mock_req)
-        elif path == '/api/admin/reset' and method == 'POST':
-            response = await handle_admin_reset(mock_req)
-        elif path == '/api/admin/next' and method == 'POST':
-            response = await handle_admin_next(mock_req)
+                choice = int(_json_body(event).get("choice", -1))
+            except (TypeError, ValueError):
+                return 400, {"ok": False, "error": "Invalid body"}
         else:
-            return {
-                'statusCode': 404,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({'ok': False, 'error': 'Not found'})
-            }
-        
-        # Convert aiohttp response to Netlify format
-        if isinstance(response, web.Response):
-            body_text = response.text if hasattr(response, 'text') else ''
+            uid = check_session(room, headers.get("x-tma-session", ""))
+            try:
+                choice = int(event.get("body") or "")
+            except ValueError:
+                return 400, {"ok": False, "error": "Invalid body"}
+        if uid is None:
+            return 401, {"ok": False, "error": "Invalid auth"}
+
+        def op(g):
+            tma_core.tick(g, now, _questions)
+            return {"ok": tma_core.submit_answer(g, uid, choice, now)}
+
+    elif route.startswith("admin/") and method == "POST":
+        if not check_admin_token(headers.get("x-admin-token", "")):
+            return 403, {"ok": False, "error": "Unauthorized"}
+        action = route[len("admin/"):]
+        if action == "open":
+            body = _json_body(event)
             try:
-                body_data = json.loads(body_text) if body_text else {}
-            except:
-                body_data = {'ok': False, 'error': 'Invalid response'}
-            
-            return {
-                'statusCode': response.status,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps(body_data)
-            }
+                rounds, seconds = int(body.get("rounds", 10)), int(body.get("seconds", 12))
+            except (TypeError, ValueError):
+                rounds, seconds = 10, 12
+
+            def op(g):
+                tma_core.open_lobby(g, rounds, seconds)
+                return {"ok": True}
+
+            result = _in_room(room, op, create=True)
+            return 200, result
+        elif action == "start":
+            def op(g):
+                return {"ok": tma_core.start(g, now, _questions)}
+        elif action == "reset":
+            def op(g):
+                tma_core.reset(g)
+                return {"ok": True}
+        elif action == "next":
+            def op(g):
+                return {"ok": tma_core.advance(g, now, _questions)}
         else:
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps(response)
-            }
-            
-    except Exception as e:
-        import traceback
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'ok': False, 'error': str(e), 'trace': traceback.format_exc()})
-        }
+            return 404, {"ok": False, "error": "Not found"}
+
+    else:
+        return 404, {"ok": False, "error": "Not found"}
+
+    result = _in_room(room, op)
+    if result is None:
+        return 404, {"ok": False, "error": "Unknown room"}
+    return 200, result
+
+
+def handler(event, context):
+    """Netlify Function handler."""
+    global _cold
+    started = time.perf_counter()
+    headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+    room, route = _route(event.get("path", ""))
+    try:
+        status, payload = _dispatch(event.get("httpMethod", "GET"), room, route, headers, event)
+    except Exception:
+        log.exception("TMA function failed on %s", event.get("path"))
+        status, payload = 500, {"ok": False, "error": "Internal error"}
 
+    timing = f"app;dur={(time.perf_counter() - started) * 1000:.1f}"
+    if _cold:
+        timing = f"cold;dur={COLD_START_MS:.1f}, " + timing
+        _cold = False
+    return {
+        "statusCode": status,
+        "headers": {
+            "Content-Type": "application/json",
+            "Cache-Control": "no-cache",
+            "Server-Timing": timing,
+        },
+        "body": json.dumps(payload, separators=(",", ":")),
+    }
@@ -3,7 +3,7 @@
 Run the Telegram Mini App server.
 
 Usage:
-  python run_tma.py [--port 8080]
+  python run_tma.py [--port 8080] [--profile-startup]
 
 Admin access:
   Open the TMA URL with ?admin=YOUR_ADMIN_TOKEN
@@ -16,6 +16,11 @@ import sys
 # Ensure we can import our package
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from duel_ladder_bot import startup
+
+# --profile-startup: time every import from here on, report once serving
+startup.enable_from_argv()
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -27,6 +32,9 @@ if __name__ == "__main__":
     # Railway and other platforms set PORT env var automatically
     default_port = int(os.environ.get("PORT", 8080))
     parser.add_argument("--port", type=int, default=default_port, help="Port to listen on")
+    # handled (and removed from argv) by startup.enable_from_argv() above
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print import and init timings once the server is up")
     args = parser.parse_args()
 
     print(f"""
@@ -0,0 +1,54 @@
+from duel_ladder_bot.matchmaker import Matchmaker
+
+
+def _mm():
+    return Matchmaker(bucket_width=50, window=100, window_growth=20, max_wait=20)
+
+
+def test_pairs_closest_rating_within_window():
+    mm = _mm()
+    mm.push(1, 1000, now=0)
+    mm.push(2, 1300, now=0)
+    mm.push(3, 1060, now=0)
+    mm.push(4, 1290, now=0)
+
+    assert mm.take_pairs(now=0) == [(1, 3), (2, 4)]
+    assert len(mm) == 0
+    assert mm.stats()["matches"] == 2
+
+
+def test_window_widens_with_wait_until_unbounded():
+    mm = _mm()
+    mm.push(1, 1000, now=0)
+    mm.push(2, 1250, now=0)
+
+    # window 100 + 20/s: a 250 gap needs 7.5s of waiting
+    assert mm.take_pairs(now=5) == []
+    assert mm.take_pairs(now=8) == [(1, 2)]
+
+    mm.push(3, 1000, now=0)
+    mm.push(4, 3000, now=0)
+    assert mm.take_pairs(now=19) == []
+    # after max_wait anyone will do
+    assert mm.take_pairs(now=20) == [(3, 4)]
+
+
+def test_longest_waiting_picks_first_and_ties_go_to_older_opponent():
+    mm = _mm()
+    mm.push(1, 1000, now=0)
+    mm.push(2, 1050, now=1)
+    mm.push(3, 950, now=2)
+
+    assert mm.take_pairs(now=2) == [(1, 2)]
+    assert list(mm) == [3]
+
+
+def test_push_and_remove_keep_buckets_consistent():
+    mm = _mm()
+    assert mm.push(1, 1000, now=0)
+    assert not mm.push(1, 1200, now=0)
+    assert 1 in mm
+    assert mm.remove(1)
+    assert not mm.remove(1)
+    assert mm.stats()["buckets"] == 0
+    assert mm.take_pairs(now=100) == []
@@ -0,0 +1,26 @@
+import sqlite3
+
+from duel_ladder_bot import migrations
+
+
+def test_fresh_database_reaches_latest_with_indexed_plans(tmp_path):
+    conn = sqlite3.connect(tmp_path / "fresh.sqlite3")
+
+    assert migrations.migrate(conn) == [v for v, _, _ in migrations.MIGRATIONS]
+    assert migrations.current_version(conn) == migrations.LATEST
+    assert migrations.check_query_plans(conn) == []
+    # already current: nothing to apply
+    assert migrations.migrate(conn) == []
+
+
+def test_pre_migration_database_is_upgraded(tmp_path):
+    conn = sqlite3.connect(tmp_path / "old.sqlite3")
+    migrations._baseline(conn)
+    conn.commit()
+    # the check must catch the missing events index on an unmigrated file
+    assert migrations.check_query_plans(conn) != []
+
+    migrations.migrate(conn)
+
+    assert migrations.current_version(conn) == migrations.LATEST
+    assert migrations.check_query_plans(conn) == []
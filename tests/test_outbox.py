@@ -0,0 +1,114 @@
+import asyncio
+
+from duel_ladder_bot.outbox import PRIO_COUNTDOWN, PRIO_QUESTION, Outbox
+
+
+class RetryAfter(Exception):
+    def __init__(self, seconds):
+        super().__init__(f"Flood control exceeded. Retry in {seconds} seconds")
+        self.retry_after = seconds
+
+
+class FakeBot:
+    def __init__(self, fail_first=0, retry_after=0.05, delay=0.0):
+        self.calls = []
+        self.delay = delay
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+
+    async def send_message(self, **kwargs):
+        return await self._call("send_message", kwargs)
+
+    async def edit_message_text(self, **kwargs):
+        return await self._call("edit_message_text", kwargs)
+
+    async def _call(self, method, kwargs):
+        await asyncio.sleep(self.delay)
+        if self.fail_first:
+            self.fail_first -= 1
+            raise RetryAfter(self.retry_after)
+        self.calls.append((method, kwargs.get("text")))
+        return kwargs.get("text")
+
+
+def _outbox(**kw):
+    kw.setdefault("global_rate", 1000.0)
+    kw.setdefault("chat_rate", 1000.0)
+    kw.setdefault("chat_burst", 1000.0)
+    return Outbox(**kw)
+
+
+def test_queued_edits_of_one_message_coalesce():
+    async def main():
+        bot, box = FakeBot(), _outbox()
+        futs = [
+            box.submit(bot, "edit_message_text", chat_id=1, message_id=5, text=f"t{i}")
+            for i in range(3)
+        ]
+        results = await asyncio.gather(*futs)
+        await box.close()
+        return bot, box, results
+
+    bot, box, results = asyncio.run(main())
+    assert results == [None, None, "t2"]
+    assert bot.calls == [("edit_message_text", "t2")]
+    assert box.coalesced == 2
+
+
+def test_higher_priority_goes_first():
+    async def main():
+        bot, box = FakeBot(), _outbox(max_in_flight=1)
+        futs = [
+            box.submit(bot, "send_message", chat_id=1, text="tick", priority=PRIO_COUNTDOWN),
+            box.submit(bot, "send_message", chat_id=2, text="question", priority=PRIO_QUESTION),
+        ]
+        await asyncio.gather(*futs)
+        await box.close()
+        return bot
+
+    assert [t for _, t in asyncio.run(main()).calls] == ["question", "tick"]
+
+
+def test_expired_item_is_dropped():
+    async def main():
+        # one token per chat: the second message has to wait ~1s, past its ttl
+        bot, box = FakeBot(), _outbox(chat_rate=1.0, chat_burst=1.0)
+        first = box.submit(bot, "send_message", chat_id=1, text="a")
+        late = box.submit(bot, "send_message", chat_id=1, text="b", ttl=0.05)
+        results = await asyncio.gather(first, late)
+        await box.close()
+        return bot, box, results
+
+    bot, box, results = asyncio.run(main())
+    assert results == ["a", None]
+    assert box.dropped == 1
+    assert bot.calls == [("send_message", "a")]
+
+
+def test_retry_after_requeues_the_item():
+    async def main():
+        bot, box = FakeBot(fail_first=1), _outbox()
+        result = await box.send_message(bot, chat_id=1, text="hi")
+        await box.close()
+        return bot, box, result
+
+    bot, box, result = asyncio.run(main())
+    assert result == "hi"
+    assert box.retried == 1
+    assert bot.calls == [("send_message", "hi")]
+
+
+def test_retry_after_drops_an_edit_superseded_while_in_flight():
+    async def main():
+        bot, box = FakeBot(fail_first=1, delay=0.05), _outbox()
+        stale = box.submit(bot, "edit_message_text", chat_id=1, message_id=5, text="old")
+        await asyncio.sleep(0.01)  # in flight, about to hit flood control
+        fresh = box.submit(bot, "edit_message_text", chat_id=1, message_id=5, text="new")
+        results = await asyncio.gather(stale, fresh)
+        await box.close()
+        return bot, box, results
+
+    bot, box, results = asyncio.run(main())
+    assert results == [None, "new"]
+    assert bot.calls == [("edit_message_text", "new")]
+    assert box.retried == 0
@@ -0,0 +1,83 @@
+from duel_ladder_bot.ranking import EventBoard, RankIndex
+
+
+def test_rank_index_orders_by_key_then_user_id():
+    idx = RankIndex()
+    idx.update(1, (-3,))
+    idx.update(2, (-5,))
+    idx.update(3, (-3,))
+
+    assert list(idx) == [2, 1, 3]
+    assert idx.rank_of(2) == 1
+    assert idx.rank_of(3) == 3
+    assert idx.rank_of(99) is None
+
+
+def test_rank_index_update_moves_and_remove_drops():
+    idx = RankIndex()
+    for uid in range(5):
+        idx.update(uid, (uid,))
+
+    idx.update(4, (-1,))
+    assert idx.top(2) == [4, 0]
+    # unchanged key is a no-op
+    idx.update(4, (-1,))
+    assert len(idx) == 5
+
+    idx.remove(0)
+    idx.remove(0)
+    assert 0 not in idx
+    assert idx.top(10) == [4, 1, 2, 3]
+    assert idx.around(2, 1) == [(2, 1), (3, 2), (4, 3)]
+    assert idx.around(99, 1) == []
+
+
+def test_event_board_ranks_by_wins_points_correct():
+    board = EventBoard(
+        [
+            {"user_id": 1, "wins": 2, "points": 10, "correct": 3},
+            {"user_id": 2, "wins": 2, "points": 12, "correct": 1},
+            {"user_id": 3},
+        ]
+    )
+    assert [r["user_id"] for r in board.top(3)] == [2, 1, 3]
+    assert board.row(3) == {
+        "user_id": 3, "wins": 0, "losses": 0, "points": 0, "correct": 0, "wrong": 0
+    }
+
+    board.add(3, wins=3)
+    assert board.ranks.rank_of(3) == 1
+    # not joined: ignored, like the UPDATE it mirrors
+    board.add(42, wins=1)
+    assert board.row(42) is None
+
+    board.remove(2)
+    assert [r["user_id"] for r in board.top(10)] == [3, 1]
+
+
+def test_event_board_rows_are_copies():
+    board = EventBoard([{"user_id": 1, "points": 5}])
+    board.row(1)["points"] = 100
+    board.top(1)[0]["points"] = 100
+    assert board.row(1)["points"] == 5
+
+
+def test_db_board_overlays_unflushed_results(tmp_path):
+    from duel_ladder_bot.db import DB
+
+    db = DB(str(tmp_path / "board.sqlite3"))
+    event_id = db.create_event(5, 30, chat_id=1)
+    for uid in (1, 2):
+        db.ensure_player(event_id, uid, chat_id=1)
+
+    db.record_round_result(event_id, 2, 7, True)
+    db.record_duel_win_loss(event_id, 2, 1)
+    assert db.player_rank(event_id, 2) == 1
+
+    # a cold load before the flush must include the buffered deltas once
+    db._boards.clear()
+    assert db.get_player_stats(event_id, 2)["points"] == 7
+    assert db.flush_results() == 2
+    db._boards.clear()
+    assert db.get_player_stats(event_id, 2)["points"] == 7
+    assert db.get_player_stats(event_id, 1)["losses"] == 1
@@ -0,0 +1,75 @@
+import asyncio
+
+from duel_ladder_bot.timers import DeadlineScheduler
+
+
+def test_fires_in_deadline_order_and_skips_cancelled():
+    async def main():
+        sched, fired = DeadlineScheduler(), []
+        sched.call_later(0.03, fired.append, "c")
+        sched.call_later(0.01, fired.append, "a")
+        dropped = sched.call_later(0.02, fired.append, "b")
+        dropped.cancel()
+        dropped.cancel()  # idempotent
+        await asyncio.sleep(0.06)
+        stats = sched.stats()
+        await sched.close()
+        return fired, stats
+
+    fired, stats = asyncio.run(main())
+    assert fired == ["a", "c"]
+    assert stats["fired"] == 2
+    assert stats["cancelled"] == 1
+    assert stats["pending"] == 0
+
+
+def test_cancel_after_firing_is_a_no_op():
+    async def main():
+        sched, fired = DeadlineScheduler(), []
+        timer = sched.call_later(0, fired.append, 1)
+        await asyncio.sleep(0.01)
+        timer.cancel()
+        stats = sched.stats()
+        await sched.close()
+        return fired, stats
+
+    fired, stats = asyncio.run(main())
+    assert fired == [1]
+    assert stats["cancelled"] == 0
+
+
+def test_mass_cancel_compacts_the_heap():
+    async def main():
+        sched = DeadlineScheduler()
+        timers = [sched.call_later(60, lambda: None) for _ in range(200)]
+        for t in timers[:150]:
+            t.cancel()
+        heap_size, stats = len(sched._heap), sched.stats()
+        await sched.close()
+        return heap_size, stats
+
+    heap_size, stats = asyncio.run(main())
+    # compaction ran once dead entries passed half of the heap
+    assert heap_size < 200
+    assert stats["pending"] == 50
+    assert stats["cancelled"] == 150
+
+
+def test_coroutine_callbacks_and_sleep():
+    async def main():
+        sched, fired = DeadlineScheduler(), []
+
+        async def cb(x):
+            fired.append(x)
+
+        def boom():
+            raise RuntimeError("callback failure must not stop the scheduler")
+
+        sched.call_later(0, boom)
+        sched.call_later(0.01, cb, "coro")
+        await sched.sleep(0.02)
+        fired.append("slept")
+        await sched.close()
+        return fired
+
+    assert asyncio.run(main()) == ["coro", "slept"]
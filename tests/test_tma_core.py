@@ -0,0 +1,90 @@
+import json
+
+from duel_ladder_bot import tma_core
+from duel_ladder_bot.config import TASK_TYPES
+
+
+def _question(task_type):
+    return {
+        "task_type": task_type,
+        "prompt": f"{task_type}?",
+        "options": ["a", "b", "c", "d"],
+        "correct_idx": 1,
+    }
+
+
+def _game(rounds=2, seconds=10):
+    g = tma_core.new_game()
+    tma_core.open_lobby(g, rounds, seconds)
+    assert tma_core.join(g, 1, "Ann")
+    assert tma_core.join(g, 2, "Bob")
+    assert tma_core.start(g, 100.0, _question)
+    return g
+
+
+def test_scoring_and_early_round_end_when_everyone_answered():
+    g = _game()
+    assert tma_core.submit_answer(g, 1, 1, 101.0)  # correct and fast: 2 points
+    assert not tma_core.submit_answer(g, 1, 0, 101.5)  # one answer per round
+    assert g["question"] is not None
+    assert tma_core.submit_answer(g, 2, 0, 102.0)
+
+    results = g["last_results"]["player_results"]
+    assert [(r["user_id"], r["correct"], r["points"]) for r in results] == [
+        (1, True, 2),
+        (2, False, 0),
+    ]
+    assert g["question"] is None
+    assert g["players"]["2"]["wrong"] == 1
+
+
+def test_tick_ends_round_at_deadline_and_starts_next_after_pause():
+    g = _game(rounds=2, seconds=10)
+    tma_core.tick(g, 105.0, _question)
+    assert g["current_round"] == 1 and g["question"]
+
+    # nobody polled for a while: the round ended at its deadline (110) and
+    # the pause after it is over too
+    tma_core.tick(g, 150.0, _question)
+    assert g["last_results"]["round"] == 1
+    assert g["current_round"] == 2
+    assert g["question"]["task_type"] == TASK_TYPES[1 % len(TASK_TYPES)]
+    assert g["round_started"] == 150.0
+
+    tma_core.advance(g, 151.0, _question)
+    tma_core.advance(g, 151.0, _question)
+    assert g["is_finished"] and not g["is_running"]
+
+
+def test_join_closed_after_start_and_missing_questions_finish():
+    g = _game()
+    assert not tma_core.join(g, 3, "Cy")
+
+    g = tma_core.new_game()
+    tma_core.open_lobby(g)
+    tma_core.join(g, 1, "Ann")
+    assert tma_core.start(g, 0.0, lambda task_type: None)
+    assert g["is_finished"]
+
+
+def test_view_is_json_safe_and_personal():
+    g = _game()
+    tma_core.submit_answer(g, 2, 1, 103.0)
+    g = json.loads(json.dumps(g))  # as stored between requests
+
+    mine = tma_core.view(g, 2, 104.0)
+    # scores only change when the round ends: join order breaks the tie
+    assert mine["my_rank"] == 2
+    assert mine["already_answered"]
+    assert mine["answered_count"] == 1
+    assert mine["time_remaining"] == 6.0
+    assert mine["question"]["options"] == ["a", "b", "c", "d"]
+    assert "correct_idx" not in mine["question"]
+
+    anonymous = tma_core.view(g, None, 104.0)
+    assert "my_rank" not in anonymous
+    assert [r["user_id"] for r in anonymous["leaderboard"]] == [1, 2]
+
+    version = g["version"]
+    tma_core.reset(g)
+    assert g["version"] > version and not g["players"]
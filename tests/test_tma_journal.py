@@ -0,0 +1,77 @@
+import asyncio
+
+from duel_ladder_bot.async_db import AsyncDB
+from duel_ladder_bot.db import DB
+from duel_ladder_bot.tma_journal import GameJournal
+from duel_ladder_bot.tma_server import GameRegistry
+
+
+def _journal(tmp_path):
+    adb = AsyncDB(DB(str(tmp_path / "j.sqlite3")), workers=1)
+    return GameJournal(str(tmp_path / "tma.journal"), adb)
+
+
+def test_load_returns_checkpoint_and_later_entries(tmp_path):
+    async def main():
+        j = _journal(tmp_path)
+        j.record("A", "join", {"n": 1})
+        await j.flush()
+        await j.checkpoint({"A": {"players": 1}})
+        j.record("A", "join", {"n": 2})
+        await j.flush()
+        j.record("A", "join", {"n": 3})  # never flushed: lost in the crash
+
+    asyncio.run(main())
+    with open(tmp_path / "tma.journal", "a") as f:
+        f.write('{"seq": 9, "ro')  # torn write
+
+    j = _journal(tmp_path)
+    rooms, entries = j.load()
+    assert rooms == {"A": {"players": 1}}
+    assert [e["data"]["n"] for e in entries] == [2]
+    assert j.seq == 2
+
+
+def test_checkpoint_keeps_entries_flushed_after_its_snapshot(tmp_path):
+    async def main():
+        j = _journal(tmp_path)
+        j.record("A", "join", {"n": 1})
+        async with j._lock():
+            # a flush waits for the lock; the checkpoint snapshot is taken now
+            flushing = asyncio.create_task(j.flush())
+            await asyncio.sleep(0)
+            checkpointing = asyncio.create_task(j.checkpoint({"A": {"players": 1}}))
+            await asyncio.sleep(0)
+            j.record("A", "join", {"n": 2})
+        await asyncio.gather(flushing, checkpointing)
+        await j.flush()
+
+    asyncio.run(main())
+    rooms, entries = _journal(tmp_path).load()
+    assert rooms == {"A": {"players": 1}}
+    assert [e["data"]["n"] for e in entries] == [2]
+
+
+def test_registry_replays_checkpoint_and_journal(tmp_path):
+    async def main():
+        j = _journal(tmp_path)
+        games = GameRegistry(idle_seconds=60, max_rooms=4)
+        games.attach_journal(j)
+        code = games.create()
+        room = games.get(code)
+        room.open_lobby(3, 10)
+        room.join(1, "Ann")
+        await j.flush()
+        await j.checkpoint(games.snapshots())
+        room.join(2, "Bob")
+        await j.flush()
+        return code
+
+    code = asyncio.run(main())
+    j = _journal(tmp_path)
+    snapshots, entries = j.load()
+    restored = GameRegistry(idle_seconds=60, max_rooms=4)
+    assert restored.restore(snapshots, entries) == 1
+    room = restored.get(code)
+    assert room.is_open
+    assert sorted(room.players) == [1, 2]